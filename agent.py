@@ -1,69 +1,32 @@
 import os
-import requests
-from langchain.agents import initialize_agent, AgentType, tool
-from langchain.tools import Tool
-from langchain_google_genai import ChatGoogleGenerativeAI
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from dotenv import load_dotenv
+from cache import CACHE_DIR, DiskCache, make_key
+from crawler import analyse_domain
+from domains import detect_domain
+from fences import parse_code_blocks
+from llm_client import llm_executor
+from sections import merge_section, section_context
+from tracing import current_span_id, current_trace, propagate, tracer
 
 load_dotenv()
 
-@tool
+# The tools are plain functions so they can be used (and imported) without
+# LangChain; `get_tools` wraps them for the ReAct agent.
+
 def domain(prompt: str) -> str:
     """Identify the website category from prompt: e.g., restaurant, blog, ecommerce."""
-    prompt = prompt.lower()
-    if "restaurant" in prompt or "cafe" in prompt:
-        return "restaurant"
-    elif "portfolio" in prompt:
-        return "portfolio"
-    elif "blog" in prompt:
-        return "blog"
-    elif "ecommerce" in prompt or "shop" in prompt:
-        return "ecommerce"
-    elif "agency" in prompt:
-        return "agency"
-    else:
-        return "generic"
-
-@tool
+    return detect_domain(prompt)
+
 def analyse_websites(domain: str) -> str:
     """Analyze top websites in a given domain using Firecrawl and return design/content inspiration."""
     try:
-        FIRECRAWL_API_KEY = os.environ.get("FIRECRAWL_API_KEY")
-        if not FIRECRAWL_API_KEY:
-            return "Firecrawl API key not found."
-
-        headers = {
-            "Authorization": f"Bearer {FIRECRAWL_API_KEY}",
-            "Content-Type": "application/json"
-        }
-
-        domain_sites = {
-            "restaurant": ["https://sweetgreen.com", "https://chipotle.com"],
-            "portfolio": ["https://brittanychiang.com"],
-            "ecommerce": ["https://zara.com"],
-            "agency": ["https://ustwo.com"]
-        }
-
-        urls = domain_sites.get(domain.lower(), [])
-        if not urls:
-            return "ℹ️ No reference websites found for this domain."
-
-        results = []
-        for url in urls:
-            try:
-                res = requests.post("https://api.firecrawl.dev/v1/crawl", headers=headers, json={"url": url})
-                data = res.json()
-                summary = data.get("summary", "")
-                keywords = data.get("keywords", [])
-                results.append(f"{url}\n📝 {summary}\n🔑 Keywords: {keywords}")
-            except Exception as inner:
-                results.append(f"⚠️ Failed to analyze {url}: {inner}")
-
-        return "\n\n".join(results)
+        return analyse_domain(domain)
     except Exception as e:
         return f"Firecrawl tool error: {e}"
 
-@tool
 def generate_seo_tags(title: str) -> str:
     """Generate basic SEO meta tags based on a title."""
     return f"""
@@ -73,27 +36,90 @@ def generate_seo_tags(title: str) -> str:
 <meta name="author" content="AI Website Builder Agent">
 """
 
-gemini_key = os.environ.get("GEMINI_API_KEY")
-if not gemini_key:
-    raise EnvironmentError("Gemini API key not found in environment variables.")
+LLM_SETTINGS = {
+    "model": "gemini-2.5-flash",
+    "temperature": 0.7
+}
 
-llm = ChatGoogleGenerativeAI(
-    model="gemini-2.5-flash",
-    api_key=gemini_key,
-    temperature=0.7
-)
+def get_tools():
+    from langchain.agents import tool
+    return [tool(domain), tool(analyse_websites), tool(generate_seo_tags)]
+
+# The Gemini client and the agent are built on first use, once per process:
+# importing this module needs neither an API key nor the LangChain import
+# graph, which keeps Streamlit's cold start fast.
+_llm = None
+_llm_label = "gemini"
+_agent = None
+_runtime_lock = threading.Lock()
 
-tools = [domain, analyse_websites, generate_seo_tags]
+def get_llm():
+    global _llm
+    with _runtime_lock:
+        if _llm is None:
+            from langchain_google_genai import ChatGoogleGenerativeAI
+            from chat_models import ManagedChatModel
+            gemini_key = os.environ.get("GEMINI_API_KEY")
+            if not gemini_key:
+                raise EnvironmentError("Gemini API key not found in environment variables.")
+            _llm = ManagedChatModel(
+                inner=ChatGoogleGenerativeAI(
+                    api_key=gemini_key,
+                    streaming=True,
+                    max_retries=0,
+                    timeout=llm_executor.timeout,
+                    **LLM_SETTINGS
+                ),
+                executor=llm_executor
+            )
+    return _llm
 
-agent = initialize_agent(
-    tools=tools,
-    llm=llm,
-    agent=AgentType.ZERO_SHOT_REACT_DESCRIPTION
+def get_agent():
+    global _agent
+    llm = get_llm()
+    with _runtime_lock:
+        if _agent is None:
+            from langchain.agents import initialize_agent, AgentType
+            _agent = initialize_agent(
+                tools=get_tools(),
+                llm=llm,
+                agent=AgentType.ZERO_SHOT_REACT_DESCRIPTION
+            )
+    return _agent
+
+def set_llm(llm, label: str = None, managed: bool = True):
+    """Replace the chat model used for generation, e.g. with `fake_llm.FakeChatModel`.
+
+    With `managed=True` it still goes through the shared `llm_executor`.
+    """
+    from chat_models import ManagedChatModel
+    global _llm, _llm_label, _agent
+    with _runtime_lock:
+        _llm = ManagedChatModel(inner=llm, executor=llm_executor) if managed else llm
+        _llm_label = label or type(llm).__name__
+        _agent = None
+
+generation_cache = DiskCache(
+    os.path.join(CACHE_DIR, "generations.sqlite3"),
+    max_entries=int(os.environ.get("GENERATION_CACHE_MAX_ENTRIES", 200)),
+    max_bytes=int(os.environ.get("GENERATION_CACHE_MAX_BYTES", 50 * 1024 * 1024)),
+    ttl=int(os.environ.get("GENERATION_CACHE_TTL", 24 * 3600))
 )
 
-def run_agent(user_prompt: str, custom_values: dict) -> str:
-    try:
-        full_prompt = f"""
+# "agent" lets the ReAct agent call each tool itself (one LLM round-trip per
+# step); "direct" runs the tools locally and makes a single generation call.
+EXECUTION_MODES = ("agent", "direct")
+EXECUTION_MODE = os.environ.get("WEBWEAVER_MODE", "agent")
+
+def _normalize(text) -> str:
+    return " ".join(str(text or "").split())
+
+def generation_cache_key(user_prompt: str, custom_values: dict, mode: str = EXECUTION_MODE) -> str:
+    values = {name: _normalize(value) for name, value in custom_values.items()}
+    return make_key("generation", _llm_label, mode, _normalize(user_prompt), values, LLM_SETTINGS)
+
+def build_agent_prompt(user_prompt: str, custom_values: dict) -> str:
+    return f"""
 You are a website building AI.
 
 Your task is to generate a complete, clean, and modern website using HTML, CSS, and JavaScript for the following input:
@@ -121,8 +147,305 @@ Your response must include 3 code blocks ONLY in this exact format:
 ❌ Do NOT skip any of the 3 sections.
 ❌ Do NOT include markdown, explanations, or additional comments outside the code blocks.
 """
-        return agent.run(full_prompt)
+
+def prepare_context(user_prompt: str, custom_values: dict) -> dict:
+    """Run the three tools without the agent: the two local ones inline, the
+    Firecrawl lookup on a worker thread so it overlaps with them."""
+    with tracer.span("domain"):
+        site_domain = domain(user_prompt)
+    with ThreadPoolExecutor(max_workers=1) as pool:
+        inspiration = pool.submit(propagate(_traced_analyse_websites), site_domain)
+        with tracer.span("seo_tags"):
+            seo_tags = generate_seo_tags(custom_values.get("header") or site_domain.title())
+        return {
+            "domain": site_domain,
+            "inspiration": inspiration.result(),
+            "seo_tags": seo_tags.strip()
+        }
+
+def _traced_analyse_websites(site_domain: str) -> str:
+    with tracer.span("analyse_websites", domain=site_domain):
+        return analyse_websites(site_domain)
+
+def build_direct_prompt(user_prompt: str, custom_values: dict, context: dict) -> str:
+    return f"""
+You are a website building AI.
+
+Your task is to generate a complete, clean, and modern website using HTML, CSS, and JavaScript for the following input:
+
+Theme: {custom_values['theme']}
+Header Text: {custom_values['header']}
+Hero Section Text: {custom_values['hero']}
+Footer Text: {custom_values['footer']}
+User Prompt: {user_prompt}
+
+Website category: {context['domain']}
+
+Design/content inspiration from reference websites:
+{context['inspiration']}
+
+SEO meta tags to place in <head>:
+{context['seo_tags']}
+
+Requirements:
+1. Generate a modern website with 3 fully connected files: HTML, CSS, and JavaScript.
+2. Ensure the navbar links (e.g., Home, About, Contact) work using smooth JS transitions.
+3. Include at least 1 interactive JavaScript feature: e.g., dark mode, scroll animation, or form validation.
+
+Your response must include 3 code blocks ONLY, fenced as ```html, ```css and ```javascript.
+❌ Do NOT skip any of the 3 sections.
+❌ Do NOT include markdown, explanations, or additional comments outside the code blocks.
+"""
+
+def _message_text(message) -> str:
+    content = message.content
+    if isinstance(content, list):
+        return "".join(part if isinstance(part, str) else part.get("text", "") for part in content)
+    return content
+
+def _traced(callbacks):
+    """`callbacks` plus a handler recording LLM calls and tool runs when a trace is active."""
+    trace = current_trace()
+    if trace is None:
+        return list(callbacks or [])
+    from agent_callbacks import TracingHandler
+    return [*(callbacks or []), TracingHandler(trace, current_span_id())]
+
+def _generate(user_prompt: str, custom_values: dict, mode: str, callbacks=None, on_step=None) -> str:
+    if mode not in EXECUTION_MODES:
+        raise ValueError(f"Unknown execution mode: {mode}")
+    if mode == "agent":
+        with tracer.span("agent"):
+            return get_agent().run(build_agent_prompt(user_prompt, custom_values), callbacks=_traced(callbacks))
+    with tracer.span("tools"):
+        context = prepare_context(user_prompt, custom_values)
+    if on_step:
+        on_step(f"🏷️ Domain: {context['domain']}")
+        on_step(f"📎 {context['inspiration'][:500]}")
+    with tracer.span("generate"):
+        message = get_llm().invoke(
+            build_direct_prompt(user_prompt, custom_values, context),
+            config={"callbacks": _traced(callbacks)}
+        )
+    return _message_text(message)
+
+SECTION_LABELS = {
+    "header": "Header Text",
+    "hero": "Hero Section Text",
+    "footer": "Footer Text",
+}
+
+def build_section_prompt(user_prompt: str, custom_values: dict, section: str, fragment: str, css: str) -> str:
+    if section == "theme":
+        return f"""
+You are restyling an existing website. Rewrite its CSS for the theme below, keeping every selector the HTML and JavaScript rely on.
+
+Theme: {custom_values['theme']}
+User Prompt: {user_prompt}
+
+Current CSS:
+```css
+{css}
+```
+
+Return the complete updated CSS as a single ```css code block and nothing else.
+"""
+    return f"""
+You are editing one section of an existing website. Keep its tags, classes and ids unless the change requires otherwise.
+
+Section: {section}
+{SECTION_LABELS[section]}: {custom_values[section]}
+Theme: {custom_values['theme']}
+User Prompt: {user_prompt}
+
+Current HTML of the section:
+```html
+{fragment}
+```
+
+CSS rules that style it:
+```css
+{css}
+```
+
+Return the updated section as a single ```html code block. Only if its styles must change, add the updated rules as a single ```css code block. Do not include anything else.
+"""
+
+def edit_section(response: str, user_prompt: str, custom_values: dict, section: str, use_cache: bool = True, callbacks=None) -> str:
+    """Regenerate just `section` of `response` and merge it back in.
+
+    Only the section's HTML fragment and the CSS rules that target it are
+    sent to the LLM (the whole CSS for a theme change).
+    """
+    with tracer.span("parse"):
+        html_block, span, css_block, rules = section_context(response, section)
+    fragment = html_block.code[span[0]:span[1]] if html_block else ""
+    css = css_block.code if section == "theme" else "\n\n".join(css_block.code[rule.start:rule.end] for rule in rules)
+    cache_key = make_key("section", _llm_label, response, user_prompt, section, _normalize(custom_values[section]),
+                         _normalize(custom_values["theme"]), LLM_SETTINGS)
+    if use_cache:
+        cached = generation_cache.get(cache_key)
+        if cached is not None:
+            return cached
+    with tracer.span("section_edit", section=section):
+        message = get_llm().invoke(
+            build_section_prompt(user_prompt, custom_values, section, fragment, css),
+            config={"callbacks": _traced(callbacks)}
+        )
+    reply = parse_code_blocks(_message_text(message))
+    html = next((block.code for block in reply if block.kind == "html"), "")
+    css = "\n\n".join(block.code for block in reply if block.kind == "css")
+    if section != "theme" and not html:
+        raise ValueError(f"The {section} edit returned no HTML.")
+    if section == "theme" and not css:
+        raise ValueError("The theme edit returned no CSS.")
+    edited = merge_section(response, section, html, css)
+    generation_cache.set(cache_key, edited)
+    return edited
+
+def stream_edit(response: str, user_prompt: str, custom_values: dict, sections, callbacks=None):
+    """Like `stream_agent`, but edits `sections` of an existing response in turn."""
+    try:
+        for section in sections:
+            yield "step", f"✏️ Updating the {section}"
+            response = edit_section(response, user_prompt, custom_values, section, callbacks=callbacks)
+    except Exception as e:
+        yield "final", f"Agent failed to edit website: {str(e)}"
+        return
+    yield "final", response
+
+def run_agent(user_prompt: str, custom_values: dict, use_cache: bool = True, mode: str = None, callbacks=None) -> str:
+    mode = mode or EXECUTION_MODE
+    cache_key = generation_cache_key(user_prompt, custom_values, mode)
+    if use_cache:
+        with tracer.span("cache_lookup") as attrs:
+            cached = generation_cache.get(cache_key)
+            attrs["hit"] = cached is not None
+        if cached is not None:
+            return cached
+    try:
+        response = _generate(user_prompt, custom_values, mode, callbacks)
     except Exception as e:
         return f"Agent failed to generate website: {str(e)}"
+    generation_cache.set(cache_key, response)
+    return response
+
+def variant_cache_key(user_prompt: str, custom_values: dict, temperature: float = None) -> str:
+    # Without a temperature override a variant is just a direct-mode generation.
+    key = generation_cache_key(user_prompt, custom_values, "direct")
+    return key if temperature is None else make_key("variant", key, temperature)
+
+def _generate_variant(user_prompt: str, variant: dict, context: dict, index: int, callbacks=None) -> str:
+    settings = {}
+    if variant.get("temperature") is not None:
+        settings["generation_config"] = {"temperature": variant["temperature"]}
+    with tracer.span("generate", variant=index):
+        message = get_llm().invoke(
+            build_direct_prompt(user_prompt, variant["custom_values"], context),
+            config={"callbacks": _traced(callbacks)},
+            **settings
+        )
+    return _message_text(message)
+
+def stream_variants(user_prompt: str, variants: list, use_cache: bool = True, callbacks=None):
+    """Generate several versions of one site at once, yielding `(kind, payload)` events.
+
+    Each variant is a dict with `custom_values` and an optional `temperature`.
+    The tools run once, as in direct mode (SEO tags use the first variant's
+    header), and the LLM calls then run side by side, so K variants take
+    about as long as one within `llm_executor`'s concurrency limit.
+
+    Yields `step` events, a `variant` event `(index, response)` as each one
+    finishes (in completion order) and a final event with all responses.
+    """
+    responses = [None] * len(variants)
+    keys = [variant_cache_key(user_prompt, variant["custom_values"], variant.get("temperature")) for variant in variants]
+    pending = []
+    for index, key in enumerate(keys):
+        cached = generation_cache.get(key) if use_cache else None
+        if cached is None:
+            pending.append(index)
+        else:
+            responses[index] = cached
+            yield "variant", (index, cached)
+    if not pending:
+        yield "final", responses
+        return
+
+    try:
+        with tracer.span("tools"):
+            context = prepare_context(user_prompt, variants[pending[0]]["custom_values"])
+    except Exception as e:
+        error = f"Agent failed to generate website: {str(e)}"
+        for index in pending:
+            responses[index] = error
+            yield "variant", (index, error)
+        yield "final", responses
+        return
+    yield "step", f"🏷️ Domain: {context['domain']}"
+    yield "step", f"📎 {context['inspiration'][:500]}"
+
+    pool = ThreadPoolExecutor(max_workers=len(pending), thread_name_prefix="variant")
+    try:
+        futures = {
+            pool.submit(propagate(_generate_variant), user_prompt, variants[index], context, index, callbacks): index
+            for index in pending
+        }
+        for future in as_completed(futures):
+            index = futures[future]
+            try:
+                response = future.result()
+                generation_cache.set(keys[index], response)
+            except Exception as e:
+                response = f"Agent failed to generate website: {str(e)}"
+            responses[index] = response
+            yield "variant", (index, response)
+    finally:
+        # A cancelled job stops listening; the calls still running are not waited for.
+        pool.shutdown(wait=False, cancel_futures=True)
+    yield "final", responses
+
+def stream_agent(user_prompt: str, custom_values: dict, use_cache: bool = True, mode: str = None, callbacks=None):
+    """Run a generation in a background thread, yielding `(kind, text)` events.
+
+    `step` events describe tool calls and their results, `token` events carry
+    every raw LLM token, `answer` events carry just the tokens of the final
+    answer, and a single `final` event carries the complete response.
+    """
+    mode = mode or EXECUTION_MODE
+    cache_key = generation_cache_key(user_prompt, custom_values, mode)
+    if use_cache:
+        with tracer.span("cache_lookup") as attrs:
+            cached = generation_cache.get(cache_key)
+            attrs["hit"] = cached is not None
+        if cached is not None:
+            yield "final", cached
+            return
+
+    from agent_callbacks import FINAL_ANSWER_MARKER, StreamHandler
+
+    events = queue.Queue()
+    handler = StreamHandler(events, FINAL_ANSWER_MARKER if mode == "agent" else None)
 
+    def worker():
+        try:
+            response = _generate(
+                user_prompt, custom_values, mode,
+                callbacks=[handler, *(callbacks or [])],
+                on_step=lambda text: events.put(("step", text))
+            )
+            events.put(("done", response))
+        except Exception as e:
+            events.put(("error", f"Agent failed to generate website: {str(e)}"))
 
+    threading.Thread(target=propagate(worker), daemon=True).start()
+    while True:
+        kind, payload = events.get()
+        if kind == "done":
+            generation_cache.set(cache_key, payload)
+            yield "final", payload
+            return
+        if kind == "error":
+            yield "final", payload
+            return
+        yield kind, payload
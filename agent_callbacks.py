@@ -0,0 +1,98 @@
+import queue
+from itertools import chain
+from langchain_core.callbacks import BaseCallbackHandler
+from llm_client import token_usage
+
+FINAL_ANSWER_MARKER = "Final Answer:"
+
+
+class StreamHandler(BaseCallbackHandler):
+    """Forwards agent callbacks to a queue consumed by `stream_agent`.
+
+    With `answer_marker=None` every LLM token belongs to the answer (direct
+    mode); otherwise only the tokens after the marker do.
+    """
+
+    def __init__(self, events: queue.Queue, answer_marker: str = FINAL_ANSWER_MARKER):
+        self.events = events
+        self.answer_marker = answer_marker
+        self.buffer = ""
+        self.answering = answer_marker is None
+
+    def on_llm_start(self, *args, **kwargs):
+        self.buffer = ""
+        self.answering = self.answer_marker is None
+
+    def on_llm_new_token(self, token: str, **kwargs):
+        self.events.put(("token", token))
+        if self.answering:
+            self.events.put(("answer", token))
+            return
+        self.buffer += token
+        marker = self.buffer.find(self.answer_marker)
+        if marker != -1:
+            self.answering = True
+            self.events.put(("answer", self.buffer[marker + len(self.answer_marker):]))
+
+    def on_agent_action(self, action, **kwargs):
+        self.events.put(("step", f"🛠️ {action.tool}: {action.tool_input}"))
+
+    def on_tool_end(self, output, **kwargs):
+        self.events.put(("step", f"📎 {str(output)[:500]}"))
+
+
+class TokenUsageHandler(BaseCallbackHandler):
+    """Counts LLM calls and the tokens they report."""
+
+    def __init__(self):
+        self.llm_calls = 0
+        self.input_tokens = 0
+        self.output_tokens = 0
+
+    def on_llm_end(self, response, **kwargs):
+        self.llm_calls += 1
+        usage = token_usage(chain.from_iterable(response.generations))
+        self.input_tokens += usage["input_tokens"]
+        self.output_tokens += usage["output_tokens"]
+
+    @property
+    def total_tokens(self) -> int:
+        return self.input_tokens + self.output_tokens
+
+
+class TracingHandler(BaseCallbackHandler):
+    """Records each LLM call (latency, tokens, step) and tool run as a span of `trace`."""
+
+    def __init__(self, trace, parent=None):
+        self.trace = trace
+        self.parent = parent
+        self.steps = 0
+        self._spans = {}
+
+    def on_llm_start(self, serialized, prompts, *, run_id=None, **kwargs):
+        self.steps += 1
+        self._spans[run_id] = self.trace.open_span("llm", self.parent, step=self.steps)
+
+    def on_llm_end(self, response, *, run_id=None, **kwargs):
+        span = self._spans.pop(run_id, None)
+        if span is not None:
+            self.trace.close_span(span, **token_usage(chain.from_iterable(response.generations)))
+
+    def on_llm_error(self, error, *, run_id=None, **kwargs):
+        span = self._spans.pop(run_id, None)
+        if span is not None:
+            self.trace.close_span(span, error=str(error))
+
+    def on_tool_start(self, serialized, input_str, *, run_id=None, **kwargs):
+        name = (serialized or {}).get("name", "tool")
+        self._spans[run_id] = self.trace.open_span(f"tool:{name}", self.parent, step=self.steps)
+
+    def on_tool_end(self, output, *, run_id=None, **kwargs):
+        span = self._spans.pop(run_id, None)
+        if span is not None:
+            self.trace.close_span(span)
+
+    def on_tool_error(self, error, *, run_id=None, **kwargs):
+        span = self._spans.pop(run_id, None)
+        if span is not None:
+            self.trace.close_span(span, error=str(error))
@@ -1,11 +1,18 @@
-import streamlit as st
 import os
-import json
-import base64
-from agent import run_agent
-from utils import save_code_to_files, create_zip, extract_component_blocks
-from history import save_chat_to_history
-from agent import domain as detect_domain  
+import streamlit as st
+from agent import generation_cache, EXECUTION_MODES, EXECUTION_MODE
+from jobs import generation_service, QueueFullError, ACTIVE_STATES
+from utils import save_code_to_files, package_files, get_package, read_output_files, prefetch_image_url
+from history import save_chat_to_history, get_history_store, delete_chat_from_history
+from workspace import workspace_manager, new_workspace_id
+from preview import render_preview
+from fences import FenceParser
+from domains import detect_domain, DOMAIN_PLACEHOLDERS
+from sections import EDITABLE_FIELDS, changed_fields
+from postprocess import postprocess_site
+from tracing import tracer
+from search import search_chats
+from llm_client import llm_executor
 
 if "started" not in st.session_state:
     st.session_state.started = False
@@ -116,119 +123,165 @@ if not st.session_state.get("started"):
     st.stop()
 
 
-def list_chats():
-    history_file = "history/chat_history.json"
-    if os.path.exists(history_file):
-        with open(history_file, "r") as f:
-            history = json.load(f)
-        return {str(i): f"{item['prompt'][:30]}..." for i, item in enumerate(history)}
-    return {}
+history_store = get_history_store()
+
+if "workspace_id" not in st.session_state:
+    st.session_state["workspace_id"] = new_workspace_id()
+workspace_dir = workspace_manager.path(st.session_state["workspace_id"])
+
+
+CHATS_PER_PAGE = 10
+
+
+def list_chats(page=0):
+    return {
+        entry["id"]: f"{entry['prompt'][:30]}..."
+        for entry in history_store.page(page, CHATS_PER_PAGE)
+    }
 
 def delete_chat(chat_id):
-    history_file = "history/chat_history.json"
-    if os.path.exists(history_file):
-        with open(history_file, "r") as f:
-            history = json.load(f)
-        if 0 <= int(chat_id) < len(history):
-            del history[int(chat_id)]
-            with open(history_file, "w") as f:
-                json.dump(history, f, indent=4)
+    delete_chat_from_history(chat_id, history_store)
 
 st.sidebar.title("WebWeaver AI")
 
 if st.sidebar.button("➕ New Chat"):
 
-    keep_keys = {"started"}
+    if "job_id" in st.session_state:
+        generation_service.cancel(st.session_state["job_id"])
+
+    keep_keys = {"started", "workspace_id"}
     for key in list(st.session_state.keys()):
         if key not in keep_keys:
             del st.session_state[key]
 
-    if os.path.exists("outputs/index.html"):
-        os.remove("outputs/index.html")
+    workspace_manager.reset(st.session_state["workspace_id"])
 
     st.session_state["new_chat_started"] = True
     st.rerun()
 
 st.sidebar.header("🗂️ Your Chats")
-chat_list = list_chats()
+search_query = st.sidebar.text_input(
+    "🔎 Search chats", key="chat_search", placeholder="Words from a prompt or the generated code"
+)
+snippets = {}
+if search_query.strip():
+    results = search_chats(search_query)
+    chat_list = {result["id"]: f"{result['prompt'][:30]}..." for result in results}
+    snippets = {result["id"]: " ".join(result["snippet"].split()) for result in results}
+    total_pages = 1
+else:
+    total_pages = max(1, -(-history_store.count() // CHATS_PER_PAGE))
+    chat_page = min(st.session_state.get("chat_page", 0), total_pages - 1)
+    chat_list = list_chats(chat_page)
 st.sidebar.markdown("---")
+if search_query.strip() and not chat_list:
+    st.sidebar.caption("No chats match your search.")
 for chat_id, label in chat_list.items():
     cols = st.sidebar.columns([0.8, 0.2])
     with cols[0]:
-        if st.button(label, key=chat_id):
-            st.session_state["selected_chat_id"] = int(chat_id)
+        if st.button(label, key=f"chat_{chat_id}"):
+            st.session_state["selected_chat_id"] = chat_id
             st.session_state["load_chat"] = True
+        if chat_id in snippets:
+            st.caption(snippets[chat_id])
     with cols[1]:
         if st.button("🗑️", key=f"delete_{chat_id}"):
             delete_chat(chat_id)
             st.rerun()
 
+if total_pages > 1:
+    prev_col, page_col, next_col = st.sidebar.columns([0.3, 0.4, 0.3])
+    with prev_col:
+        if st.button("◀", key="chat_page_prev", disabled=chat_page == 0):
+            st.session_state["chat_page"] = chat_page - 1
+            st.rerun()
+    with page_col:
+        st.markdown(f"Page {chat_page + 1} of {total_pages}")
+    with next_col:
+        if st.button("▶", key="chat_page_next", disabled=chat_page >= total_pages - 1):
+            st.session_state["chat_page"] = chat_page + 1
+            st.rerun()
+
+st.sidebar.markdown("---")
+st.sidebar.header("⚙️ Settings")
+generation_mode = st.sidebar.selectbox(
+    "Generation mode",
+    EXECUTION_MODES,
+    index=EXECUTION_MODES.index(EXECUTION_MODE),
+    help="agent: the ReAct agent calls each tool itself. direct: tools run locally and the site is generated in one LLM call."
+)
+postprocess_options = {
+    "minify": st.sidebar.checkbox("Minify output", help="Minify the HTML/CSS/JS files and drop duplicate CSS rules."),
+    "inline_critical": st.sidebar.checkbox(
+        "Inline critical CSS",
+        help="Inline the header/hero styles in each page and load style.css without blocking rendering."
+    ),
+}
+show_debug_panel = st.sidebar.checkbox("🐞 Debug panel", help="Show where the time and tokens of the last generation went.")
+
+
+def continue_editing(chat):
+    # Makes a chat from history the current site, so its sections can be edited.
+    output_paths, language = save_code_to_files(chat["response"], chat["prompt"], output_dir=workspace_dir)
+    st.session_state["response"] = chat["response"]
+    st.session_state["output_paths"] = output_paths
+    st.session_state["language"] = language
+    st.session_state["package_digest"], _ = package_files(read_output_files(output_paths))
+    st.session_state["generated_prompt"] = chat["prompt"]
+    st.session_state["chat_id"] = chat["id"]
+    st.session_state["generated_values"] = {}
+    st.session_state["size_report"] = None
+
+
+def prepare_new_tab_link(preview, keep_chat_open=False):
+    # Encodes the page as a data: URL only when asked; the cached render keeps it for later reruns.
+    # Assigned so Streamlit's magic doesn't write the URL onto the page.
+    _ = preview.data_url
+    if keep_chat_open:
+        st.session_state["load_chat"] = True
+
+
+def restore_output_files():
+    # The workspace of a tab left idle may have been cleaned up; write the current site into it again.
+    output_paths, language = save_code_to_files(
+        st.session_state["response"], st.session_state.get("generated_prompt", ""), output_dir=workspace_dir
+    )
+    if any(postprocess_options.values()) and language != "react":
+        postprocess_site(
+            output_paths, minify=postprocess_options["minify"], inline_critical=postprocess_options["inline_critical"]
+        )
+    st.session_state["output_paths"] = output_paths
+    st.session_state["language"] = language
 
-chat_history = []
-history_file = "history/chat_history.json"
-if os.path.exists(history_file):
-    with open(history_file, "r") as f:
-        chat_history = json.load(f)
 
+selected_chat = None
 if st.session_state.get("load_chat") and "selected_chat_id" in st.session_state:
-    i = st.session_state["selected_chat_id"]
-    selected_chat = chat_history[i]
+    selected_chat = history_store.get(st.session_state["selected_chat_id"])
+    if selected_chat is None:
+        st.warning("That chat is no longer available.")
+        st.session_state["load_chat"] = False
 
+if selected_chat is not None:
     st.markdown("## Previously Selected Chat")
     st.markdown(f"**Prompt:** {selected_chat['prompt']}")
+    st.button("✏️ Continue editing this site", on_click=continue_editing, args=(selected_chat,))
 
-    code_blocks = extract_component_blocks(selected_chat["response"])
+    preview = render_preview(selected_chat["response"], reload_once=True)
 
     st.markdown("### 🧱 HTML")
-    st.code("\n\n".join(code_blocks.get("html", [])), language="html")
+    st.code(preview.joined("html"), language="html")
     st.markdown("### 🎨 CSS")
-    st.code("\n\n".join(code_blocks.get("css", [])), language="css")
+    st.code(preview.joined("css"), language="css")
     st.markdown("### ⚙️ JavaScript")
-    st.code("\n\n".join(code_blocks.get("js", [])), language="javascript")
-
-    html_code = "\n".join(code_blocks.get("html", [])).replace("```html", "").replace("```", "")
-    css_code = "\n".join(code_blocks.get("css", []))
-    js_code = "\n".join(code_blocks.get("js", []))
-
-    
-    full_html = f"""<!DOCTYPE html>
-<html lang="en">
-<head>
-  <meta charset="UTF-8">
-  <title>Web Preview</title>
-  <style>{css_code}</style>
-</head>
-<body>
-{html_code}
-
-<script>
-// Run only if not in iframe (i.e., opened in new tab)
-  if (window.top === window.self) {{
-    if (!window.location.hash.includes("#reloaded")) {{
-      window.location.href = window.location.href + "#reloaded";
-      window.location.reload();
-    }}
-  }}
-</script>
-
-<script>{js_code}</script>
-</body>
-</html>
-"""
-
-    if not os.path.exists("outputs"):
-        os.makedirs("outputs")
-    with open("outputs/index.html", "w", encoding="utf-8") as f:
-        f.write(full_html)
+    st.code(preview.joined("js"), language="javascript")
 
     st.markdown("### 🔍 Live Preview")
     try:
-        with open("outputs/index.html", "r", encoding="utf-8") as f:
-            html_output = f.read()
-        b64_html = base64.b64encode(html_output.encode()).decode()
-        href = f'data:text/html;base64,{b64_html}'
-        st.markdown(f'<a href="{href}" target="_blank">🌐 Open Website in New Tab</a>', unsafe_allow_html=True)
-        st.components.v1.html(html_output, height=800, scrolling=True)
+        if preview.has_data_url:
+            st.markdown(f'<a href="{preview.data_url}" target="_blank">🌐 Open Website in New Tab</a>', unsafe_allow_html=True)
+        else:
+            st.button("🔗 Create new-tab link", key="history_new_tab", on_click=prepare_new_tab_link, args=(preview, True))
+        st.components.v1.html(preview.full_html, height=800, scrolling=True)
         st.info("Note: Navigation links may not work in preview. Download for full functionality.")
     except Exception as e:
         st.error(f"Preview failed: {e}")
@@ -249,45 +302,41 @@ if st.session_state.get("new_chat_started"):
 user_prompt = st.text_area("Enter a detailed Prompt to Build Website", height=150, key="user_prompt")
 
 
-domain_placeholders = {
-    "restaurant": {
-        "header": "🔹 Brand or site name (e.g. Fresh Bites | Premium Food Delivery)",
-        "hero": "🔹 Main message (e.g. Delicious meals delivered fresh to your door — Order now!)",
-        "footer": "🔹 Contact info (e.g. © 2025 Fresh Bites | info@freshbites.com)"
-    },
-    "portfolio": {
-        "header": "🔹 Your name or role (e.g. Jane Doe | Full Stack Developer)",
-        "hero": "🔹 Personal intro (e.g. Building elegant, scalable web apps.)",
-        "footer": "🔹 Email/social (e.g. jane@example.com | © 2025 Jane Doe)"
-    },
-    "ecommerce": {
-        "header": "🔹 Shop name (e.g. UrbanStyle | Fashion for Everyone)",
-        "hero": "🔹 Sales headline (e.g. Up to 50% off on all summer wear!)",
-        "footer": "🔹 Support info (e.g. help@urbanstyle.com | Refund Policy)"
-    },
-    "agency": {
-        "header": "🔹 Agency name (e.g. Pixel Perfect | Creative Studio)",
-        "hero": "🔹 Value proposition (e.g. We craft beautiful, user-first digital solutions.)",
-        "footer": "🔹 Legal/contact (e.g. © 2025 Pixel Perfect | contact@agency.com)"
-    },
-    "blog": {
-        "header": "🔹 Blog name (e.g. MindSparks | Thoughts & Stories)",
-        "hero": "🔹 Tagline (e.g. Sharing insights on tech, life, and more.)",
-        "footer": "🔹 Author info (e.g. © 2025 MindSparks by Alex Smith)"
-    },
-    "generic": {
-        "header": "🔹 Website name (e.g. WebNova | Modern Solutions)",
-        "hero": "🔹 Hero tagline (e.g. Unlock powerful digital tools in one click)",
-        "footer": "🔹 Footer info (e.g. contact@webnova.com | © 2025 WebNova)"
-    }
-}
+def similar_chats(prompt, exclude=()):
+    from similarity import find_similar_chats  # pulls in NumPy, so only once a prompt is typed
+    return find_similar_chats(prompt, exclude=exclude) if prompt.strip() else []
+
 
-domain_type = detect_domain.run(user_prompt).lower() if user_prompt else "generic"
-placeholders = domain_placeholders.get(domain_type, domain_placeholders["generic"])
+def reuse_chat(chat_id):
+    chat = history_store.get(chat_id)
+    if chat is None:
+        st.session_state["generation_notice"] = ("warning", "That chat is no longer available.")
+        return
+    continue_editing(chat)
+    st.session_state["generation_notice"] = (
+        "success", "♻️ Loaded a similar past site. Use ✏️ Update Sections to apply your own text."
+    )
+
+
+# The site on screen is not a suggestion for itself.
+similar_matches = (
+    similar_chats(user_prompt, exclude={st.session_state.get("chat_id")}) if "job_id" not in st.session_state else []
+)
+if similar_matches:
+    with st.expander(f"♻️ Similar past sites ({len(similar_matches)})", expanded=True):
+        st.caption("Start from one of these instead of generating a new site.")
+        for match in similar_matches:
+            text_col, button_col = st.columns([0.8, 0.2])
+            text_col.markdown(f"**{match.score:.0%}** · {match.prompt}")
+            button_col.button("Reuse", key=f"reuse_{match.chat_id}", on_click=reuse_chat, args=(match.chat_id,))
+
+domain_type = detect_domain(user_prompt) if user_prompt else "generic"
+placeholders = DOMAIN_PLACEHOLDERS.get(domain_type, DOMAIN_PLACEHOLDERS["generic"])
 
 
 st.markdown("### 🎨 Theme + Content Customization")
-theme = st.selectbox("Select Theme", ["Light", "Dark", "Modern Blue", "Minimal"], key="theme")
+THEMES = ["Light", "Dark", "Modern Blue", "Minimal"]
+theme = st.selectbox("Select Theme", THEMES, key="theme")
 
 header = st.text_input("Header Text", placeholder=placeholders["header"], key="header")
 hero = st.text_area("Hero Text", placeholder=placeholders["hero"], key="hero")
@@ -301,62 +350,225 @@ custom_values = {
 }
 
 
-if st.button("🚀 Generate Website"):
-    with st.spinner("Building the website..."):
+regenerate = st.checkbox(
+    "♻️ Regenerate (ignore cached result)",
+    help="Identical prompts and settings are normally served from the generation cache."
+)
+
+def finalize_generation(user_prompt, custom_values, domain_type, image_future, output_dir, postprocess_options,
+                        save_history=True):
+    # Runs on a generation worker, so it must not touch st.session_state.
+    def finalize(response):
+        with tracer.span("image_wait"):
+            image_url = image_future.result()
+        output_paths, language = save_code_to_files(response, user_prompt, image_url=image_url, output_dir=output_dir)
+        size_report = None
+        if any(postprocess_options.values()) and language != "react":
+            size_report = postprocess_site(
+                output_paths, minify=postprocess_options["minify"], inline_critical=postprocess_options["inline_critical"]
+            )
+        digest, _ = package_files(read_output_files(output_paths))
+        chat_id = save_chat_to_history(user_prompt, response, domain=domain_type) if save_history else None
+        return {
+            "chat_id": chat_id,
+            "output_paths": output_paths,
+            "language": language,
+            "package_digest": digest,
+            "generated_prompt": user_prompt,
+            "generated_values": dict(custom_values),
+            "size_report": size_report,
+        }
+    return finalize
+
+
+def finalize_variants(user_prompt, variants, domain_type, image_future, output_dir, postprocess_options):
+    # Each variant gets its own output directory; only the one the user picks goes to the history.
+    finalizers = [
+        finalize_generation(
+            user_prompt, variant["custom_values"], domain_type, image_future,
+            os.path.join(output_dir, f"variant-{index}"), postprocess_options, save_history=False
+        )
+        for index, variant in enumerate(variants)
+    ]
+    return lambda response, index: finalizers[index](response)
+
+
+def use_variant(variant):
+    st.session_state["response"] = variant["response"]
+    st.session_state.update(variant["output"])
+    st.session_state["theme"] = variant["output"]["generated_values"]["theme"]
+    prompt = variant["output"]["generated_prompt"]
+    st.session_state["chat_id"] = save_chat_to_history(prompt, variant["response"], domain=detect_domain(prompt))
+    st.session_state["generation_notice"] = ("success", f"🎉 Using the {variant['label']} design.")
+
+
+def render_variants(variants, choosable=False):
+    for index, (column, variant) in enumerate(zip(st.columns(len(variants)), variants)):
+        with column:
+            st.markdown(f"**{variant['label']}**")
+            if variant["status"] == "running":
+                st.caption("Generating...")
+            elif variant["status"] == "failed":
+                st.error(variant["error"])
+            else:
+                st.components.v1.html(render_preview(variant["response"]).full_html, height=450, scrolling=True)
+                if choosable:
+                    st.button("✅ Use this design", key=f"use_variant_{index}", on_click=use_variant, args=(variant,))
+
+
+@st.fragment(run_every=0.5)
+def generation_progress():
+    job = generation_service.status(st.session_state["job_id"])
+    if job is not None and job["status"] in ACTIVE_STATES:
+        action = "Updating" if job["kind"] == "edit" else "Building"
+        label = "Waiting for a free worker..." if job["status"] == "queued" else f"{action} the website... ({job['elapsed']:.0f}s)"
+        if job["kind"] == "variants" and job["status"] == "running":
+            finished = sum(1 for variant in job["variants"] if variant["status"] != "running")
+            label = f"Building {len(job['variants'])} variants... {finished} finished ({job['elapsed']:.0f}s)"
+        with st.status(label, expanded=False):
+            for step in job["steps"]:
+                st.write(step)
+        if job["kind"] == "variants":
+            render_variants(job["variants"])
+        else:
+            # One parser per job, fed only the text streamed since the last poll.
+            stream = st.session_state.get("answer_stream")
+            if stream is None or stream["job_id"] != job["id"]:
+                stream = st.session_state["answer_stream"] = {"job_id": job["id"], "parser": FenceParser(), "consumed": 0}
+            stream["parser"].feed(job["answer"][stream["consumed"]:])
+            stream["consumed"] = len(job["answer"])
+            blocks = stream["parser"].component_blocks()
+            for lang, language in (("html", "html"), ("css", "css"), ("js", "javascript")):
+                if blocks.get(lang):
+                    st.code("\n\n".join(blocks[lang]), language=language)
+        if st.button("✖️ Cancel generation", key="cancel_generation"):
+            generation_service.cancel(job["id"])
+        return
+
+    del st.session_state["job_id"]
+    st.session_state.pop("answer_stream", None)
+    if job is not None:
+        st.session_state["trace_id"] = job["trace_id"]
+    if job is None:
+        st.session_state["generation_notice"] = ("error", "The generation expired before it could be shown.")
+    elif job["status"] == "done" and job["kind"] == "variants":
+        st.session_state["variants"] = job["variants"]
+        ready = sum(1 for variant in job["variants"] if variant["status"] == "done")
+        st.session_state["generation_notice"] = (
+            "success", f"🎉 {ready} of {len(job['variants'])} variants are ready. Pick one below."
+        )
+        workspace_manager.cleanup(keep={st.session_state["workspace_id"]})
+    elif job["status"] == "done":
+        st.session_state["response"] = job["response"]
+        st.session_state.update(job["output"])
+        done_message = "🎉 Your website has been updated!" if job["kind"] == "edit" else "🎉 Your website has been generated!"
+        st.session_state["generation_notice"] = ("success", done_message)
+        workspace_manager.cleanup(keep={st.session_state["workspace_id"]})
+    elif job["status"] == "cancelled":
+        st.session_state["generation_notice"] = ("warning", "Generation cancelled.")
+    else:
+        st.session_state["generation_notice"] = ("error", f"Error while generating website: {job['error']}")
+    st.rerun()
+
+
+if st.button("🚀 Generate Website", disabled="job_id" in st.session_state):
+    image_future = prefetch_image_url(user_prompt)
+    try:
+        st.session_state["job_id"] = generation_service.submit(
+            user_prompt,
+            custom_values,
+            use_cache=not regenerate,
+            mode=generation_mode,
+            finalize=finalize_generation(
+                user_prompt, custom_values, domain_type, image_future, workspace_dir, postprocess_options
+            )
+        )
+    except QueueFullError as e:
+        st.error(str(e))
+
+with st.expander("🧪 Compare themes side by side"):
+    variant_themes = st.multiselect(
+        "Themes to generate",
+        THEMES,
+        default=[theme],
+        help="Generates one version of the site per theme at the same time, sharing the research step."
+    )
+    if st.button("🧪 Generate Variants", disabled="job_id" in st.session_state or len(variant_themes) < 2):
+        variants = [
+            {"custom_values": {**custom_values, "theme": variant_theme}, "label": variant_theme}
+            for variant_theme in variant_themes
+        ]
+        image_future = prefetch_image_url(user_prompt)
         try:
-            response = run_agent(user_prompt, custom_values)
-        except Exception as e:
-            st.error("Error while generating website")
+            st.session_state["job_id"] = generation_service.submit_variants(
+                user_prompt,
+                variants,
+                use_cache=not regenerate,
+                finalize=finalize_variants(
+                    user_prompt, variants, domain_type, image_future, workspace_dir, postprocess_options
+                )
+            )
+            st.session_state.pop("variants", None)
+        except QueueFullError as e:
             st.error(str(e))
-        else:
-            output_paths, language = save_code_to_files(response, user_prompt)
-            st.session_state["response"] = response
-            st.session_state["output_paths"] = output_paths
-            st.session_state["language"] = language
-            save_chat_to_history(user_prompt, response)
-            st.success("🎉 Your website has been generated!")
+
+if "response" in st.session_state and "job_id" not in st.session_state:
+    sections = st.multiselect(
+        "✏️ Sections to update",
+        EDITABLE_FIELDS,
+        default=changed_fields(st.session_state.get("generated_values", {}), custom_values),
+        help="Regenerates only these parts of the current site from the text above; the rest stays as it is."
+    )
+    if st.button("✏️ Update Sections", disabled=not sections):
+        edit_prompt = st.session_state.get("generated_prompt") or user_prompt
+        image_future = prefetch_image_url(edit_prompt)
+        try:
+            st.session_state["job_id"] = generation_service.submit_edit(
+                st.session_state["response"],
+                edit_prompt,
+                custom_values,
+                sections,
+                finalize=finalize_generation(
+                    edit_prompt, custom_values, detect_domain(edit_prompt), image_future, workspace_dir, postprocess_options
+                )
+            )
+        except QueueFullError as e:
+            st.error(str(e))
+
+if "job_id" in st.session_state:
+    generation_progress()
+
+if "generation_notice" in st.session_state:
+    level, message = st.session_state.pop("generation_notice")
+    getattr(st, level)(message)
+
+if "variants" in st.session_state and "job_id" not in st.session_state:
+    st.markdown("## 🧪 Variants")
+    render_variants(st.session_state["variants"], choosable=True)
+
+cache_stats = generation_cache.stats()
+st.caption(f"Generation cache: {cache_stats['hits']} hits · {cache_stats['misses']} misses · {cache_stats['entries']} stored")
 
 if "response" in st.session_state:
     st.markdown("## 🔍 Preview")
     view_mode = st.radio("View:", ["Live Preview", "Code"], horizontal=True)
 
-    code_blocks = extract_component_blocks(st.session_state["response"])
+    preview = render_preview(st.session_state["response"])
 
     if view_mode == "Code":
-        if code_blocks.get("html"):
+        if preview.blocks.get("html"):
             st.markdown("#### 🧱 HTML")
-            st.code("\n\n".join(code_blocks["html"]), language="html")
-        if code_blocks.get("css"):
+            st.code(preview.joined("html"), language="html")
+        if preview.blocks.get("css"):
             st.markdown("#### 🎨 CSS")
-            st.code("\n\n".join(code_blocks["css"]), language="css")
-        if code_blocks.get("js"):
+            st.code(preview.joined("css"), language="css")
+        if preview.blocks.get("js"):
             st.markdown("#### ⚙️ JavaScript")
-            st.code("\n\n".join(code_blocks["js"]), language="javascript")
+            st.code(preview.joined("js"), language="javascript")
     else:
-        html_code = "\n".join(code_blocks.get("html", [])).replace("```html", "").replace("```", "")
-        css_code = "\n".join(code_blocks.get("css", []))
-        js_code = "\n".join(code_blocks.get("js", []))
-
-        full_html = f"""<!DOCTYPE html>
-<html lang="en">
-<head>
-  <meta charset="UTF-8">
-  <title>Web Preview</title>
-  <style>{css_code}</style>
-</head>
-<body>
-{html_code}
-<script>{js_code}</script>
-</body>
-</html>
-"""
-
-        with open("outputs/index.html", "w", encoding="utf-8") as f:
-            f.write(full_html)
-
-        b64_html = base64.b64encode(full_html.encode()).decode()
-        href = f'data:text/html;base64,{b64_html}'
-        st.markdown(f'''
+        if preview.has_data_url:
+            href = preview.data_url
+            st.markdown(f'''
     <a href="{href}" target="_blank" style="
         display: inline-block;
         padding: 10px 20px;
@@ -374,14 +586,65 @@ if "response" in st.session_state:
     </a>
     <span style="font-size: 18px; color: red;">  (Please reload the page once after it opens)</span>
 ''', unsafe_allow_html=True)
-        st.components.v1.html(full_html, height=800, scrolling=True)
+        else:
+            st.button("🔗 Create new-tab link", key="preview_new_tab", on_click=prepare_new_tab_link, args=(preview,))
+        st.components.v1.html(preview.full_html, height=800, scrolling=True)
         st.info("Note: Preview may not support full navigation. Download ZIP for full experience.")
 
-    zip_path = create_zip(st.session_state["output_paths"])
-    with open(zip_path, "rb") as f:
-        st.download_button(
-            label="⬇️ Download Website ZIP",
-            data=f,
-            file_name="website_package.zip",
-            mime="application/zip"
+    size_report = st.session_state.get("size_report")
+    if size_report:
+        change = size_report["after"] / size_report["before"] - 1 if size_report["before"] else 0
+        st.caption(
+            f"Post-processed: {size_report['before'] / 1024:.1f} KB → {size_report['after'] / 1024:.1f} KB ({change:+.0%})"
         )
+
+    zip_bytes = get_package(st.session_state.get("package_digest", ""))
+    if zip_bytes is None:
+        if not all(os.path.exists(path) for path in st.session_state["output_paths"]):
+            restore_output_files()
+        digest, zip_bytes = package_files(read_output_files(st.session_state["output_paths"]))
+        st.session_state["package_digest"] = digest
+    st.download_button(
+        label="⬇️ Download Website ZIP",
+        data=zip_bytes,
+        file_name="website_package.zip",
+        mime="application/zip"
+    )
+
+
+def render_debug_panel(trace):
+    tokens = trace.tokens()
+    llm_calls = sum(1 for span in trace.spans if span["name"] == "llm")
+    executor = llm_executor.metrics()
+    st.caption(
+        f"{trace.name} · {trace.status} · {trace.duration or 0:.2f}s total · {llm_calls} LLM calls · "
+        f"{tokens['input']} input / {tokens['output']} output tokens · "
+        f"executor: {executor['retries']} retries, {executor['hedged']} hedged"
+    )
+    st.dataframe(
+        [
+            {"stage": name, "seconds": round(seconds, 3), "spans": count}
+            for name, (seconds, count) in trace.stage_totals().items()
+        ],
+        hide_index=True
+    )
+    depths = {}
+    rows = []
+    for span in sorted(trace.spans, key=lambda span: span["start"]):
+        depths[span["id"]] = depths.get(span["parent"], -1) + 1
+        rows.append({
+            "span": "· " * depths[span["id"]] + span["name"],
+            "start (s)": round(span["start"], 3),
+            "duration (s)": round(span["duration"], 3) if span["duration"] is not None else None,
+            "details": ", ".join(f"{key}={value}" for key, value in span["attrs"].items()),
+        })
+    st.dataframe(rows, hide_index=True)
+
+
+if show_debug_panel:
+    st.markdown("## 🐞 Debug")
+    last_trace = tracer.get(st.session_state.get("trace_id"))
+    if last_trace is None:
+        st.info("Generate a website to see its stage breakdown here.")
+    else:
+        render_debug_panel(last_trace)
@@ -0,0 +1,177 @@
+"""Headless batch generation: build many sites from a CSV or JSONL job file.
+
+Each row needs a `prompt` and may set `theme`, `header`, `hero`, `footer`
+and an `id`. Every job is written to its own directory under `--out`, and
+finished jobs are recorded in `progress.jsonl` so an interrupted run can be
+resumed by running the same command again.
+
+    python batch.py jobs.csv --out batch_outputs --concurrency 4 --rpm 30
+    python batch.py jobs.jsonl --fake-llm   # offline, no API keys needed
+"""
+import os
+import csv
+import sys
+import json
+import time
+import argparse
+import threading
+import statistics
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from langchain_core.callbacks import BaseCallbackHandler
+
+import agent
+from postprocess import postprocess_site
+from ratelimit import RateLimiter
+from stats import percentile
+from tracing import tracer
+from utils import save_code_to_files, create_zip, prefetch_image_url
+
+DEFAULT_VALUES = {"theme": "Light", "header": "", "hero": "", "footer": ""}
+
+
+class RateLimitHandler(BaseCallbackHandler):
+    """Blocks before every LLM call until the shared rate limiter allows it."""
+
+    def __init__(self, limiter):
+        self.limiter = limiter
+
+    def on_llm_start(self, *args, **kwargs):
+        self.limiter.acquire()
+
+
+def load_jobs(path):
+    with open(path, "r", encoding="utf-8", newline="") as f:
+        if path.endswith(".jsonl"):
+            rows = [json.loads(line) for line in f if line.strip()]
+        else:
+            rows = list(csv.DictReader(f))
+    jobs = []
+    for number, row in enumerate(rows, start=1):
+        if not (row.get("prompt") or "").strip():
+            continue
+        jobs.append({
+            "id": str(row.get("id") or f"{number:05d}"),
+            "prompt": row["prompt"],
+            "custom_values": {name: row.get(name) or default for name, default in DEFAULT_VALUES.items()}
+        })
+    return jobs
+
+
+def load_progress(progress_file):
+    done = {}
+    if os.path.exists(progress_file):
+        with open(progress_file, "r", encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    record = json.loads(line)
+                    done[record["id"]] = record
+    return done
+
+
+def run_job(job, out_dir, mode, use_cache, callbacks, postprocess=None):
+    with tracer.trace("batch_job", job_id=job["id"]) as trace:
+        result = _run_job(job, out_dir, mode, use_cache, callbacks, postprocess)
+        trace.status = "ok" if result["status"] == "ok" else "error"
+    result["trace_id"] = trace.id
+    return result
+
+
+def _run_job(job, out_dir, mode, use_cache, callbacks, postprocess):
+    job_dir = os.path.join(out_dir, job["id"])
+    start = time.perf_counter()
+    image_future = prefetch_image_url(job["prompt"])
+    response = agent.run_agent(job["prompt"], job["custom_values"], use_cache=use_cache, mode=mode, callbacks=callbacks)
+    generated = time.perf_counter()
+    if response.startswith("Agent failed"):
+        return {"id": job["id"], "status": "failed", "error": response, "latency": generated - start}
+    output_paths, language = save_code_to_files(response, job["prompt"], image_url=image_future.result(), output_dir=job_dir)
+    size_report = postprocess_site(output_paths, **postprocess) if postprocess and language != "react" else None
+    with tracer.span("zip"):
+        create_zip(output_paths, output_dir=job_dir)
+    return {
+        "id": job["id"],
+        "status": "ok",
+        "language": language,
+        "output_dir": job_dir,
+        "latency": time.perf_counter() - start,
+        "generation_latency": generated - start,
+        "bytes": [size_report["before"], size_report["after"]] if size_report else None,
+    }
+
+
+def run_batch(jobs, out_dir, concurrency=4, rpm=60, mode=None, use_cache=True, postprocess=None):
+    os.makedirs(out_dir, exist_ok=True)
+    progress_file = os.path.join(out_dir, "progress.jsonl")
+    done = {job_id for job_id, record in load_progress(progress_file).items() if record["status"] == "ok"}
+    pending = [job for job in jobs if job["id"] not in done]
+    callbacks = [RateLimitHandler(RateLimiter(rpm))] if rpm else []
+    progress_lock = threading.Lock()
+    results = []
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        futures = {pool.submit(run_job, job, out_dir, mode, use_cache, callbacks, postprocess): job for job in pending}
+        for future in as_completed(futures):
+            job = futures[future]
+            try:
+                result = future.result()
+            except Exception as e:
+                result = {"id": job["id"], "status": "failed", "error": str(e), "latency": 0.0}
+            results.append(result)
+            with progress_lock, open(progress_file, "a", encoding="utf-8") as f:
+                f.write(json.dumps(result) + "\n")
+            print(f"[{len(results)}/{len(pending)}] {result['id']}: {result['status']} ({result['latency']:.2f}s)")
+    wall = time.perf_counter() - start
+
+    latencies = [r["latency"] for r in results if r["status"] == "ok"]
+    report = {
+        "jobs": len(jobs),
+        "skipped": len(jobs) - len(pending),
+        "succeeded": len(latencies),
+        "failed": len(results) - len(latencies),
+        "wall_seconds": round(wall, 3),
+        "throughput_per_min": round(len(latencies) / wall * 60, 2) if wall else 0.0,
+        "latency_p50": round(statistics.median(latencies), 3) if latencies else None,
+        "latency_p95": round(percentile(latencies, 0.95), 3) if latencies else None,
+        "latency_max": round(max(latencies), 3) if latencies else None,
+    }
+    with open(os.path.join(out_dir, "report.json"), "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=4)
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate many websites from a CSV/JSONL job file.")
+    parser.add_argument("jobs", help="CSV or JSONL file with prompt/theme/header/hero/footer columns")
+    parser.add_argument("--out", default="batch_outputs", help="directory for per-job outputs and progress")
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--rpm", type=float, default=60, help="max LLM calls per minute (0 disables)")
+    parser.add_argument("--mode", choices=agent.EXECUTION_MODES, default=agent.EXECUTION_MODE)
+    parser.add_argument("--no-cache", action="store_true", help="bypass the generation cache")
+    parser.add_argument("--minify", action="store_true", help="minify HTML/CSS/JS and dedupe CSS rules")
+    parser.add_argument("--inline-critical-css", action="store_true", help="inline header/hero CSS into every page")
+    parser.add_argument("--fake-llm", action="store_true", help="use the offline fake model instead of Gemini")
+    parser.add_argument("--fake-latency", type=float, default=0.5)
+    parser.add_argument("--fake-size", type=int, default=4000)
+    args = parser.parse_args(argv)
+
+    if args.fake_llm:
+        from fake_llm import FakeChatModel
+        agent.set_llm(FakeChatModel(latency=args.fake_latency, response_size=args.fake_size))
+
+    report = run_batch(
+        load_jobs(args.jobs),
+        args.out,
+        concurrency=args.concurrency,
+        rpm=args.rpm,
+        mode=args.mode,
+        use_cache=not args.no_cache,
+        postprocess={"minify": args.minify, "inline_critical": args.inline_critical_css}
+        if args.minify or args.inline_critical_css else None
+    )
+    print(json.dumps(report, indent=4))
+    return 0 if report["failed"] == 0 else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
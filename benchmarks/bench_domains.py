@@ -0,0 +1,113 @@
+"""Accuracy and latency of the domain classifier on a labelled prompt corpus.
+
+Compares `domains.classify_domain` with the original substring checks:
+
+    python benchmarks/bench_domains.py
+    python benchmarks/bench_domains.py --verbose   # list every misclassified prompt
+"""
+import os
+import sys
+import time
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from domains import classify_domain  # noqa: E402
+
+CORPUS = [
+    ("A modern restaurant website with a menu, about and contact sections", "restaurant"),
+    ("Landing page for a cozy cafe that serves brunch", "restaurant"),
+    ("Website for a family-run pizzeria with online table booking", "restaurant"),
+    ("A bakery site showing our breads, cakes and opening hours", "restaurant"),
+    ("Coffee shop homepage with seasonal drinks", "restaurant"),
+    ("Site for a food truck that posts its weekly location", "restaurant"),
+    ("Italian bistro with reservations and a wine list", "restaurant"),
+    ("Catering company site with menus for weddings", "restaurant"),
+    ("My portfolio as a frontend developer", "portfolio"),
+    ("Personal website for a wedding photographer", "portfolio"),
+    ("Showcase of my projects and resume as a UX designer", "portfolio"),
+    ("An online CV for a data scientist", "portfolio"),
+    ("Portfolio site for a freelance illustrator with case studies", "portfolio"),
+    ("A personal site for a blogger who also takes photography commissions, with a portfolio of shoots", "portfolio"),
+    ("A tech blog with posts about Python", "blog"),
+    ("Travel blogging site with stories from Asia", "blog"),
+    ("Online magazine about sustainable living", "blog"),
+    ("A recipe blog with step-by-step articles", "blog"),
+    ("Newsletter archive and articles by an independent writer", "blog"),
+    ("Website for a blogger writing about personal finance", "blog"),
+    ("An ecommerce store for handmade jewellery", "ecommerce"),
+    ("Online shop for sneakers with a shopping cart and checkout", "ecommerce"),
+    ("E-commerce site for organic skincare products", "ecommerce"),
+    ("Marketplace where artists sell prints", "ecommerce"),
+    ("A shopping site for kids' clothes with a summer sale", "ecommerce"),
+    ("Boutique clothing storefront", "ecommerce"),
+    ("Webshop for a coffee roaster selling beans online", "ecommerce"),
+    ("A creative agency website with our services and clients", "agency"),
+    ("Digital marketing agency landing page", "agency"),
+    ("Branding studio homepage with our team", "agency"),
+    ("Consultancy offering cloud migration to enterprise clients", "agency"),
+    ("Website for a small consulting firm", "agency"),
+    ("A landing page for a mobile app", "generic"),
+    ("Event page for a developer conference workshop", "generic"),
+    ("Homepage for a non-profit that plants trees", "generic"),
+    ("Documentation site for an open source library", "generic"),
+    ("A woodworking workshop schedule", "generic"),
+    ("Website for a local football club", "generic"),
+    ("A SaaS dashboard landing page with pricing", "generic"),
+    ("Wedding invitation site with RSVP form", "generic"),
+]
+
+
+def legacy_detect_domain(prompt):
+    prompt = prompt.lower()
+    if "restaurant" in prompt or "cafe" in prompt:
+        return "restaurant"
+    elif "portfolio" in prompt:
+        return "portfolio"
+    elif "blog" in prompt:
+        return "blog"
+    elif "ecommerce" in prompt or "shop" in prompt:
+        return "ecommerce"
+    elif "agency" in prompt:
+        return "agency"
+    else:
+        return "generic"
+
+
+def evaluate(name, classify, verbose):
+    correct = 0
+    for prompt, expected in CORPUS:
+        predicted = classify(prompt)
+        correct += predicted == expected
+        if verbose and predicted != expected:
+            print(f"  [{name}] expected {expected}, got {predicted}: {prompt}")
+    return correct / len(CORPUS)
+
+
+def per_call_us(classify, rounds):
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for prompt, _ in CORPUS:
+            classify(prompt)
+    return (time.perf_counter() - start) / (rounds * len(CORPUS)) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rounds", type=int, default=200)
+    parser.add_argument("--verbose", action="store_true")
+    args = parser.parse_args()
+
+    uncached = classify_domain.__wrapped__
+    rows = [
+        ("legacy", evaluate("legacy", legacy_detect_domain, args.verbose), per_call_us(legacy_detect_domain, args.rounds)),
+        ("classifier", evaluate("classifier", lambda p: uncached(p).domain, args.verbose), per_call_us(uncached, args.rounds)),
+        ("memoized", evaluate("memoized", lambda p: classify_domain(p).domain, False), per_call_us(classify_domain, args.rounds)),
+    ]
+    print(f"{'classifier':<12}{'accuracy':>10}{'µs/call':>10}")
+    for name, accuracy, latency in rows:
+        print(f"{name:<12}{accuracy:>10.1%}{latency:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
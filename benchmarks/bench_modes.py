@@ -0,0 +1,81 @@
+"""Compare latency, LLM calls and token usage of the agent and direct modes.
+
+Runs live against Gemini (and Firecrawl, if configured), bypassing the
+generation cache. Failed runs are counted but left out of the numbers:
+
+    python benchmarks/bench_modes.py --runs 3
+    python benchmarks/bench_modes.py --fake-llm   # offline
+"""
+import os
+import sys
+import time
+import argparse
+import statistics
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from agent import EXECUTION_MODES, run_agent, set_llm  # noqa: E402
+from agent_callbacks import TokenUsageHandler  # noqa: E402
+
+DEFAULT_PROMPT = "A modern restaurant website with a menu, about and contact sections"
+DEFAULT_VALUES = {
+    "theme": "Modern Blue",
+    "header": "Fresh Bites | Premium Food Delivery",
+    "hero": "Delicious meals delivered fresh to your door",
+    "footer": "© 2025 Fresh Bites | info@freshbites.com"
+}
+
+
+def bench_mode(mode, prompt, runs):
+    latencies, usages, failed = [], [], 0
+    for _ in range(runs):
+        usage = TokenUsageHandler()
+        start = time.perf_counter()
+        response = run_agent(prompt, DEFAULT_VALUES, use_cache=False, mode=mode, callbacks=[usage])
+        if response.startswith("Agent failed"):
+            print(f"[{mode}] {response}")
+            failed += 1
+            continue
+        latencies.append(time.perf_counter() - start)
+        usages.append(usage)
+    row = {"mode": mode, "runs": runs, "failed": failed}
+    if latencies:
+        row.update({
+            "p50_s": statistics.median(latencies),
+            "max_s": max(latencies),
+            "llm_calls": statistics.mean(u.llm_calls for u in usages),
+            "input_tokens": statistics.mean(u.input_tokens for u in usages),
+            "output_tokens": statistics.mean(u.output_tokens for u in usages),
+        })
+    return row
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--prompt", default=DEFAULT_PROMPT)
+    parser.add_argument("--modes", nargs="+", default=list(EXECUTION_MODES), choices=EXECUTION_MODES)
+    parser.add_argument("--fake-llm", action="store_true", help="use the offline fake model instead of Gemini")
+    parser.add_argument("--fake-latency", type=float, default=0.5)
+    args = parser.parse_args()
+
+    if args.fake_llm:
+        from fake_llm import FakeChatModel
+        set_llm(FakeChatModel(latency=args.fake_latency))
+
+    rows = [bench_mode(mode, args.prompt, args.runs) for mode in args.modes]
+    print(f"{'mode':<8}{'ok/runs':>9}{'p50 (s)':>10}{'max (s)':>10}{'LLM calls':>11}{'in tok':>10}{'out tok':>10}")
+    for row in rows:
+        ok = f"{row['runs'] - row['failed']}/{row['runs']}"
+        if row["failed"] == row["runs"]:
+            print(f"{row['mode']:<8}{ok:>9}  (every run failed)")
+            continue
+        print(
+            f"{row['mode']:<8}{ok:>9}{row['p50_s']:>10.2f}{row['max_s']:>10.2f}{row['llm_calls']:>11.1f}"
+            f"{row['input_tokens']:>10.0f}{row['output_tokens']:>10.0f}"
+        )
+    sys.exit(1 if any(row["failed"] for row in rows) else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+"""Micro-benchmark for the fenced code block parser on large responses.
+
+Compares the regex parsers the app used before `fences.FenceParser` with the
+single-pass parser, both on a whole response and fed in small stream chunks:
+
+    python benchmarks/bench_parser.py --size 1000000
+"""
+import os
+import re
+import sys
+import time
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fences import FenceParser  # noqa: E402
+from utils import extract_component_blocks, split_code_blocks  # noqa: E402
+
+
+def legacy_extract_component_blocks(response):
+    blocks = {"html": [], "css": [], "js": [], "jsx": [], "others": []}
+    matches = re.findall(r"```(\w+)?\s*([\s\S]*?)```", response)
+    if matches:
+        for lang, code in matches:
+            lang = (lang or "html").lower().strip()
+            if lang == "javascript":
+                lang = "js"
+            code = re.sub(r"^`{1,3}\s*\w*", "", code)
+            code = re.sub(r"`{1,3}$", "", code).strip()
+            blocks.get(lang, blocks["others"]).append(code)
+    else:
+        cleaned = re.sub(r"^`{1,3}\s*\w*", "", response)
+        cleaned = re.sub(r"`{1,3}$", "", cleaned).strip()
+        blocks["html"].append(cleaned)
+    return blocks
+
+
+def legacy_split_code_blocks(response):
+    html_code, css_code, js_code = "", "", ""
+    matches = re.findall(r"```(\w+)?\s*([\s\S]*?)```", response)
+    if not matches:
+        html_code = response.strip()
+    else:
+        for lang, code in matches:
+            lang = (lang or "html").lower()
+            code = code.strip()
+            if lang == "html":
+                html_code += code + "\n\n"
+            elif lang == "css":
+                css_code += code + "\n\n"
+            elif lang in ("js", "javascript"):
+                js_code += code + "\n\n"
+    return html_code.strip(), css_code.strip(), js_code.strip()
+
+
+def make_response(size):
+    html = "<section class=\"card\"><h2>Title</h2><p>Some generated copy for the page.</p></section>\n"
+    css = ".card { padding: 1rem; margin: 0 auto; border-radius: 8px; }\n"
+    js = "document.querySelectorAll('.card').forEach(c => c.classList.add('ready'));\n"
+    parts = ["Thought: I now know the final answer\nFinal Answer:\n"]
+    total = 0
+    while total < size:
+        for lang, line in (("html", html), ("css", css), ("javascript", js)):
+            block = f"```{lang}\n{line * 40}```\n\n"
+            parts.append(block)
+            total += len(block)
+    return "".join(parts)
+
+
+def timed(label, func, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    print(f"{label:<44}{best * 1000:>10.2f} ms")
+    return best
+
+
+def stream(response, chunk_size):
+    parser = FenceParser()
+    for i in range(0, len(response), chunk_size):
+        parser.feed(response[i:i + chunk_size])
+    return parser.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--size", type=int, default=1_000_000, help="approximate response size in characters")
+    parser.add_argument("--chunk", type=int, default=16, help="stream chunk size in characters")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    response = make_response(args.size)
+    assert extract_component_blocks(response) == legacy_extract_component_blocks(response)
+    print(f"response: {len(response) / 1e6:.2f} M chars, {response.count('```') // 2} blocks")
+
+    timed("legacy extract_component_blocks", lambda: legacy_extract_component_blocks(response), args.repeat)
+    timed("legacy split_code_blocks", lambda: legacy_split_code_blocks(response), args.repeat)
+    timed("extract_component_blocks (FenceParser)", lambda: extract_component_blocks(response), args.repeat)
+    timed("split_code_blocks (FenceParser)", lambda: split_code_blocks(response), args.repeat)
+    timed(f"FenceParser streamed in {args.chunk}-char chunks", lambda: stream(response, args.chunk), args.repeat)
+
+
+if __name__ == "__main__":
+    main()
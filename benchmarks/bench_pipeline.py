@@ -0,0 +1,171 @@
+"""Offline end-to-end benchmark of the generation pipeline.
+
+Drives the real `run_agent` → `save_code_to_files` → `create_zip` →
+`save_chat_to_history` path for N concurrent sessions, with the fake chat
+model standing in for Gemini and local stub servers for Firecrawl and
+Pexels. Caches and history live in a temporary directory, so nothing
+touches the working tree and no API keys are needed:
+
+    python benchmarks/bench_pipeline.py --concurrency 1 4 8 --sessions 24
+    python benchmarks/bench_pipeline.py --save baseline.json
+    python benchmarks/bench_pipeline.py --compare baseline.json --tolerance 0.2
+
+Reports p50/p95 session latency, throughput, the tracemalloc peak and the
+mean time per pipeline stage (from the tracer's spans). `--compare` exits
+non-zero when p95 latency or the memory peak regresses beyond `--tolerance`.
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import statistics
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from stats import percentile  # noqa: E402
+from stub_services import FirecrawlStub, PexelsStub, work_env  # noqa: E402
+
+PROMPTS = [
+    "A modern restaurant website with a menu, about and contact sections",
+    "Portfolio for a freelance photographer with a gallery",
+    "Personal blog about hiking with recent posts",
+    "Online store selling handmade candles with a product grid",
+    "Digital marketing agency landing page with services and clients",
+    "Cozy cafe and bakery site with opening hours",
+    "Minimal portfolio for a UX designer with case studies",
+    "Tech blog with articles and a newsletter signup",
+]
+DEFAULT_VALUES = {
+    "theme": "Modern Blue",
+    "header": "Fresh Bites | Premium Food Delivery",
+    "hero": "Delicious meals delivered fresh to your door",
+    "footer": "© 2025 Fresh Bites | info@freshbites.com"
+}
+# Stages shown in the breakdown, in pipeline order.
+STAGES = ["cache_lookup", "domain", "analyse_websites", "firecrawl", "seo_tags", "pexels",
+          "generate", "llm", "parse", "render", "write", "zip", "history_save"]
+
+
+def run_session(number, mode, out_root):
+    """One user's generation, end to end; returns (seconds, trace)."""
+    from agent import run_agent
+    from domains import detect_domain
+    from history import save_chat_to_history
+    from tracing import tracer
+    from utils import create_zip, prefetch_image_url, save_code_to_files
+
+    prompt = f"{PROMPTS[number % len(PROMPTS)]} #{number}"
+    output_dir = os.path.join(out_root, f"session-{number}")
+    start = time.perf_counter()
+    with tracer.trace("bench_session") as trace:
+        image_future = prefetch_image_url(prompt)
+        response = run_agent(prompt, DEFAULT_VALUES, use_cache=False, mode=mode)
+        if response.startswith("Agent failed"):
+            raise RuntimeError(response)
+        output_paths, _ = save_code_to_files(response, prompt, image_url=image_future.result(), output_dir=output_dir)
+        with tracer.span("zip"):
+            create_zip(output_paths, output_dir=output_dir)
+        save_chat_to_history(prompt, response, domain=detect_domain(prompt))
+    return time.perf_counter() - start, trace
+
+
+def run_level(concurrency, sessions, mode, out_root, first_session=0):
+    tracemalloc.reset_peak()
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        futures = [
+            pool.submit(run_session, first_session + n, mode, os.path.join(out_root, f"c{concurrency}"))
+            for n in range(sessions)
+        ]
+        results = [future.result() for future in futures]
+    wall = time.perf_counter() - start
+    latencies = [seconds for seconds, _ in results]
+    stages = {}
+    for _, trace in results:
+        for name, (seconds, _count) in trace.stage_totals().items():
+            stages[name] = stages.get(name, 0.0) + seconds
+    return {
+        "concurrency": concurrency,
+        "sessions": sessions,
+        "p50_s": statistics.median(latencies),
+        "p95_s": percentile(latencies, 0.95),
+        "throughput_per_s": sessions / wall,
+        "peak_mib": tracemalloc.get_traced_memory()[1] / 2 ** 20,
+        "stages_ms": {name: seconds / sessions * 1000 for name, seconds in stages.items()},
+    }
+
+
+def compare(rows, baseline, tolerance):
+    """Rows whose p95 latency or memory peak is worse than the baseline by more than `tolerance`."""
+    previous = {row["concurrency"]: row for row in baseline}
+    regressions = []
+    for row in rows:
+        old = previous.get(row["concurrency"])
+        if old is None:
+            continue
+        for metric in ("p95_s", "peak_mib"):
+            if row[metric] > old[metric] * (1 + tolerance):
+                regressions.append(f"c={row['concurrency']} {metric}: {old[metric]:.3f} -> {row[metric]:.3f}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 8])
+    parser.add_argument("--sessions", type=int, default=16, help="sessions per concurrency level")
+    parser.add_argument("--mode", choices=("agent", "direct"), default="direct")
+    parser.add_argument("--llm-latency", type=float, default=0.3, help="seconds per fake LLM call")
+    parser.add_argument("--response-size", type=int, default=12000, help="approximate fake response size in chars")
+    parser.add_argument("--http-latency", type=float, default=0.05, help="seconds per stub Firecrawl/Pexels request")
+    parser.add_argument("--save", help="write the results to this JSON file")
+    parser.add_argument("--compare", help="baseline JSON from --save to check for regressions")
+    parser.add_argument("--tolerance", type=float, default=0.2)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix="bench-pipeline-") as work, \
+            FirecrawlStub(latency=args.http_latency) as firecrawl, \
+            PexelsStub(latency=args.http_latency) as pexels:
+        os.environ.update(work_env(work, firecrawl, pexels))
+        import agent
+        from fake_llm import FakeChatModel
+        agent.set_llm(FakeChatModel(latency=args.llm_latency, response_size=args.response_size))
+
+        # Warm imports and thread pools so the first level isn't charged for them.
+        run_session(-1, args.mode, os.path.join(work, "warmup"))
+        tracemalloc.start()
+        rows = []
+        for concurrency in args.concurrency:
+            rows.append(run_level(concurrency, args.sessions, args.mode, os.path.join(work, "out"),
+                                  first_session=len(rows) * args.sessions))
+        tracemalloc.stop()
+        print(f"stub requests: firecrawl={firecrawl.requests} pexels={pexels.requests}\n")
+
+    print(f"{'sessions':>9}{'conc':>6}{'p50 (s)':>10}{'p95 (s)':>10}{'sess/s':>9}{'peak MiB':>10}")
+    for row in rows:
+        print(
+            f"{row['sessions']:>9}{row['concurrency']:>6}{row['p50_s']:>10.3f}{row['p95_s']:>10.3f}"
+            f"{row['throughput_per_s']:>9.2f}{row['peak_mib']:>10.1f}"
+        )
+    print(f"\n{'stage (ms/session)':<20}" + "".join(f"{'c=' + str(row['concurrency']):>10}" for row in rows))
+    for stage in STAGES:
+        if any(stage in row["stages_ms"] for row in rows):
+            print(f"{stage:<20}" + "".join(f"{row['stages_ms'].get(stage, 0.0):>10.1f}" for row in rows))
+
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as f:
+            json.dump(rows, f, indent=4)
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            regressions = compare(rows, json.load(f), args.tolerance)
+        for line in regressions:
+            print(f"REGRESSION {line}")
+        sys.exit(1 if regressions else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""Show what the retention policy does to history size, startup and reads.
+
+Saves N synthetic chats (fake-model responses) into a throwaway JSONL
+history, once unbounded and once compacted every `--interval` saves as
+`save_chat_to_history` does, then reports the bytes on disk, the time and
+memory needed to open the store and render the first sidebar page, and
+`get` latency for a hot and a cold (compressed) chat:
+
+    python benchmarks/bench_retention.py --chats 1000 5000 --max-entries 500
+"""
+import os
+import sys
+import time
+import argparse
+import tempfile
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fake_llm import fake_site  # noqa: E402
+from history import JsonlHistoryStore  # noqa: E402
+from retention import HISTORY_CODEC, RetentionPolicy  # noqa: E402
+
+
+def disk_bytes(path):
+    return sum(os.path.getsize(os.path.join(root, name)) for root, _, names in os.walk(path) for name in names)
+
+
+def fill(history_dir, chats, response_size, policy, interval):
+    store = JsonlHistoryStore(history_dir)
+    ids = []
+    for number in range(chats):
+        prompt = f"site number {number}"
+        ids.append(store.append({"prompt": prompt, "response": fake_site(prompt, response_size)}))
+        if policy and (number + 1) % interval == 0:
+            store.compact(policy)
+    return ids
+
+
+def open_store(history_dir):
+    """Seconds and peak MiB to open the store and list the first page, as app startup does."""
+    tracemalloc.start()
+    start = time.perf_counter()
+    store = JsonlHistoryStore(history_dir)
+    store.count()
+    store.page(0, 10)
+    seconds = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1] / 2 ** 20
+    tracemalloc.stop()
+    return store, seconds, peak
+
+
+def get_ms(store, chat_id, rounds=20):
+    start = time.perf_counter()
+    for _ in range(rounds):
+        store.get(chat_id)
+    return (time.perf_counter() - start) / rounds * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--chats", type=int, nargs="+", default=[1000, 5000])
+    parser.add_argument("--response-size", type=int, default=12000)
+    parser.add_argument("--max-entries", type=int, default=500)
+    parser.add_argument("--hot-entries", type=int, default=50)
+    parser.add_argument("--interval", type=int, default=25)
+    parser.add_argument("--codec", choices=("gzip", "zstd"), default=HISTORY_CODEC)
+    args = parser.parse_args()
+    policy = RetentionPolicy(args.max_entries, 0, 0, args.hot_entries, args.codec)
+
+    print(f"{'chats':>6}  {'history':<10}{'MiB on disk':>12}{'open (ms)':>11}{'open MiB':>10}{'hot get (ms)':>14}{'cold get (ms)':>15}")
+    for chats in args.chats:
+        for label, active in (("unbounded", None), ("retained", policy)):
+            with tempfile.TemporaryDirectory(prefix="bench-retention-") as history_dir:
+                ids = fill(history_dir, chats, args.response_size, active, args.interval)
+                store, seconds, peak = open_store(history_dir)
+                live = [entry["id"] for entry in store.entries()]
+                print(
+                    f"{chats:>6}  {label:<10}{disk_bytes(history_dir) / 2 ** 20:>12.1f}{seconds * 1000:>11.1f}"
+                    f"{peak:>10.2f}{get_ms(store, ids[-1]):>14.3f}{get_ms(store, live[0]):>15.3f}"
+                )
+
+
+if __name__ == "__main__":
+    main()
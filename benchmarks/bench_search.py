@@ -0,0 +1,84 @@
+"""Time full-text chat search against a linear scan of the history.
+
+Fills a throwaway history with synthetic chats (fake-model responses),
+then measures the one-off backfill of `search.SearchIndex`, one
+incremental save, and ranked queries; the baseline loads every chat and
+checks each query word with a substring test:
+
+    python benchmarks/bench_search.py --sizes 1000 10000 30000
+"""
+import os
+import sys
+import time
+import random
+import argparse
+import tempfile
+import statistics
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fake_llm import fake_site  # noqa: E402
+from history import JsonlHistoryStore  # noqa: E402
+from search import SearchIndex  # noqa: E402
+
+SUBJECTS = ["restaurant", "cafe", "bakery", "photographer", "designer", "hiking blog", "tech blog",
+            "candle shop", "shoe store", "marketing agency", "law firm", "dentist", "yoga studio"]
+EXTRAS = ["about", "contact", "menu", "gallery", "pricing", "team", "testimonials", "faq", "services"]
+QUERIES = ["restaurant menu", "photographer gallery", "yoga", "candle shop pricing", "font-family", "testimonials"]
+
+
+def synthetic_prompt(rng):
+    return f"{rng.choice(SUBJECTS)} website with {', '.join(rng.sample(EXTRAS, rng.randint(1, 3)))}"
+
+
+def scan(store, query):
+    words = query.lower().split()
+    matches = []
+    for entry in store.entries():
+        record = store.get(entry["id"])
+        text = f"{record['prompt']}\n{record['response']}".lower()
+        if all(word in text for word in words):
+            matches.append(record["id"])
+    return matches
+
+
+def timed_ms(func, *args):
+    start = time.perf_counter()
+    func(*args)
+    return (time.perf_counter() - start) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000])
+    parser.add_argument("--response-size", type=int, default=4000)
+    parser.add_argument("--rounds", type=int, default=20, help="times each query is repeated")
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    print(f"{'chats':>7}{'backfill (s)':>14}{'save (ms)':>11}{'p50 (ms)':>10}{'p95 (ms)':>10}{'scan (ms)':>11}")
+    for size in args.sizes:
+        with tempfile.TemporaryDirectory(prefix="bench-search-") as history_dir:
+            store = JsonlHistoryStore(history_dir)
+            for _ in range(size):
+                prompt = synthetic_prompt(rng)
+                store.append({"prompt": prompt, "response": fake_site(prompt, args.response_size)})
+
+            index = SearchIndex(store)
+            backfill = timed_ms(index.sync) / 1000
+            prompt = synthetic_prompt(rng)
+            chat_id = store.append({"prompt": prompt, "response": fake_site(prompt, args.response_size)})
+            save_ms = timed_ms(index.add, store.get(chat_id))
+
+            latencies = sorted(
+                timed_ms(index.search, query) for query in QUERIES for _ in range(args.rounds)
+            )
+            scan_ms = statistics.mean(timed_ms(scan, store, query) for query in QUERIES)
+            print(
+                f"{size:>7}{backfill:>14.2f}{save_ms:>11.2f}{statistics.median(latencies):>10.2f}"
+                f"{latencies[int(0.95 * (len(latencies) - 1))]:>10.2f}{scan_ms:>11.1f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
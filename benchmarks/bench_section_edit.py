@@ -0,0 +1,75 @@
+"""Compare a full regeneration with a section-level edit after a text tweak.
+
+Generates a site once, changes one custom value, then measures latency and
+tokens for regenerating everything versus `agent.edit_section`:
+
+    python benchmarks/bench_section_edit.py --runs 3 --section hero
+    python benchmarks/bench_section_edit.py --fake-llm   # offline
+"""
+import os
+import sys
+import time
+import argparse
+import statistics
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import agent  # noqa: E402
+from agent_callbacks import TokenUsageHandler  # noqa: E402
+from sections import EDITABLE_FIELDS  # noqa: E402
+
+DEFAULT_PROMPT = "A modern restaurant website with a menu, about and contact sections"
+DEFAULT_VALUES = {
+    "theme": "Modern Blue",
+    "header": "Fresh Bites | Premium Food Delivery",
+    "hero": "Delicious meals delivered fresh to your door",
+    "footer": "© 2025 Fresh Bites | info@freshbites.com"
+}
+EDITED_VALUES = {
+    "theme": "Dark",
+    "header": "Fresh Bites | Farm to Table",
+    "hero": "Seasonal menus, cooked tonight and at your door in 30 minutes",
+    "footer": "© 2025 Fresh Bites | hello@freshbites.com"
+}
+
+
+def measure(func, *args):
+    usage = TokenUsageHandler()
+    start = time.perf_counter()
+    func(*args, callbacks=[usage])
+    return time.perf_counter() - start, usage.total_tokens
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--section", choices=EDITABLE_FIELDS, default="hero")
+    parser.add_argument("--mode", choices=agent.EXECUTION_MODES, default="direct")
+    parser.add_argument("--fake-llm", action="store_true", help="use the offline fake model instead of Gemini")
+    args = parser.parse_args()
+
+    if args.fake_llm:
+        from fake_llm import FakeChatModel
+        agent.set_llm(FakeChatModel(latency=0.5, response_size=12000))
+
+    response = agent.run_agent(DEFAULT_PROMPT, DEFAULT_VALUES, use_cache=False, mode=args.mode)
+    if response.startswith("Agent failed"):
+        sys.exit(response)
+    values = dict(DEFAULT_VALUES, **{args.section: EDITED_VALUES[args.section]})
+
+    full = [
+        measure(agent.run_agent, DEFAULT_PROMPT, values, False, args.mode)
+        for _ in range(args.runs)
+    ]
+    edits = [
+        measure(agent.edit_section, response, DEFAULT_PROMPT, values, args.section, False)
+        for _ in range(args.runs)
+    ]
+
+    print(f"{'':<16}{'p50 (s)':>10}{'tokens':>10}")
+    for label, rows in (("full regenerate", full), (f"edit {args.section}", edits)):
+        print(f"{label:<16}{statistics.median(r[0] for r in rows):>10.2f}{statistics.mean(r[1] for r in rows):>10.0f}")
+
+
+if __name__ == "__main__":
+    main()
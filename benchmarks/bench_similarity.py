@@ -0,0 +1,68 @@
+"""Time the near-duplicate prompt index at history sizes users actually reach.
+
+Builds `similarity.PromptIndex` from synthetic prompts and measures the
+bootstrap, one incremental add, and query latency (the first query after a
+change rebuilds the scoring arrays, so both cases are reported):
+
+    python benchmarks/bench_similarity.py --sizes 1000 10000 50000
+"""
+import os
+import sys
+import time
+import random
+import argparse
+import statistics
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from similarity import PromptIndex  # noqa: E402
+
+SUBJECTS = ["restaurant", "cafe", "bakery", "photographer", "designer", "hiking blog", "tech blog",
+            "candle shop", "shoe store", "marketing agency", "law firm", "dentist", "yoga studio"]
+EXTRAS = ["about", "contact", "menu", "gallery", "pricing", "team", "testimonials", "faq", "blog", "services"]
+STYLES = ["modern", "minimal", "dark", "playful", "elegant", "bold"]
+
+
+def synthetic_prompt(rng):
+    extras = rng.sample(EXTRAS, rng.randint(1, 4))
+    return f"{rng.choice(STYLES)} {rng.choice(SUBJECTS)} website with {', '.join(extras)} sections"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 50000])
+    parser.add_argument("--queries", type=int, default=200)
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    print(f"{'prompts':>8}{'build (s)':>11}{'add (ms)':>10}{'1st query':>11}{'p50 (ms)':>10}{'p95 (ms)':>10}")
+    for size in args.sizes:
+        prompts = [synthetic_prompt(rng) for _ in range(size)]
+        start = time.perf_counter()
+        index = PromptIndex()
+        for number, prompt in enumerate(prompts):
+            index.add(str(number), prompt)
+        build = time.perf_counter() - start
+
+        start = time.perf_counter()
+        index.add("new", synthetic_prompt(rng))
+        add_ms = (time.perf_counter() - start) * 1000
+        start = time.perf_counter()
+        index.query(synthetic_prompt(rng))
+        first_ms = (time.perf_counter() - start) * 1000
+
+        latencies = []
+        for _ in range(args.queries):
+            query = synthetic_prompt(rng)
+            start = time.perf_counter()
+            index.query(query)
+            latencies.append((time.perf_counter() - start) * 1000)
+        latencies.sort()
+        print(
+            f"{size:>8}{build:>11.2f}{add_ms:>10.3f}{first_ms:>11.2f}"
+            f"{statistics.median(latencies):>10.2f}{latencies[int(0.95 * (len(latencies) - 1))]:>10.2f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
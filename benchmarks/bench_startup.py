@@ -0,0 +1,131 @@
+"""Measure cold-start cost: module imports and time until the app first paints.
+
+Every measurement runs in a fresh interpreter so nothing is already imported,
+inside a temporary working directory so the caches it creates stay out of the
+repo:
+
+    python benchmarks/bench_startup.py --runs 5
+    python benchmarks/bench_startup.py --serve   # also time `streamlit run app.py`
+
+`--serve` connects to the app's websocket like a browser tab and times the
+first rendered element and the end of the first script run.
+"""
+import os
+import ast
+import sys
+import time
+import asyncio
+import argparse
+import tempfile
+import statistics
+import subprocess
+
+from stub_services import work_env
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# What the first generation pulls in later, inside agent.get_llm/get_agent.
+GENERATION_MODULES = ["langchain.agents", "langchain_google_genai", "chat_models", "agent_callbacks"]
+
+
+def startup_modules(path=os.path.join(ROOT, "app.py")):
+    """Modules app.py imports at module level, i.e. before its first paint."""
+    with open(path, "r", encoding="utf-8") as f:
+        tree = ast.parse(f.read())
+    modules = []
+    for node in tree.body:
+        if isinstance(node, ast.Import):
+            names = [alias.name for alias in node.names]
+        elif isinstance(node, ast.ImportFrom) and not node.level:
+            names = [node.module]
+        else:
+            continue
+        modules += [name for name in names if name not in modules]
+    return modules
+
+
+def import_seconds(modules, work):
+    code = (
+        "import sys, time\n"
+        f"sys.path.insert(0, {ROOT!r})\n"
+        "start = time.perf_counter()\n"
+        f"for name in {modules!r}:\n"
+        "    __import__(name)\n"
+        "print(time.perf_counter() - start)\n"
+    )
+    env = dict(os.environ, GEMINI_API_KEY=os.environ.get("GEMINI_API_KEY", "dummy"), **work_env(work))
+    result = subprocess.run([sys.executable, "-c", code], cwd=work, env=env, capture_output=True, text=True, check=True)
+    return float(result.stdout.strip().splitlines()[-1])
+
+
+async def _first_run(port, timeout):
+    from websockets.asyncio.client import connect
+    from streamlit.proto.BackMsg_pb2 import BackMsg
+    from streamlit.proto.ForwardMsg_pb2 import ForwardMsg
+
+    deadline = time.perf_counter() + timeout
+    while True:
+        try:
+            websocket = await connect(f"ws://localhost:{port}/_stcore/stream", max_size=None)
+            break
+        except OSError:
+            if time.perf_counter() > deadline:
+                raise TimeoutError(f"Streamlit did not start within {timeout}s")
+            await asyncio.sleep(0.05)
+    async with websocket:
+        request = BackMsg()
+        request.rerun_script.query_string = ""
+        await websocket.send(request.SerializeToString())
+        first_paint = None
+        async for data in websocket:
+            message = ForwardMsg()
+            message.ParseFromString(data)
+            kind = message.WhichOneof("type")
+            if kind == "delta" and first_paint is None:
+                first_paint = time.perf_counter()
+            elif kind == "script_finished":
+                return first_paint, time.perf_counter()
+    raise RuntimeError("Streamlit closed the connection before the script finished")
+
+
+def serve_seconds(port, work, timeout=60):
+    """Seconds from `streamlit run app.py` to the first element and to the end of the first run."""
+    start = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, "-m", "streamlit", "run", os.path.join(ROOT, "app.py"), "--server.headless", "true",
+         "--server.port", str(port)],
+        cwd=work, env=dict(os.environ, **work_env(work)), stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    try:
+        first_paint, finished = asyncio.run(asyncio.wait_for(_first_run(port, timeout), timeout))
+        return first_paint - start, finished - start
+    finally:
+        process.terminate()
+        process.wait()
+
+
+def report(label, samples):
+    print(f"{label:<28}{statistics.median(samples) * 1000:>10.0f}{max(samples) * 1000:>10.0f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--serve", action="store_true", help="also time `streamlit run app.py` until it first paints")
+    parser.add_argument("--port", type=int, default=8599)
+    args = parser.parse_args()
+
+    print(f"{'':<28}{'p50 (ms)':>10}{'max (ms)':>10}")
+    modules = startup_modules()
+    with tempfile.TemporaryDirectory(prefix="bench-startup-") as work:
+        report("app imports", [import_seconds(modules, work) for _ in range(args.runs)])
+        report("first generation imports", [import_seconds(GENERATION_MODULES, work) for _ in range(args.runs)])
+        if args.serve:
+            samples = [serve_seconds(args.port, work) for _ in range(args.runs)]
+            report("first paint", [paint for paint, _ in samples])
+            report("first run finished", [finished for _, finished in samples])
+    print(f"\napp imports: {', '.join(modules)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""Time multi-page site rendering: per-page `build_page` calls vs `templates.render_site`.
+
+The legacy loop rebuilds the nav and formats the full document once per page;
+`render_site` builds the nav once and shares it across pages. Both must produce
+the same files:
+
+    python benchmarks/bench_templates.py --pages 3 50
+"""
+import os
+import re
+import sys
+import time
+import argparse
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fake_llm import fake_site  # noqa: E402
+from templates import build_pages, render_site, write_files  # noqa: E402
+from utils import extract_component_blocks  # noqa: E402
+
+IMAGE_URL = "https://picsum.photos/800/400"
+
+
+def legacy_build_page(title, body, css="", js="", nav_links="", image_url=""):
+    nav = f"<nav>{nav_links}</nav>" if nav_links else ""
+
+    if image_url and '<section id="hero"' in body:
+        body = re.sub(
+            r'(<section\s+[^>]*id=["\']hero["\'][^>]*)(>)',
+            rf'\1 style="background-image: url({image_url}); background-size: cover; background-position: center;"\2',
+            body,
+            flags=re.IGNORECASE
+        )
+
+    return f"""<!DOCTYPE html>
+<html lang="en">
+<head>
+  <meta charset="UTF-8" />
+  <meta name="viewport" content="width=device-width, initial-scale=1.0">
+  <title>{title}</title>
+  <link rel="stylesheet" href="style.css">
+</head>
+<body>
+  {nav}
+  {body}
+  <script src="script.js"></script>
+</body>
+</html>
+"""
+
+
+def legacy_render(pages, css, js, image_url):
+    nav_links = "".join(f'<a href="{page.filename}">{page.title}</a> ' for page in pages)
+    files = {}
+    for page in pages:
+        files[page.filename] = legacy_build_page(page.title, page.body, css, js, nav_links, image_url)
+    files["style.css"] = css
+    files["script.js"] = js
+    return files
+
+
+def legacy_write(files, output_dir):
+    for name, text in files.items():
+        with open(os.path.join(output_dir, name), "w", encoding="utf-8") as f:
+            f.write(text)
+
+
+def per_site_ms(func, rounds):
+    start = time.perf_counter()
+    for _ in range(rounds):
+        func()
+    return (time.perf_counter() - start) / rounds * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--pages", type=int, nargs="+", default=[3, 12, 50])
+    parser.add_argument("--size", type=int, default=20000, help="approximate response size in chars")
+    parser.add_argument("--rounds", type=int, default=50)
+    args = parser.parse_args()
+
+    blocks = extract_component_blocks(fake_site("bench", args.size))
+    html, css, js = (blocks[kind][0] for kind in ("html", "css", "js"))
+    html = html.replace('<section id="hero">', '<section id="hero" class="hero">')
+
+    print(f"{'pages':>6}{'legacy render':>15}{'render_site':>13}{'legacy write':>14}{'write_files':>13}  (ms/site)")
+    with tempfile.TemporaryDirectory() as out:
+        for count in args.pages:
+            pages = build_pages([f"page-{n}" for n in range(count - 1)], html)
+            files = render_site(pages, css, js, IMAGE_URL)
+            assert files == legacy_render(pages, css, js, IMAGE_URL)
+            print(
+                f"{count:>6}"
+                f"{per_site_ms(lambda: legacy_render(pages, css, js, IMAGE_URL), args.rounds):>15.3f}"
+                f"{per_site_ms(lambda: render_site(pages, css, js, IMAGE_URL), args.rounds):>13.3f}"
+                f"{per_site_ms(lambda: legacy_write(files, out), args.rounds):>14.3f}"
+                f"{per_site_ms(lambda: write_files(files, out), args.rounds):>13.3f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""Compare multi-variant generation with running the variants one by one.
+
+Builds K themed versions of one prompt with `agent.stream_variants` (one
+shared tool pass, concurrent LLM calls) and with K sequential direct-mode
+`run_agent` calls, using the fake chat model and the local Firecrawl/Pexels
+stubs. Reports wall time, time to the first finished variant and the LLM
+calls each approach made:
+
+    python benchmarks/bench_variants.py --variants 2 4 --llm-latency 0.5
+"""
+import os
+import sys
+import time
+import argparse
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from stub_services import FirecrawlStub, PexelsStub, work_env  # noqa: E402
+
+PROMPT = "A modern restaurant website with a menu, about and contact sections"
+THEMES = ["Light", "Dark", "Modern Blue", "Minimal"]
+DEFAULT_VALUES = {
+    "header": "Fresh Bites | Premium Food Delivery",
+    "hero": "Delicious meals delivered fresh to your door",
+    "footer": "© 2025 Fresh Bites | info@freshbites.com"
+}
+
+
+def variant_values(count):
+    return [{**DEFAULT_VALUES, "theme": THEMES[number % len(THEMES)]} for number in range(count)]
+
+
+def sequential(count):
+    from agent import run_agent
+    start = time.perf_counter()
+    first = None
+    for values in variant_values(count):
+        run_agent(PROMPT, values, use_cache=False, mode="direct")
+        first = first or time.perf_counter() - start
+    return time.perf_counter() - start, first
+
+
+def parallel(count):
+    from agent import stream_variants
+    start = time.perf_counter()
+    first = None
+    for kind, _payload in stream_variants(PROMPT, [{"custom_values": values} for values in variant_values(count)],
+                                          use_cache=False):
+        if kind == "variant":
+            first = first or time.perf_counter() - start
+    return time.perf_counter() - start, first
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--variants", type=int, nargs="+", default=[2, 3, 4])
+    parser.add_argument("--llm-latency", type=float, default=0.5, help="seconds per fake LLM call")
+    parser.add_argument("--http-latency", type=float, default=0.05, help="seconds per stub Firecrawl/Pexels request")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix="bench-variants-") as work, \
+            FirecrawlStub(latency=args.http_latency) as firecrawl, \
+            PexelsStub(latency=args.http_latency) as pexels:
+        os.environ.update(work_env(work, firecrawl, pexels))
+        import agent
+        import crawler
+        from fake_llm import FakeChatModel
+        model = FakeChatModel(latency=args.llm_latency)
+        agent.set_llm(model)
+
+        print(f"{'variants':>9}  {'approach':<11}{'wall (s)':>10}{'first (s)':>11}{'llm calls':>11}")
+        for count in args.variants:
+            for label, run in (("sequential", sequential), ("parallel", parallel)):
+                # Firecrawl results are cached per domain; clear them so both approaches pay for the crawl.
+                crawler.crawl_cache.clear()
+                calls = model._calls
+                wall, first = run(count)
+                print(
+                    f"{count:>9}  {label:<11}{wall:>10.2f}{first:>11.2f}"
+                    f"{model._calls - calls:>11}"
+                )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+"""Local stand-ins for the third-party HTTP APIs the pipeline calls.
+
+Point the app at them through the environment, e.g.
+
+    FIRECRAWL_API_URL=http://127.0.0.1:8765 FIRECRAWL_API_KEY=stub
+    PEXELS_API_URL=http://127.0.0.1:8766 PEXELS_KEY=stub
+
+Run `python benchmarks/stub_services.py` to serve them until interrupted.
+"""
+import os
+import json
+import time
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class StubServer:
+    """Threaded HTTP server that answers every request via `handle(path, body)`; 404 unless overridden."""
+
+    def __init__(self, latency=0.0, port=0):
+        self.latency = latency
+        self.requests = 0
+        self._lock = threading.Lock()
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def _reply(self):
+                length = int(self.headers.get("Content-Length") or 0)
+                body = json.loads(self.rfile.read(length) or b"null")
+                with stub._lock:
+                    stub.requests += 1
+                if stub.latency:
+                    time.sleep(stub.latency)
+                status, payload = stub.handle(self.path, body)
+                data = json.dumps(payload).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            do_GET = do_POST = _reply
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", port), Handler)
+        self.server.daemon_threads = True
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    @property
+    def url(self):
+        host, port = self.server.server_address
+        return f"http://{host}:{port}"
+
+    def handle(self, path, body):
+        return 404, {"error": "not found"}
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+class FirecrawlStub(StubServer):
+    def handle(self, path, body):
+        if path != "/v1/crawl":
+            return super().handle(path, body)
+        url = (body or {}).get("url", "")
+        return 200, {
+            "summary": f"Stub summary of {url}: clean layout, bold hero, card grid.",
+            "keywords": ["modern", "responsive", "minimal"]
+        }
+
+
+class PexelsStub(StubServer):
+    def handle(self, path, body):
+        if not path.startswith("/v1/search"):
+            return super().handle(path, body)
+        return 200, {"photos": [{"src": {"large": "https://images.example.com/stub-large.jpg"}}]}
+
+
+def work_env(work, firecrawl=None, pexels=None):
+    """Environment that keeps the app's cache, history and outputs under `work`.
+
+    cache.py, history.py and workspace.py read these at import time, so apply
+    them before importing the app's modules. Pass running stubs to point the
+    Firecrawl/Pexels clients at them.
+    """
+    env = {
+        "CACHE_DIR": os.path.join(work, "cache"),
+        "HISTORY_DIR": os.path.join(work, "history"),
+        "WORKSPACE_ROOT": os.path.join(work, "workspaces"),
+    }
+    if firecrawl:
+        env.update({"FIRECRAWL_API_URL": firecrawl.url, "FIRECRAWL_API_KEY": "stub"})
+    if pexels:
+        env.update({"PEXELS_API_URL": pexels.url, "PEXELS_KEY": "stub"})
+    return env
+
+
+if __name__ == "__main__":
+    servers = {"Firecrawl": FirecrawlStub(port=8765), "Pexels": PexelsStub(port=8766)}
+    for name, server in servers.items():
+        server.start()
+        print(f"{name} stub listening on {server.url}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        for server in servers.values():
+            server.stop()
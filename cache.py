@@ -0,0 +1,101 @@
+import os
+import json
+import time
+import hashlib
+import threading
+from sqlite_pool import LocalConnections
+
+CACHE_DIR = os.environ.get("CACHE_DIR", "cache")
+
+
+def make_key(*parts):
+    payload = json.dumps(parts, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class DiskCache:
+    """Persistent key/value cache with TTL expiry and size-bounded LRU eviction.
+
+    Values must be JSON-serialisable. Backed by SQLite so several Streamlit
+    sessions (and processes) can share one cache file.
+    """
+
+    def __init__(self, path, max_entries=500, max_bytes=50 * 1024 * 1024, ttl=7 * 24 * 3600):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.path = path
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._stats_lock = threading.Lock()
+        self._conn = LocalConnections(path).get
+        self._conn().execute(
+            """CREATE TABLE IF NOT EXISTS entries (
+                key TEXT PRIMARY KEY,
+                value TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                created REAL NOT NULL,
+                accessed REAL NOT NULL
+            )"""
+        )
+        self._conn().execute("CREATE INDEX IF NOT EXISTS entries_accessed ON entries (accessed)")
+
+    def _count(self, hit):
+        with self._stats_lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def get(self, key, default=None):
+        now = time.time()
+        row = self._conn().execute(
+            "SELECT value, created FROM entries WHERE key = ?", (key,)
+        ).fetchone()
+        if row is None or (self.ttl and now - row[1] > self.ttl):
+            if row is not None:
+                self.delete(key)
+            self._count(False)
+            return default
+        self._conn().execute("UPDATE entries SET accessed = ? WHERE key = ?", (now, key))
+        self._count(True)
+        return json.loads(row[0])
+
+    def set(self, key, value):
+        now = time.time()
+        payload = json.dumps(value, ensure_ascii=False)
+        self._conn().execute(
+            "INSERT OR REPLACE INTO entries (key, value, size, created, accessed) VALUES (?, ?, ?, ?, ?)",
+            (key, payload, len(payload.encode("utf-8")), now, now),
+        )
+        self._evict(now)
+
+    def delete(self, key):
+        self._conn().execute("DELETE FROM entries WHERE key = ?", (key,))
+
+    def clear(self):
+        self._conn().execute("DELETE FROM entries")
+
+    def _evict(self, now):
+        conn = self._conn()
+        if self.ttl:
+            conn.execute("DELETE FROM entries WHERE created < ?", (now - self.ttl,))
+        count, total = conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries").fetchone()
+        if count <= self.max_entries and total <= self.max_bytes:
+            return
+        # Walk least-recently-used first until both bounds hold again.
+        doomed = []
+        for key, size in conn.execute("SELECT key, size FROM entries ORDER BY accessed"):
+            if count <= self.max_entries and total <= self.max_bytes:
+                break
+            doomed.append((key,))
+            count -= 1
+            total -= size
+        conn.executemany("DELETE FROM entries WHERE key = ?", doomed)
+
+    def stats(self):
+        count, total = self._conn().execute(
+            "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries"
+        ).fetchone()
+        return {"hits": self.hits, "misses": self.misses, "entries": count, "bytes": total}
@@ -0,0 +1,31 @@
+from typing import Any
+from langchain_core.language_models.chat_models import BaseChatModel, generate_from_stream
+
+
+class ManagedChatModel(BaseChatModel):
+    """Chat model wrapper that routes every call through an `LLMExecutor`.
+
+    Works anywhere a chat model does (the ReAct agent, `invoke`), so both
+    execution modes share the same timeouts, retries and concurrency limit.
+    """
+
+    inner: Any
+    executor: Any
+
+    @property
+    def _llm_type(self):
+        return f"managed-{self.inner._llm_type}"
+
+    def _call_inner(self, messages, stop=None, run_manager=None, **kwargs):
+        if run_manager is not None and getattr(self.inner, "streaming", False):
+            return generate_from_stream(self.inner._stream(messages, stop=stop, run_manager=run_manager, **kwargs))
+        return self.inner._generate(messages, stop=stop, run_manager=run_manager, **kwargs)
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        # Hedged duplicates and retries after a timeout run silently, so two
+        # token streams never interleave.
+        return self.executor.call(
+            self._call_inner, messages, stop=stop, run_manager=run_manager,
+            quiet_func=lambda *args, **kw: self._call_inner(*args, **{**kw, "run_manager": None}),
+            **kwargs
+        )
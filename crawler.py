@@ -0,0 +1,66 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+from cache import CACHE_DIR, DiskCache, make_key
+from domains import DOMAIN_SITES
+from http_pool import DEFAULT_TIMEOUT, get_session
+from tracing import propagate, tracer
+
+MAX_WORKERS = int(os.environ.get("FIRECRAWL_MAX_WORKERS", 8))
+
+# The reference sites rarely change, so their summaries are kept for a week.
+crawl_cache = DiskCache(
+    os.path.join(CACHE_DIR, "firecrawl.sqlite3"),
+    max_entries=1000,
+    ttl=int(os.environ.get("FIRECRAWL_CACHE_TTL", 7 * 24 * 3600))
+)
+
+_executor = ThreadPoolExecutor(max_workers=MAX_WORKERS, thread_name_prefix="firecrawl")
+
+
+def firecrawl_api_url():
+    return os.environ.get("FIRECRAWL_API_URL", "https://api.firecrawl.dev").rstrip("/")
+
+
+def crawl_summary(url, api_key, timeout=DEFAULT_TIMEOUT):
+    """Summary and keywords for one site, served from the cache when fresh."""
+    with tracer.span("firecrawl", url=url) as attrs:
+        key = make_key("firecrawl", url)
+        cached = crawl_cache.get(key)
+        attrs["cached"] = cached is not None
+        if cached is not None:
+            return cached
+        res = get_session().post(
+            f"{firecrawl_api_url()}/v1/crawl",
+            headers={
+                "Authorization": f"Bearer {api_key}",
+                "Content-Type": "application/json"
+            },
+            json={"url": url},
+            timeout=timeout
+        )
+        res.raise_for_status()
+        data = res.json()
+        summary = {"summary": data.get("summary", ""), "keywords": data.get("keywords", [])}
+        crawl_cache.set(key, summary)
+        return summary
+
+
+def analyse_domain(domain):
+    FIRECRAWL_API_KEY = os.environ.get("FIRECRAWL_API_KEY")
+    if not FIRECRAWL_API_KEY:
+        return "Firecrawl API key not found."
+
+    urls = DOMAIN_SITES.get(domain.lower(), [])
+    if not urls:
+        return "ℹ️ No reference websites found for this domain."
+
+    futures = [(url, _executor.submit(propagate(crawl_summary), url, FIRECRAWL_API_KEY)) for url in urls]
+    results = []
+    for url, future in futures:
+        try:
+            data = future.result()
+            results.append(f"{url}\n📝 {data['summary']}\n🔑 Keywords: {data['keywords']}")
+        except Exception as inner:
+            results.append(f"⚠️ Failed to analyze {url}: {inner}")
+
+    return "\n\n".join(results)
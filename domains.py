@@ -0,0 +1,127 @@
+import re
+from collections import namedtuple
+from functools import lru_cache
+
+# One taxonomy for everything domain-specific: the classifier keywords (with
+# their weights), the reference sites the agent analyses and the UI
+# placeholders. The order breaks ties between equally scored domains.
+DOMAINS = {
+    "restaurant": {
+        "keywords": {
+            "restaurant": 2, "cafe": 2, "café": 2, "bistro": 2, "eatery": 2, "diner": 2,
+            "pizzeria": 2, "bakery": 2, "coffee shop": 2, "food truck": 2,
+            "menu": 1, "chef": 1, "cuisine": 1, "dish": 1, "reservation": 1, "table booking": 1,
+            "food delivery": 1, "dining": 1, "brunch": 1, "catering": 1,
+        },
+        "sites": ["https://sweetgreen.com", "https://chipotle.com"],
+        "placeholders": {
+            "header": "🔹 Brand or site name (e.g. Fresh Bites | Premium Food Delivery)",
+            "hero": "🔹 Main message (e.g. Delicious meals delivered fresh to your door — Order now!)",
+            "footer": "🔹 Contact info (e.g. © 2025 Fresh Bites | info@freshbites.com)"
+        },
+    },
+    "portfolio": {
+        "keywords": {
+            "portfolio": 2, "resume": 1, "cv": 1, "personal website": 2, "personal site": 2,
+            "developer": 1, "designer": 1, "photographer": 1, "freelancer": 1, "artist": 1,
+            "my projects": 1, "showcase": 1, "case study": 1,
+        },
+        "sites": ["https://brittanychiang.com"],
+        "placeholders": {
+            "header": "🔹 Your name or role (e.g. Jane Doe | Full Stack Developer)",
+            "hero": "🔹 Personal intro (e.g. Building elegant, scalable web apps.)",
+            "footer": "🔹 Email/social (e.g. jane@example.com | © 2025 Jane Doe)"
+        },
+    },
+    "blog": {
+        "keywords": {
+            "blog": 2, "blogging": 2, "vlog": 2, "magazine": 2, "journal": 1, "newsletter": 1,
+            "article": 1, "post": 1, "stories": 1, "writer": 1, "blogger": 1, "recipe": 1,
+        },
+        "sites": [],
+        "placeholders": {
+            "header": "🔹 Blog name (e.g. MindSparks | Thoughts & Stories)",
+            "hero": "🔹 Tagline (e.g. Sharing insights on tech, life, and more.)",
+            "footer": "🔹 Author info (e.g. © 2025 MindSparks by Alex Smith)"
+        },
+    },
+    "ecommerce": {
+        "keywords": {
+            "ecommerce": 2, "e-commerce": 2, "online store": 2, "online shop": 2, "webshop": 2,
+            "storefront": 2, "marketplace": 2, "shop": 1, "store": 1, "boutique": 1,
+            "shopping cart": 2, "shopping": 1, "checkout": 1, "product": 1, "sale": 1,
+        },
+        "sites": ["https://zara.com"],
+        "placeholders": {
+            "header": "🔹 Shop name (e.g. UrbanStyle | Fashion for Everyone)",
+            "hero": "🔹 Sales headline (e.g. Up to 50% off on all summer wear!)",
+            "footer": "🔹 Support info (e.g. help@urbanstyle.com | Refund Policy)"
+        },
+    },
+    "agency": {
+        "keywords": {
+            "agency": 2, "studio": 1, "consultancy": 2, "consulting firm": 2, "firm": 1,
+            "clients": 1, "marketing": 1, "branding": 1, "our services": 1, "our team": 1,
+        },
+        "sites": ["https://ustwo.com"],
+        "placeholders": {
+            "header": "🔹 Agency name (e.g. Pixel Perfect | Creative Studio)",
+            "hero": "🔹 Value proposition (e.g. We craft beautiful, user-first digital solutions.)",
+            "footer": "🔹 Legal/contact (e.g. © 2025 Pixel Perfect | contact@agency.com)"
+        },
+    },
+    "generic": {
+        "keywords": {},
+        "sites": [],
+        "placeholders": {
+            "header": "🔹 Website name (e.g. WebNova | Modern Solutions)",
+            "hero": "🔹 Hero tagline (e.g. Unlock powerful digital tools in one click)",
+            "footer": "🔹 Footer info (e.g. contact@webnova.com | © 2025 WebNova)"
+        },
+    },
+}
+
+DOMAIN_SITES = {name: spec["sites"] for name, spec in DOMAINS.items() if spec["sites"]}
+DOMAIN_PLACEHOLDERS = {name: spec["placeholders"] for name, spec in DOMAINS.items()}
+
+_KEYWORDS = {
+    keyword: (name, weight)
+    for name, spec in DOMAINS.items()
+    for keyword, weight in spec["keywords"].items()
+}
+# Whole words only (so "workshop" is not a shop), optional plural, longest
+# phrases first so "online store" wins over "store"; multi-word keywords
+# match across any whitespace.
+_PATTERN = re.compile(
+    r"\b(" + "|".join(
+        r"\s+".join(map(re.escape, keyword.split()))
+        for keyword in sorted(_KEYWORDS, key=len, reverse=True)
+    ) + r")(?:s|es)?\b"
+)
+_ORDER = {name: index for index, name in enumerate(DOMAINS)}
+
+Classification = namedtuple("Classification", "domain confidence scores")
+
+
+@lru_cache(maxsize=1024)
+def classify_domain(prompt: str) -> Classification:
+    """Score every domain by the keywords found in `prompt`.
+
+    `confidence` is the winner's share of all matched evidence, discounted
+    when there is little of it; with no matches the domain is "generic" at 0.
+    """
+    scores = {}
+    for match in _PATTERN.finditer(prompt.lower()):
+        name, weight = _KEYWORDS[" ".join(match.group(1).split())]
+        scores[name] = scores.get(name, 0) + weight
+    if not scores:
+        return Classification("generic", 0.0, ())
+    ranked = sorted(scores.items(), key=lambda item: (-item[1], _ORDER[item[0]]))
+    best = ranked[0][1]
+    confidence = best / sum(scores.values()) * (1 - 0.5 ** best)
+    return Classification(ranked[0][0], round(confidence, 2), tuple(ranked))
+
+
+def detect_domain(prompt: str) -> str:
+    """Identify the website category from prompt: e.g., restaurant, blog, ecommerce."""
+    return classify_domain(prompt).domain
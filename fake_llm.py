@@ -0,0 +1,91 @@
+import time
+from typing import Any
+import hashlib
+import threading
+from pydantic import PrivateAttr
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+from fences import parse_code_blocks
+
+
+def fake_site(prompt, response_size=4000):
+    """A deterministic three-block response of roughly `response_size` chars."""
+    digest = hashlib.sha256(prompt.encode("utf-8")).hexdigest()[:8]
+    filler = f"<p>Section copy {digest}: fresh, fast and friendly service for everyone.</p>\n"
+    html = (
+        "<header><nav><a href=\"#home\">Home</a> <a href=\"#about\">About</a></nav>"
+        f"<h1>Site {digest}</h1></header>\n"
+        "<section id=\"hero\"><h2>Welcome</h2><p>Built offline by the fake model.</p></section>\n"
+    )
+    css = "body { font-family: sans-serif; margin: 0; }\nheader { padding: 1rem; }\n"
+    js = "document.querySelectorAll('a').forEach(a => a.addEventListener('click', () => {}));\n"
+    body = ""
+    while len(html) + len(body) + len(css) + len(js) < response_size:
+        body += filler
+    html += f"<section id=\"about\">\n{body}</section>\n<footer>© Fake {digest}</footer>"
+    return f"```html\n{html}\n```\n\n```css\n{css}```\n\n```javascript\n{js}```"
+
+
+class FakeChatModel(BaseChatModel):
+    """Offline stand-in for the Gemini chat model.
+
+    Replies with `fake_site(...)` after `latency` seconds, streaming it through
+    the callbacks in `chunk_size` pieces. When the prompt is a ReAct prompt the
+    reply is prefixed with `Final Answer:` so the agent finishes in one step.
+    Section-edit prompts get their "Current …" code blocks echoed back unchanged.
+    The first `rate_limit_failures` calls raise a 429-style error instead.
+    """
+
+    latency: float = 0.0
+    response_size: int = 4000
+    chunk_size: int = 64
+    rate_limit_failures: int = 0
+    _calls: int = PrivateAttr(default=0)
+    _calls_lock: Any = PrivateAttr(default_factory=threading.Lock)
+
+    @property
+    def _llm_type(self):
+        return "fake-chat"
+
+    def _reply(self, messages):
+        prompt = "\n".join(str(message.content) for message in messages)
+        if "Current HTML of the section" in prompt or "Current CSS" in prompt:
+            # Only the blocks under a "Current …:" style label; the instructions mention ``` too.
+            blocks = [
+                block for block in parse_code_blocks(prompt)
+                if block.code and prompt[:block.start].rstrip().endswith(":")
+            ]
+            return prompt, "\n\n".join(f"```{block.lang}\n{block.code}\n```" for block in blocks)
+        reply = fake_site(prompt, self.response_size)
+        if "Final Answer" in prompt:
+            reply = f"Thought: I now know the final answer\nFinal Answer: {reply}"
+        return prompt, reply
+
+    def _stream(self, messages, stop=None, run_manager=None, **kwargs):
+        with self._calls_lock:
+            self._calls += 1
+            if self._calls <= self.rate_limit_failures:
+                raise RuntimeError("429 Resource exhausted (fake rate limit)")
+        prompt, reply = self._reply(messages)
+        pieces = [reply[i:i + self.chunk_size] for i in range(0, len(reply), self.chunk_size)]
+        for piece in pieces:
+            if self.latency:
+                time.sleep(self.latency / len(pieces))
+            chunk = ChatGenerationChunk(message=AIMessageChunk(content=piece))
+            if run_manager:
+                run_manager.on_llm_new_token(piece, chunk=chunk)
+            yield chunk
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        prompt = "\n".join(str(message.content) for message in messages)
+        text = "".join(chunk.text for chunk in self._stream(messages, stop, run_manager, **kwargs))
+        message = AIMessage(
+            content=text,
+            usage_metadata={
+                "input_tokens": len(prompt) // 4,
+                "output_tokens": len(text) // 4,
+                "total_tokens": (len(prompt) + len(text)) // 4
+            }
+        )
+        return ChatResult(generations=[ChatGeneration(message=message)])
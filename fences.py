@@ -0,0 +1,139 @@
+import re
+from collections import namedtuple
+
+# kind: html/css/js/jsx/others; lang: the tag as written; start/end: offsets
+# of the whole fence (opening ``` to closing ```) in the response text.
+CodeBlock = namedtuple("CodeBlock", "kind lang code start end closed")
+
+BLOCK_KINDS = ("html", "css", "js", "jsx", "others")
+FENCE = "```"
+_LANG = re.compile(r"(\w*)(\s*)")
+_LEADING_TICKS = re.compile(r"^`{1,3}\s*\w*")
+_TRAILING_TICKS = re.compile(r"`{1,3}$")
+
+_OUT, _LANG_TAG, _IN = range(3)
+
+
+def block_kind(lang):
+    lang = (lang or "html").lower().strip()
+    if lang == "javascript":
+        return "js"
+    return lang if lang in BLOCK_KINDS else "others"
+
+
+def clean_code(code):
+    if code.startswith("`"):
+        code = _LEADING_TICKS.sub("", code)
+    if "`" in code[-2:]:
+        code = _TRAILING_TICKS.sub("", code)
+    return code.strip()
+
+
+class FenceParser:
+    """Single-pass, incremental parser for ```lang fenced code blocks.
+
+    Feed the response in chunks of any size (e.g. LLM stream tokens); every
+    character is scanned once and only a two-character tail is carried over
+    between chunks, so parsing a response is O(len) however it is split.
+    """
+
+    def __init__(self):
+        self.blocks = []
+        self.saw_fence = False
+        self._chunks = []
+        self._state = _OUT
+        self._pending = ""
+        self._offset = 0
+        self._fence_start = 0
+        self._lang = ""
+        self._code = []
+
+    def feed(self, chunk):
+        """Consume `chunk`; returns the blocks it completed."""
+        self._chunks.append(chunk)
+        return self._scan(self._pending + chunk, final=False)
+
+    def close(self):
+        """Finish parsing; an unterminated last fence becomes an open block."""
+        self._scan(self._pending, final=True)
+        if self._state == _IN:
+            code = "".join(self._code) + self._pending
+            if code.strip():
+                self._emit(code, self._offset + len(self._pending), closed=False)
+        self._state, self._pending = _OUT, ""
+        return self.blocks
+
+    @property
+    def text(self):
+        return "".join(self._chunks)
+
+    def _emit(self, code, end, closed=True):
+        self.blocks.append(CodeBlock(
+            block_kind(self._lang), self._lang, clean_code(code), self._fence_start, end, closed
+        ))
+        self._code = []
+        return self.blocks[-1]
+
+    def _hold(self, text, index):
+        self._pending = text[index:]
+        self._offset += index
+
+    def _scan(self, text, final):
+        completed = []
+        i = 0
+        while True:
+            if self._state == _OUT:
+                j = text.find(FENCE, i)
+                if j == -1:
+                    # Keep a possible partial fence ("``") for the next chunk.
+                    self._hold(text, len(text) if final else max(i, len(text) - 2))
+                    return completed
+                self.saw_fence = True
+                self._fence_start = self._offset + j
+                self._state = _LANG_TAG
+                i = j + len(FENCE)
+            elif self._state == _LANG_TAG:
+                match = _LANG.match(text, i)
+                if match.end() == len(text):
+                    # The language tag (or the whitespace after it) may continue.
+                    self._hold(text, i)
+                    return completed
+                self._lang = match.group(1)
+                self._state = _IN
+                i = match.end()
+            else:
+                j = text.find(FENCE, i)
+                if j == -1:
+                    cut = len(text) if final else max(i, len(text) - 2)
+                    self._code.append(text[i:cut])
+                    self._hold(text, cut)
+                    return completed
+                self._code.append(text[i:j])
+                completed.append(self._emit("".join(self._code), self._offset + j + len(FENCE)))
+                self._state = _OUT
+                i = j + len(FENCE)
+
+    def open_block(self):
+        """The block currently being streamed, if any (not yet closed)."""
+        if self._state != _IN:
+            return None
+        if len(self._code) > 1:
+            self._code = ["".join(self._code)]
+        code = self._code[0] if self._code else ""
+        return CodeBlock(block_kind(self._lang), self._lang, code.lstrip(), self._fence_start, None, False)
+
+    def component_blocks(self, include_open=True):
+        """Blocks grouped as `{kind: [code, ...]}`, like `extract_component_blocks`."""
+        grouped = {kind: [] for kind in BLOCK_KINDS}
+        for block in self.blocks:
+            grouped[block.kind].append(block.code)
+        current = self.open_block() if include_open else None
+        if current is not None and current.code:
+            grouped[current.kind].append(current.code)
+        return grouped
+
+
+def parse_code_blocks(response):
+    parser = FenceParser()
+    parser.feed(response)
+    return parser.close()
@@ -1,25 +1,576 @@
 import os
+import re
 import json
+import time
+import uuid
+import struct
+import sqlite3
+import threading
+from itertools import islice
+from contextlib import contextmanager
 from datetime import datetime
+from tracing import tracer
+from retention import CODEC_EXTENSIONS, DEFAULT_POLICY, compress, decompress, plan_retention
+from sqlite_pool import LocalConnections
 
-def save_chat_to_history(prompt, response, history_file="history/chat_history.json"):
-    os.makedirs(os.path.dirname(history_file), exist_ok=True)
-    full_path = history_file
+try:
+    import fcntl
+except ImportError:  # Windows: fall back to the in-process lock only
+    fcntl = None
 
+HISTORY_DIR = os.environ.get("HISTORY_DIR", "history")
+HISTORY_BACKEND = os.environ.get("HISTORY_BACKEND", "jsonl")
+LEGACY_HISTORY_FILE = "chat_history.json"
+PROMPT_PREVIEW_CHARS = 80
+# Saves between two retention passes (see `apply_retention`).
+RETENTION_INTERVAL = int(os.environ.get("HISTORY_RETENTION_INTERVAL", 25))
 
-    if os.path.exists(full_path):
-        with open(full_path, "r") as f:
-            history = json.load(f)
-    else:
-        history = []
+# Cold segments are length-prefixed frames, each one compressed record.
+_FRAME = struct.Struct(">I")
+_CODECS_BY_EXTENSION = {extension: codec for codec, extension in CODEC_EXTENSIONS.items()}
+# Segment names are "<created ns>-<record count>.<codec extension>"; anything else in the
+# cold directory (temp files, .DS_Store, ...) is ignored.
+_SEGMENT_NAME = re.compile(rf"(\d+)-(\d+)\.({'|'.join(_CODECS_BY_EXTENSION)})")
 
-    history.append({
-        "timestamp": datetime.now().isoformat(),
-        "prompt": prompt,
-        "response": response
-    })
 
-    with open(full_path, "w") as f:
-        json.dump(history, f, indent=4)
+def _new_chat_id():
+    return uuid.uuid4().hex[:12]
 
-    return full_path
+
+def _summarize(record):
+    # The compact per-chat summary kept in the index: enough to render the
+    # sidebar, and to list every prompt, without touching the (large) response bodies.
+    prompt = record.get("prompt") or ""
+    summary = {
+        "id": record["id"],
+        "timestamp": record.get("timestamp"),
+        "prompt": prompt[:PROMPT_PREVIEW_CHARS],
+        "domain": record.get("domain") or "generic",
+        "size": len((record.get("response") or "").encode("utf-8")),
+    }
+    if len(prompt) > PROMPT_PREVIEW_CHARS:
+        summary["full_prompt"] = prompt
+    return summary
+
+
+@contextmanager
+def _file_lock(path):
+    with open(path, "a") as lock:
+        if fcntl:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if fcntl:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+
+
+def _segment_codec(name):
+    return _CODECS_BY_EXTENSION[name.rsplit(".", 1)[-1]]
+
+
+def _segment_info(name):
+    created, count, _ = _SEGMENT_NAME.fullmatch(name).groups()
+    return int(created), int(count)
+
+
+class JsonlHistoryStore:
+    """Append-only JSONL log of chats plus a small offset index.
+
+    Saving a chat appends one line to the log and one line to the index, so
+    inserts are O(1) regardless of how large the history has grown. Deletes
+    append a tombstone to the index; only `compact` rewrites the log, when
+    it moves older chats into compressed cold segments.
+    """
+
+    def __init__(self, history_dir=HISTORY_DIR):
+        os.makedirs(history_dir, exist_ok=True)
+        self.history_dir = history_dir
+        self.log_file = os.path.join(history_dir, "chat_history.jsonl")
+        self.index_file = os.path.join(history_dir, "chat_history.idx")
+        self.lock_file = os.path.join(history_dir, ".history.lock")
+        self.cold_dir = os.path.join(history_dir, "cold")
+        self._mutex = threading.RLock()
+        self._lock_depth = 0
+        self._index = {}
+        self._index_inode = None
+        self._index_pos = 0
+
+    @contextmanager
+    def _locked(self):
+        # Reentrant: flock() on a second descriptor would block on ourselves.
+        with self._mutex:
+            if self._lock_depth:
+                self._lock_depth += 1
+                try:
+                    yield
+                finally:
+                    self._lock_depth -= 1
+                return
+            with _file_lock(self.lock_file):
+                self._lock_depth = 1
+                try:
+                    yield
+                finally:
+                    self._lock_depth = 0
+
+    def _refresh(self):
+        # Only the tail written since the last refresh is parsed, so other
+        # processes' appends are picked up without re-reading the index.
+        with self._mutex:
+            try:
+                stat = os.stat(self.index_file)
+            except FileNotFoundError:
+                self._index, self._index_inode, self._index_pos = {}, None, 0
+                return
+            if stat.st_ino != self._index_inode or stat.st_size < self._index_pos:
+                self._index, self._index_inode, self._index_pos = {}, stat.st_ino, 0
+            if stat.st_size == self._index_pos:
+                return
+            with open(self.index_file, "rb") as f:
+                f.seek(self._index_pos)
+                data = f.read()
+            complete = data.rfind(b"\n") + 1
+            for line in data[:complete].splitlines():
+                if not line.strip():
+                    continue
+                self._apply(json.loads(line))
+            self._index_pos += complete
+
+    def _apply(self, entry):
+        if entry.get("deleted"):
+            self._index.pop(entry["id"], None)
+        else:
+            self._index[entry["id"]] = entry
+
+    def _append_line(self, path, payload):
+        line = (json.dumps(payload, ensure_ascii=False) + "\n").encode("utf-8")
+        fd = os.open(path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        try:
+            offset = os.fstat(fd).st_size
+            os.write(fd, line)
+        finally:
+            os.close(fd)
+        return offset, len(line)
+
+    def _write_index(self, entry):
+        self._append_line(self.index_file, entry)
+        self._refresh()
+
+    def append(self, record):
+        chat_id = record.get("id") or _new_chat_id()
+        record = {**record, "id": chat_id}
+        with self._locked():
+            offset, length = self._append_line(self.log_file, record)
+            self._write_index({**_summarize(record), "offset": offset, "length": length})
+        return chat_id
+
+    def _read(self, entry):
+        try:
+            if entry.get("segment"):
+                with open(os.path.join(self.cold_dir, entry["segment"]), "rb") as f:
+                    f.seek(entry["offset"])
+                    return json.loads(decompress(f.read(entry["length"]), _segment_codec(entry["segment"])))
+            with open(self.log_file, "rb") as f:
+                f.seek(entry["offset"])
+                return json.loads(f.read(entry["length"]))
+        except (OSError, ValueError):
+            return None
+
+    def get(self, chat_id):
+        """The full chat; a cold one is decompressed here, and only here."""
+        self._refresh()
+        entry = self._index.get(chat_id)
+        if entry is None:
+            return None
+        record = self._read(entry)
+        if record is None or record.get("id") != chat_id:
+            # Another process compacted the history since our last refresh.
+            with self._mutex:
+                self._index_inode = None
+                self._refresh()
+            entry = self._index.get(chat_id)
+            record = self._read(entry) if entry else None
+        return record
+
+    def delete(self, chat_id):
+        with self._locked():
+            self._refresh()
+            if chat_id not in self._index:
+                return False
+            self._write_index({"id": chat_id, "deleted": True})
+        return True
+
+    def entries(self):
+        self._refresh()
+        return list(self._index.values())
+
+    def page(self, page=0, page_size=10):
+        """Summaries for one page of chats, newest first."""
+        self._refresh()
+        start = page * page_size
+        return list(islice(reversed(self._index.values()), start, start + page_size))
+
+    def count(self):
+        self._refresh()
+        return len(self._index)
+
+    def change_marker(self):
+        """Differs after any save or delete, by any process; one stat() call."""
+        try:
+            stat = os.stat(self.index_file)
+        except FileNotFoundError:
+            return None
+        return stat.st_ino, stat.st_size
+
+    def _full_prompt(self, entry):
+        if "full_prompt" in entry:
+            return entry["full_prompt"]
+        if len(entry.get("prompt") or "") < PROMPT_PREVIEW_CHARS:
+            return entry.get("prompt") or ""  # never truncated
+        # Summaries written before full prompts were kept in the index.
+        return (self._read(entry) or {}).get("prompt") or ""
+
+    def prompts(self):
+        """`(id, full prompt)` for every chat, oldest first, from the index alone."""
+        self._refresh()
+        return [(entry["id"], self._full_prompt(entry)) for entry in list(self._index.values())]
+
+    def _write_segment(self, frames, extension, created=None):
+        # frames: [(chat_id, compressed record)]; returns each chat's new location.
+        # A rewritten segment keeps its creation time, so segments stay in chat order.
+        name = f"{created or time.time_ns()}-{len(frames)}.{extension}"
+        temp_path = os.path.join(self.cold_dir, name + ".tmp")
+        locations = {}
+        with open(temp_path, "wb") as f:
+            for chat_id, blob in frames:
+                f.write(_FRAME.pack(len(blob)))
+                locations[chat_id] = {"segment": name, "offset": f.tell(), "length": len(blob)}
+                f.write(blob)
+        os.replace(temp_path, os.path.join(self.cold_dir, name))
+        return locations
+
+    def _segment_names(self):
+        # Oldest first, i.e. in chat order.
+        if not os.path.isdir(self.cold_dir):
+            return []
+        return sorted((name for name in os.listdir(self.cold_dir) if _SEGMENT_NAME.fullmatch(name)), key=_segment_info)
+
+    def _read_bytes(self, path, offset, length):
+        with open(path, "rb") as f:
+            f.seek(offset)
+            return f.read(length)
+
+    def compact(self, policy=DEFAULT_POLICY):
+        """Apply a retention policy; returns the ids of the chats it dropped.
+
+        Chats over the policy's limits are removed for good. Chats that fall
+        out of the hot window are compressed one by one into a new cold
+        segment. The hot log, the index and any segment still holding
+        deleted chats are then rewritten, so deletes free their space too.
+        """
+        with self._locked():
+            self._refresh()
+            entries = list(self._index.values())
+            drop, cold = plan_retention(entries, policy)
+            dropped, cold = set(drop), set(cold)
+            kept = [entry for entry in entries if entry["id"] not in dropped]
+            hot = [entry for entry in kept if not entry.get("segment") and entry["id"] not in cold]
+            newly_cold = [entry for entry in kept if not entry.get("segment") and entry["id"] in cold]
+            live_segments = {}
+            for entry in kept:
+                if entry.get("segment"):
+                    live_segments.setdefault(entry["segment"], []).append(entry)
+            os.makedirs(self.cold_dir, exist_ok=True)
+            stale = [name for name in self._segment_names() if len(live_segments.get(name, ())) < _segment_info(name)[1]]
+            log_size = os.path.getsize(self.log_file) if os.path.exists(self.log_file) else 0
+            if not newly_cold and not stale and log_size == sum(entry["length"] for entry in hot):
+                return []
+
+            locations = {}
+            if newly_cold:
+                locations.update(self._write_segment(
+                    [
+                        (entry["id"], compress(self._read_bytes(self.log_file, entry["offset"], entry["length"]).rstrip(b"\n"), policy.codec))
+                        for entry in newly_cold
+                    ],
+                    CODEC_EXTENSIONS[policy.codec]
+                ))
+            for name in stale:
+                if live_segments.get(name):
+                    path = os.path.join(self.cold_dir, name)
+                    locations.update(self._write_segment(
+                        [(entry["id"], self._read_bytes(path, entry["offset"], entry["length"])) for entry in live_segments[name]],
+                        name.rsplit(".", 1)[-1],
+                        created=_segment_info(name)[0]
+                    ))
+
+            temp_log = self.log_file + ".tmp"
+            with open(temp_log, "wb") as out:
+                for entry in hot:
+                    locations[entry["id"]] = {"offset": out.tell(), "length": entry["length"]}
+                    out.write(self._read_bytes(self.log_file, entry["offset"], entry["length"]))
+            temp_index = self.index_file + ".tmp"
+            with open(temp_index, "w", encoding="utf-8") as out:
+                for entry in kept:
+                    location = locations.get(entry["id"]) or {
+                        key: entry[key] for key in ("segment", "offset", "length")
+                    }
+                    summary = {key: value for key, value in entry.items() if key not in ("segment", "offset", "length")}
+                    out.write(json.dumps({**summary, **location}, ensure_ascii=False) + "\n")
+            os.replace(temp_log, self.log_file)
+            os.replace(temp_index, self.index_file)
+            for name in stale:
+                os.remove(os.path.join(self.cold_dir, name))
+            self._refresh()
+            return drop
+
+    def _cold_records(self):
+        # (record, location) for every frame of every cold segment, oldest segment first.
+        for name in self._segment_names():
+            with open(os.path.join(self.cold_dir, name), "rb") as f:
+                while True:
+                    header = f.read(_FRAME.size)
+                    if len(header) < _FRAME.size:
+                        break
+                    length = _FRAME.unpack(header)[0]
+                    offset = f.tell()
+                    record = json.loads(decompress(f.read(length), _segment_codec(name)))
+                    yield record, {"segment": name, "offset": offset, "length": length}
+
+    def rebuild_index(self):
+        """Recreate the index by scanning the cold segments and the log, e.g.
+        after a crash between the log append and the index append."""
+        with self._locked():
+            deleted = set(self._deleted_ids())
+            tmp_file = self.index_file + ".tmp"
+            with open(tmp_file, "w", encoding="utf-8") as out:
+                for record, location in self._cold_records():
+                    if record["id"] not in deleted:
+                        out.write(json.dumps({**_summarize(record), **location}, ensure_ascii=False) + "\n")
+                if os.path.exists(self.log_file):
+                    with open(self.log_file, "rb") as log:
+                        offset = 0
+                        for line in log:
+                            record = json.loads(line)
+                            if record["id"] not in deleted:
+                                entry = {**_summarize(record), "offset": offset, "length": len(line)}
+                                out.write(json.dumps(entry, ensure_ascii=False) + "\n")
+                            offset += len(line)
+                for chat_id in deleted:
+                    out.write(json.dumps({"id": chat_id, "deleted": True}) + "\n")
+            os.replace(tmp_file, self.index_file)
+            self._refresh()
+
+    def _deleted_ids(self):
+        if not os.path.exists(self.index_file):
+            return []
+        with open(self.index_file, "rb") as f:
+            return [entry["id"] for entry in map(json.loads, f) if entry.get("deleted")]
+
+
+class SqliteHistoryStore:
+    """SQLite-backed history; WAL mode lets several sessions write safely."""
+
+    def __init__(self, history_dir=HISTORY_DIR):
+        os.makedirs(history_dir, exist_ok=True)
+        self.history_dir = history_dir
+        self.db_file = os.path.join(history_dir, "chat_history.sqlite3")
+        self._connections = LocalConnections(self.db_file, row_factory=sqlite3.Row)
+        self._conn = self._connections.get
+        self._conn().execute(
+            """CREATE TABLE IF NOT EXISTS chats (
+                seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                id TEXT UNIQUE NOT NULL,
+                timestamp TEXT,
+                prompt TEXT,
+                domain TEXT,
+                size INTEGER,
+                response TEXT
+            )"""
+        )
+        columns = {row["name"] for row in self._conn().execute("PRAGMA table_info(chats)")}
+        # Cold chats keep their response compressed in `response_z` (see `compact`).
+        for column, kind in (("domain", "TEXT"), ("size", "INTEGER"), ("response_z", "BLOB"), ("codec", "TEXT")):
+            if column not in columns:
+                self._conn().execute(f"ALTER TABLE chats ADD COLUMN {column} {kind}")
+
+    def append(self, record):
+        chat_id = record.get("id") or _new_chat_id()
+        summary = _summarize({**record, "id": chat_id})
+        self._conn().execute(
+            "INSERT INTO chats (id, timestamp, prompt, domain, size, response) VALUES (?, ?, ?, ?, ?, ?)",
+            (chat_id, record.get("timestamp"), record.get("prompt"), summary["domain"],
+             summary["size"], record.get("response")),
+        )
+        return chat_id
+
+    def get(self, chat_id):
+        row = self._conn().execute(
+            "SELECT id, timestamp, prompt, domain, response, response_z, codec FROM chats WHERE id = ?", (chat_id,)
+        ).fetchone()
+        if row is None:
+            return None
+        record = dict(row)
+        response_z, codec = record.pop("response_z"), record.pop("codec")
+        if codec:
+            record["response"] = decompress(response_z, codec).decode("utf-8")
+        return record
+
+    def delete(self, chat_id):
+        cursor = self._conn().execute("DELETE FROM chats WHERE id = ?", (chat_id,))
+        return cursor.rowcount > 0
+
+    _SUMMARY_COLUMNS = "id, timestamp, substr(prompt, 1, ?) AS prompt, domain, size"
+
+    def entries(self):
+        rows = self._conn().execute(
+            f"SELECT {self._SUMMARY_COLUMNS} FROM chats ORDER BY seq",
+            (PROMPT_PREVIEW_CHARS,),
+        )
+        return [dict(row) for row in rows]
+
+    def page(self, page=0, page_size=10):
+        rows = self._conn().execute(
+            f"SELECT {self._SUMMARY_COLUMNS} FROM chats ORDER BY seq DESC LIMIT ? OFFSET ?",
+            (PROMPT_PREVIEW_CHARS, page_size, page * page_size),
+        )
+        return [dict(row) for row in rows]
+
+    def count(self):
+        return self._conn().execute("SELECT COUNT(*) FROM chats").fetchone()[0]
+
+    def change_marker(self):
+        """Differs after any save or delete, by any process."""
+        # seq is AUTOINCREMENT, so a delete plus a save still moves MAX(seq).
+        return tuple(self._conn().execute("SELECT COUNT(*), MAX(seq) FROM chats").fetchone())
+
+    def prompts(self):
+        rows = self._conn().execute("SELECT id, prompt FROM chats ORDER BY seq")
+        return [(row["id"], row["prompt"] or "") for row in rows]
+
+    def compact(self, policy=DEFAULT_POLICY):
+        """Apply a retention policy; returns the ids of the chats it dropped.
+
+        Chats over the limits are deleted and the responses of chats outside
+        the hot window are compressed in place. The WAL is checkpointed
+        afterwards; freed pages are reused by later inserts rather than
+        returned to the filesystem.
+        """
+        with self._connections.transaction() as conn:
+            rows = conn.execute("SELECT id, timestamp, size, codec FROM chats ORDER BY seq").fetchall()
+            drop, cold = plan_retention([dict(row) for row in rows], policy)
+            conn.executemany("DELETE FROM chats WHERE id = ?", [(chat_id,) for chat_id in drop])
+            compressed = {row["id"] for row in rows if row["codec"]}
+            for chat_id in cold:
+                if chat_id in compressed:
+                    continue
+                response = conn.execute("SELECT response FROM chats WHERE id = ?", (chat_id,)).fetchone()[0] or ""
+                conn.execute(
+                    "UPDATE chats SET response = NULL, response_z = ?, codec = ? WHERE id = ?",
+                    (compress(response.encode("utf-8"), policy.codec), policy.codec, chat_id),
+                )
+        if drop or cold:
+            conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        return drop
+
+
+HISTORY_BACKENDS = {
+    "jsonl": JsonlHistoryStore,
+    "sqlite": SqliteHistoryStore,
+}
+
+_store = None
+_store_lock = threading.Lock()
+# Called as `listener(event, chat_id, record)` after a chat is saved ("save",
+# with the stored record) or deleted ("delete", record None).
+_listeners = []
+_saves_since_retention = 0
+
+
+def migrate_json_history(store, legacy_file):
+    """Import a legacy whole-file JSON history into `store` and retire it."""
+    if not os.path.exists(legacy_file):
+        return 0
+    with open(legacy_file, "r") as f:
+        history = json.load(f)
+    for item in history:
+        store.append({
+            "timestamp": item.get("timestamp"),
+            "prompt": item.get("prompt", ""),
+            "response": item.get("response", ""),
+        })
+    os.replace(legacy_file, legacy_file + ".migrated")
+    return len(history)
+
+
+def get_history_store(backend=HISTORY_BACKEND, history_dir=HISTORY_DIR):
+    global _store
+    with _store_lock:
+        if _store is None:
+            if backend not in HISTORY_BACKENDS:
+                raise ValueError(f"Unknown history backend: {backend}")
+            store = HISTORY_BACKENDS[backend](history_dir)
+            legacy_file = os.path.join(history_dir, LEGACY_HISTORY_FILE)
+            if os.path.exists(legacy_file):
+                with _file_lock(os.path.join(history_dir, ".migrate.lock")):
+                    migrate_json_history(store, legacy_file)
+            # Catch up on retention once per process (cheap when nothing is due).
+            store.compact(DEFAULT_POLICY)
+            _store = store
+    return _store
+
+
+def add_history_listener(listener):
+    """Keep a derived index (e.g. `similarity`) in step with saves and deletes."""
+    if listener not in _listeners:
+        _listeners.append(listener)
+
+
+def _notify(event, chat_id, record=None):
+    for listener in _listeners:
+        try:
+            listener(event, chat_id, record)
+        except Exception as e:
+            print(f"History listener failed on {event} {chat_id}: {e}")
+
+
+def apply_retention(store=None, policy=DEFAULT_POLICY):
+    """Compact the history under `policy`, telling listeners about dropped chats."""
+    store = store or get_history_store()
+    with tracer.span("history_retention") as attrs:
+        dropped = store.compact(policy)
+        attrs["dropped"] = len(dropped)
+    for chat_id in dropped:
+        _notify("delete", chat_id)
+    return dropped
+
+
+def save_chat_to_history(prompt, response, domain=None, store=None):
+    global _saves_since_retention
+    store = store or get_history_store()
+    with tracer.span("history_save"):
+        record = {
+            "timestamp": datetime.now().isoformat(),
+            "prompt": prompt,
+            "domain": domain,
+            "response": response
+        }
+        chat_id = store.append(record)
+        _notify("save", chat_id, {**record, "id": chat_id})
+    with _store_lock:
+        _saves_since_retention += 1
+        due = _saves_since_retention >= RETENTION_INTERVAL
+        if due:
+            _saves_since_retention = 0
+    if due:
+        apply_retention(store)
+    return chat_id
+
+
+def delete_chat_from_history(chat_id, store=None):
+    store = store or get_history_store()
+    deleted = store.delete(chat_id)
+    if deleted:
+        _notify("delete", chat_id)
+    return deleted
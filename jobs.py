@@ -0,0 +1,241 @@
+import os
+import time
+import uuid
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from agent import stream_agent, stream_edit, stream_variants
+from tracing import tracer
+
+GENERATION_WORKERS = int(os.environ.get("GENERATION_WORKERS", 4))
+MAX_QUEUED_JOBS = int(os.environ.get("MAX_QUEUED_JOBS", 50))
+JOB_TTL = int(os.environ.get("JOB_TTL", 3600))
+
+ACTIVE_STATES = ("queued", "running")
+
+
+class QueueFullError(RuntimeError):
+    pass
+
+
+class Job:
+    def __init__(self, kind, make_events, finalize):
+        self.id = uuid.uuid4().hex
+        self.kind = kind
+        self.make_events = make_events
+        self.finalize = finalize
+        self.status = "queued"
+        self.steps = []
+        self.answer = []
+        self.response = None
+        self.output = None
+        self.error = None
+        self.created = time.time()
+        self.started = None
+        self.finished = None
+        self.trace_id = None
+        self.variants = []
+        self.cancel_requested = threading.Event()
+        self.done = threading.Event()
+        self.future = None
+
+
+class GenerationService:
+    """Runs generations on a shared, bounded worker pool.
+
+    `submit` returns a job id straight away; callers poll `status` (which
+    includes the steps and answer text streamed so far), may `cancel`, and
+    fetch the response with `result`. Jobs outlive the Streamlit script run
+    that submitted them, so widget interactions never lose a generation.
+
+    `finalize(response)` runs on the worker after a successful generation
+    (e.g. to write the output files) and its return value becomes `output`.
+    """
+
+    def __init__(self, max_workers=GENERATION_WORKERS, max_queued=MAX_QUEUED_JOBS, ttl=JOB_TTL):
+        self.max_queued = max_queued
+        self.ttl = ttl
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="generation")
+        self._jobs = {}
+        self._lock = threading.Lock()
+
+    def submit(self, user_prompt, custom_values, use_cache=True, mode=None, finalize=None):
+        custom_values = dict(custom_values)
+        return self._enqueue(
+            "generate",
+            lambda: stream_agent(user_prompt, custom_values, use_cache=use_cache, mode=mode), finalize
+        )
+
+    def submit_edit(self, response, user_prompt, custom_values, sections, finalize=None):
+        """Queue a section-level edit of an existing `response` (see `agent.edit_section`)."""
+        custom_values, sections = dict(custom_values), list(sections)
+        return self._enqueue(
+            "edit",
+            lambda: stream_edit(response, user_prompt, custom_values, sections), finalize
+        )
+
+    def submit_variants(self, user_prompt, variants, use_cache=True, finalize=None):
+        """Queue several versions of one site, generated concurrently (see `agent.stream_variants`).
+
+        Each variant is finalized as soon as it arrives, with
+        `finalize(response, index)`; `status()["variants"]` reports them one
+        by one. The job is done once every variant has finished and at
+        least one succeeded.
+        """
+        variants = [dict(variant, custom_values=dict(variant["custom_values"])) for variant in variants]
+        return self._enqueue(
+            "variants",
+            lambda: stream_variants(user_prompt, variants, use_cache=use_cache), finalize,
+            variants=[
+                {"label": variant.get("label") or str(index + 1), "status": "running",
+                 "response": None, "output": None, "error": None}
+                for index, variant in enumerate(variants)
+            ]
+        )
+
+    def _enqueue(self, kind, make_events, finalize, variants=None):
+        job = Job(kind, make_events, finalize)
+        job.variants = variants or []
+        with self._lock:
+            self._prune()
+            active = sum(1 for existing in self._jobs.values() if existing.status in ACTIVE_STATES)
+            if active >= self.max_queued:
+                raise QueueFullError("Too many generations in progress, please try again shortly.")
+            self._jobs[job.id] = job
+            job.future = self._pool.submit(self._run, job)
+        return job.id
+
+    def status(self, job_id):
+        """A snapshot of the job as a dict, or None for unknown/expired ids."""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return None
+            end = job.finished or time.time()
+            return {
+                "id": job.id,
+                "kind": job.kind,
+                "status": job.status,
+                "steps": list(job.steps),
+                "answer": "".join(job.answer),
+                "response": job.response,
+                "output": job.output,
+                "error": job.error,
+                "trace_id": job.trace_id,
+                "variants": [dict(variant) for variant in job.variants],
+                "queued_for": (job.started or end) - job.created,
+                "elapsed": end - (job.started or end),
+            }
+
+    def cancel(self, job_id):
+        """Cancel a queued or running job; returns False if it already finished.
+
+        A running job stops at its next streamed event; its LLM call is not
+        aborted, but the result is discarded and not cached.
+        """
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None or job.status not in ACTIVE_STATES:
+                return False
+            job.cancel_requested.set()
+            if job.future.cancel():
+                self._finish(job, "cancelled")
+            return True
+
+    def result(self, job_id, timeout=None):
+        """Wait for the job and return its response (None unless it succeeded).
+
+        For a variants job this is the list of responses, None for failed ones.
+        """
+        with self._lock:
+            job = self._jobs.get(job_id)
+        if job is None or not job.done.wait(timeout):
+            return None
+        return job.response if job.status == "done" else None
+
+    def _finish(self, job, status, error=None):
+        job.status = status
+        job.error = error
+        job.finished = time.time()
+        job.done.set()
+
+    def _finish_variant(self, job, index, response):
+        variant = job.variants[index]
+        if response.startswith("Agent failed"):
+            with self._lock:
+                variant.update(status="failed", error=response)
+            return
+        try:
+            with tracer.span("finalize", variant=index):
+                output = job.finalize(response, index) if job.finalize else None
+        except Exception as e:
+            with self._lock:
+                variant.update(status="failed", error=str(e))
+            return
+        with self._lock:
+            variant.update(status="done", response=response, output=output)
+
+    def _prune(self):
+        cutoff = time.time() - self.ttl
+        for job_id in [job_id for job_id, job in self._jobs.items() if job.finished and job.finished < cutoff]:
+            del self._jobs[job_id]
+
+    def _run(self, job):
+        with tracer.trace(job.kind, job_id=job.id) as trace:
+            job.trace_id = trace.id
+            self._run_traced(job)
+            trace.status = job.status
+
+    def _run_traced(self, job):
+        with self._lock:
+            if job.cancel_requested.is_set():
+                self._finish(job, "cancelled")
+                return
+            job.status = "running"
+            job.started = time.time()
+        events = job.make_events()
+        try:
+            response = None
+            for kind, payload in events:
+                if job.cancel_requested.is_set():
+                    break
+                if kind == "variant":
+                    self._finish_variant(job, *payload)
+                    continue
+                with self._lock:
+                    if kind == "step":
+                        job.steps.append(payload)
+                    elif kind == "answer":
+                        job.answer.append(payload)
+                    elif kind == "final":
+                        response = payload
+            if job.cancel_requested.is_set():
+                with self._lock:
+                    self._finish(job, "cancelled")
+                return
+            if job.variants:
+                with self._lock:
+                    failed = [variant["error"] for variant in job.variants if variant["status"] != "done"]
+                    job.response = [variant["response"] for variant in job.variants]
+                    if len(failed) < len(job.variants):
+                        self._finish(job, "done")
+                    else:
+                        self._finish(job, "failed", failed[0] or "Generation produced no response")
+                return
+            if response is None or response.startswith("Agent failed"):
+                with self._lock:
+                    self._finish(job, "failed", response or "Generation produced no response")
+                return
+            with tracer.span("finalize"):
+                output = job.finalize(response) if job.finalize else None
+            with self._lock:
+                job.response = response
+                job.output = output
+                self._finish(job, "done")
+        except Exception as e:
+            with self._lock:
+                self._finish(job, "failed", str(e))
+        finally:
+            events.close()
+
+
+generation_service = GenerationService()
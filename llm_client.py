@@ -0,0 +1,175 @@
+import os
+import time
+import random
+import threading
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from concurrent.futures import TimeoutError as FutureTimeoutError
+
+from stats import percentile
+
+RETRYABLE_MARKERS = (
+    "429", "rate limit", "ratelimit", "resource exhausted", "resourceexhausted",
+    "quota", "503", "unavailable", "deadline exceeded", "timed out"
+)
+
+
+def is_retryable(error):
+    if isinstance(error, TimeoutError):
+        return True
+    text = f"{type(error).__name__} {error}".lower()
+    return any(marker in text for marker in RETRYABLE_MARKERS)
+
+
+class LLMExecutor:
+    """Runs LLM calls with a timeout, retries and bounded concurrency.
+
+    - every call waits for one of `max_concurrency` slots, shared by all
+      sessions in the process;
+    - an attempt that exceeds `timeout` seconds, or fails with a rate-limit
+      style error, is retried with exponential backoff and full jitter; the
+      slot is only freed once the abandoned attempt has really finished, so
+      pass the same timeout to the client to have it abort the request;
+    - with `hedge=True`, once enough latencies are known, a duplicate request
+      is started when an attempt runs past the `hedge_quantile` latency and
+      whichever answer arrives first wins.
+
+    Every call is recorded (latency, attempts, hedging, tokens) for `metrics`.
+    """
+
+    def __init__(self, timeout=120.0, max_retries=4, base_delay=1.0, max_delay=30.0,
+                 max_concurrency=4, hedge=False, hedge_quantile=0.95, hedge_min_samples=20,
+                 window=500):
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.hedge = hedge
+        self.hedge_quantile = hedge_quantile
+        self.hedge_min_samples = hedge_min_samples
+        self._slots = threading.BoundedSemaphore(max_concurrency)
+        self._pool = ThreadPoolExecutor(max_workers=max_concurrency * 2, thread_name_prefix="llm")
+        self._lock = threading.Lock()
+        self._latencies = deque(maxlen=window)
+        self.calls = deque(maxlen=window)
+
+    @classmethod
+    def from_env(cls):
+        return cls(
+            timeout=float(os.environ.get("LLM_TIMEOUT", 120)),
+            max_retries=int(os.environ.get("LLM_MAX_RETRIES", 4)),
+            max_concurrency=int(os.environ.get("LLM_MAX_CONCURRENCY", 4)),
+            hedge=os.environ.get("LLM_HEDGE", "0") == "1"
+        )
+
+    def backoff(self, attempt):
+        return random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+
+    def hedge_after(self):
+        with self._lock:
+            if not self.hedge or len(self._latencies) < self.hedge_min_samples:
+                return None
+            return percentile(self._latencies, self.hedge_quantile)
+
+    def call(self, func, *args, quiet_func=None, **kwargs):
+        """Run `func(*args, **kwargs)` under the execution policy.
+
+        `quiet_func` is what a hedged duplicate, or a retry after a timed-out
+        attempt, runs instead of `func` (e.g. the same request without
+        streaming callbacks), since the earlier attempt may still be streaming.
+        """
+        record = {"started": time.time(), "attempts": 0, "hedged": False, "ok": False}
+        start = time.perf_counter()
+        target = func
+        try:
+            for attempt in range(self.max_retries + 1):
+                record["attempts"] = attempt + 1
+                try:
+                    result = self._attempt(target, args, kwargs, quiet_func, record)
+                except Exception as e:
+                    if attempt == self.max_retries or not is_retryable(e):
+                        record["error"] = f"{type(e).__name__}: {e}"
+                        raise
+                    if isinstance(e, TimeoutError):
+                        target = quiet_func or func
+                    time.sleep(self.backoff(attempt))
+                    continue
+                record["ok"] = True
+                record.update(token_usage(getattr(result, "generations", None) or []))
+                return result
+        finally:
+            record["latency"] = time.perf_counter() - start
+            with self._lock:
+                self.calls.append(record)
+                if record["ok"]:
+                    self._latencies.append(record["latency"])
+
+    def _submit(self, func, args, kwargs):
+        # The caller holds a slot; it is released when the call finishes, not
+        # when we stop waiting, so abandoned attempts still count.
+        try:
+            future = self._pool.submit(func, *args, **kwargs)
+        except BaseException:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+        return future
+
+    def _result(self, future, timeout):
+        try:
+            return future.result(timeout=timeout)
+        except FutureTimeoutError:
+            if future.done():
+                raise  # the call itself timed out
+            raise TimeoutError(f"LLM call exceeded {self.timeout}s") from None
+
+    def _attempt(self, func, args, kwargs, quiet_func, record):
+        self._slots.acquire()
+        primary = self._submit(func, args, kwargs)
+        threshold = self.hedge_after()
+        if threshold is None or threshold >= self.timeout:
+            return self._result(primary, self.timeout)
+        done, _ = wait([primary], timeout=threshold)
+        if done:
+            return primary.result()
+        # Only hedge when a spare slot exists, so the concurrency bound holds.
+        if not self._slots.acquire(blocking=False):
+            return self._result(primary, self.timeout - threshold)
+        record["hedged"] = True
+        duplicate = self._submit(quiet_func or func, args, kwargs)
+        done, _ = wait([primary, duplicate], timeout=self.timeout - threshold, return_when=FIRST_COMPLETED)
+        if not done:
+            raise TimeoutError(f"LLM call exceeded {self.timeout}s")
+        winner = done.pop()
+        if winner.exception() is not None:
+            loser = duplicate if winner is primary else primary
+            return self._result(loser, self.timeout - threshold)
+        return winner.result()
+
+    def metrics(self):
+        with self._lock:
+            calls = list(self.calls)
+            latencies = [call["latency"] for call in calls if call["ok"]]
+        return {
+            "calls": len(calls),
+            "errors": sum(1 for call in calls if not call["ok"]),
+            "retries": sum(call["attempts"] - 1 for call in calls),
+            "hedged": sum(1 for call in calls if call["hedged"]),
+            "latency_p50": percentile(latencies, 0.5) if latencies else None,
+            "latency_p95": percentile(latencies, 0.95) if latencies else None,
+            "input_tokens": sum(call.get("input_tokens", 0) for call in calls),
+            "output_tokens": sum(call.get("output_tokens", 0) for call in calls),
+        }
+
+
+def token_usage(generations):
+    """Input/output tokens summed over the `usage_metadata` of chat generations."""
+    usage = {"input_tokens": 0, "output_tokens": 0}
+    for generation in generations:
+        metadata = getattr(getattr(generation, "message", None), "usage_metadata", None) or {}
+        usage["input_tokens"] += metadata.get("input_tokens", 0)
+        usage["output_tokens"] += metadata.get("output_tokens", 0)
+    return usage
+
+
+llm_executor = LLMExecutor.from_env()
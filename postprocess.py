@@ -0,0 +1,218 @@
+import os
+import re
+from sections import css_rules, locate_section, related_rules
+from templates import write_files
+from tracing import tracer
+
+# Strings and comments, so the minifiers only touch the code between them.
+_CSS_TOKENS = re.compile(r"""("(?:\\.|[^"\\])*"|'(?:\\.|[^'\\])*')|(/\*.*?\*/)""", re.S)
+_CSS_SPACE_AROUND = re.compile(r"\s*([{};,>])\s*")
+_CSS_SPACE_AFTER_COLON = re.compile(r":\s+")
+_HTML_RAW = re.compile(r"(<(pre|textarea|script|style)\b[^>]*>)(.*?)(</\2\s*>)", re.I | re.S)
+_HTML_COMMENT = re.compile(r"<!--(?!\[if).*?-->", re.S)
+_EMPTY_RULE = re.compile(r"\{\s*\}$")
+_HEAD_END = re.compile(r"</head\s*>", re.I)
+_STYLESHEET_LINK = re.compile(r'<link rel="stylesheet" href="style\.css">')
+# What may precede a `/` that starts a regex literal rather than a division.
+_REGEX_PRECEDERS = set("(,=:[!&|?{};+-*%<>~^") | {""}
+_REGEX_KEYWORDS = ("return", "typeof", "case", "in", "of", "delete", "void", "throw", "new")
+
+
+def _minify_css_code(code):
+    code = " ".join(code.split())
+    code = _CSS_SPACE_AROUND.sub(r"\1", code)
+    return _CSS_SPACE_AFTER_COLON.sub(":", code).replace(";}", "}")
+
+
+def minify_css(css):
+    """Drop comments and redundant whitespace, leaving strings untouched."""
+    out = []
+    last = 0
+    for match in _CSS_TOKENS.finditer(css):
+        out.append(_minify_css_code(css[last:match.start()]))
+        if match.group(1):
+            out.append(match.group(1))
+        last = match.end()
+    out.append(_minify_css_code(css[last:]))
+    return "".join(out).strip()
+
+
+def dedupe_css(css):
+    """Remove empty rules and duplicates, keeping the last copy (the one that wins).
+
+    Rules are compared minified, so comments and formatting don't matter.
+    """
+    rules = css_rules(css)
+    normalized = [minify_css(css[rule.start:rule.end]) for rule in rules]
+    last_seen = {text: index for index, text in enumerate(normalized)}
+    doomed = [
+        rule for index, (rule, text) in enumerate(zip(rules, normalized))
+        if last_seen[text] != index or _EMPTY_RULE.search(text)
+    ]
+    for rule in reversed(doomed):
+        css = css[:rule.start] + css[rule.end:]
+    return css
+
+
+def _starts_regex(before):
+    """Whether a `/` after the code `before` opens a regex literal (not a division)."""
+    before = before.rstrip()
+    word = re.search(r"[\w$]+$", before)
+    if word:
+        return word.group(0) in _REGEX_KEYWORDS
+    return before[-1:] in _REGEX_PRECEDERS
+
+
+def _string_end(js, i):
+    """Index just past the string or template literal opening at `i`."""
+    quote, j, n = js[i], i + 1, len(js)
+    while j < n:
+        if js[j] == "\\":
+            j += 2
+        elif js[j] == quote:
+            return j + 1
+        elif quote == "`" and js.startswith("${", j):
+            j = _substitution_end(js, j + 2)
+        else:
+            j += 1
+    return n
+
+
+def _substitution_end(js, i):
+    """Index just past the `}` closing a template `${...}` whose code starts at `i`."""
+    depth, n = 0, len(js)
+    while i < n:
+        char = js[i]
+        if char in "\"'`":
+            i = _string_end(js, i)
+            continue
+        if char == "{":
+            depth += 1
+        elif char == "}":
+            if not depth:
+                return i + 1
+            depth -= 1
+        i += 1
+    return n
+
+
+def minify_js(js):
+    """Strip comments and indentation, keeping line breaks (so ASI still holds).
+
+    Strings and template literals are kept byte for byte, even multi-line ones.
+    """
+    out = []
+    literals = []
+    i, n = 0, len(js)
+    while i < n:
+        char = js[i]
+        if char in "\"'`":
+            j = _string_end(js, i)
+            literals.append(js[i:j])
+            out.append(f"\0{len(literals) - 1}\0")
+            i = j
+        elif js.startswith("//", i):
+            end = js.find("\n", i)
+            i = n if end == -1 else end
+        elif js.startswith("/*", i):
+            end = js.find("*/", i + 2)
+            i = n if end == -1 else end + 2
+        elif char == "/" and _starts_regex("".join(out[-64:])):
+            j, in_class = i + 1, False
+            while j < n and js[j] != "\n" and (in_class or js[j] != "/"):
+                if js[j] == "\\":
+                    j += 1
+                elif js[j] == "[":
+                    in_class = True
+                elif js[j] == "]":
+                    in_class = False
+                j += 1
+            out.append(js[i:j + 1])
+            i = j + 1
+        else:
+            out.append(char)
+            i += 1
+    lines = (line.strip() for line in "".join(out).splitlines())
+    code = "\n".join(line for line in lines if line)
+    return re.sub(r"\0(\d+)\0", lambda match: literals[int(match.group(1))], code)
+
+
+def minify_html(html):
+    """Collapse whitespace and drop comments; inline <style>/<script> are minified too."""
+    raw = []
+
+    def keep(match):
+        open_tag, tag, body, close_tag = match.groups()
+        if tag.lower() == "style":
+            body = minify_css(body)
+        elif tag.lower() == "script":
+            body = minify_js(body)
+        raw.append(open_tag + body + close_tag)
+        return f"\0{len(raw) - 1}\0"
+
+    html = _HTML_RAW.sub(keep, html)
+    html = _HTML_COMMENT.sub("", html)
+    html = re.sub(r"\s+", lambda match: "\n" if "\n" in match.group(0) else " ", html).strip()
+    return re.sub(r"\0(\d+)\0", lambda match: raw[int(match.group(1))], html)
+
+
+def critical_css(html, css):
+    """Rules for what is on screen first: html/body/:root/* plus the header, nav and hero."""
+    base = re.compile(r"(?:^|[\s,])(?:html|body|:root|\*)(?![\w-])", re.I)
+    rules = [rule for rule in css_rules(css) if not rule.selector.startswith("@") and base.search(rule.selector)]
+    for section in ("header", "hero"):
+        span = locate_section(html, section)
+        if span is not None:
+            rules += related_rules(css, html[span[0]:span[1]])
+    rules = sorted(set(rules), key=lambda rule: rule.start)
+    return "\n".join(css[rule.start:rule.end] for rule in rules)
+
+
+def inline_critical_css(html, css):
+    """Inline the critical rules and load style.css without blocking the first paint."""
+    critical = critical_css(html, css)
+    if not critical or not _STYLESHEET_LINK.search(html):
+        return html
+    html = _STYLESHEET_LINK.sub(
+        '<link rel="preload" href="style.css" as="style" onload="this.onload=null;this.rel=\'stylesheet\'">'
+        '<noscript><link rel="stylesheet" href="style.css"></noscript>',
+        html,
+        count=1
+    )
+    return _HEAD_END.sub(lambda match: f"<style>{minify_css(critical)}</style>\n{match.group(0)}", html, count=1)
+
+
+def postprocess_site(paths, minify=True, dedupe=True, inline_critical=False):
+    """Rewrite a written site in place; returns `{"files": {name: [before, after]}, "before", "after"}`.
+
+    Files are matched by extension, so any page list works; the rewrite
+    goes through `templates.write_files` like the original write.
+    """
+    with tracer.span("postprocess"):
+        texts = {}
+        for path in paths:
+            with open(path, "r", encoding="utf-8") as f:
+                texts[os.path.basename(path)] = f.read()
+        before = {name: len(text.encode("utf-8")) for name, text in texts.items()}
+
+        css = texts.get("style.css")
+        if css is not None and dedupe:
+            css = dedupe_css(css)
+        for name, text in texts.items():
+            if name.endswith(".html"):
+                if inline_critical and css:
+                    text = inline_critical_css(text, css)
+                texts[name] = minify_html(text) if minify else text
+            elif name.endswith(".js") and minify:
+                texts[name] = minify_js(text)
+        if css is not None:
+            texts["style.css"] = minify_css(css) if minify else css
+
+        output_dir = os.path.dirname(paths[0]) if paths else "."
+        write_files(texts, output_dir)
+        files = {name: [before[name], len(text.encode("utf-8"))] for name, text in texts.items()}
+        return {
+            "files": files,
+            "before": sum(sizes[0] for sizes in files.values()),
+            "after": sum(sizes[1] for sizes in files.values()),
+        }
@@ -0,0 +1,82 @@
+import base64
+import hashlib
+import threading
+from collections import OrderedDict
+from functools import cached_property
+from utils import extract_component_blocks
+
+PREVIEW_CACHE_SIZE = 32
+
+# Opened from a data: URL in a new tab, the page reloads itself once so that
+# scripts relying on a real navigation run; inside the preview iframe it
+# does nothing.
+RELOAD_ONCE_SCRIPT = """
+<script>
+// Run only if not in iframe (i.e., opened in new tab)
+  if (window.top === window.self) {
+    if (!window.location.hash.includes("#reloaded")) {
+      window.location.href = window.location.href + "#reloaded";
+      window.location.reload();
+    }
+  }
+</script>
+"""
+
+
+class PreviewRender:
+    """Parsed blocks and assembled preview page for one response.
+
+    Instances are cached by `render_preview`, so Streamlit reruns reuse them;
+    the base64 `data_url` is only computed once the user asks to open the
+    site in a new tab, and kept for later reruns.
+    """
+
+    def __init__(self, response, reload_once=False):
+        self.blocks = extract_component_blocks(response)
+        self.html_code = "\n".join(self.blocks.get("html", [])).replace("```html", "").replace("```", "")
+        self.css_code = "\n".join(self.blocks.get("css", []))
+        self.js_code = "\n".join(self.blocks.get("js", []))
+        self.full_html = f"""<!DOCTYPE html>
+<html lang="en">
+<head>
+  <meta charset="UTF-8">
+  <title>Web Preview</title>
+  <style>{self.css_code}</style>
+</head>
+<body>
+{self.html_code}
+{RELOAD_ONCE_SCRIPT if reload_once else ""}
+<script>{self.js_code}</script>
+</body>
+</html>
+"""
+
+    def joined(self, lang):
+        return "\n\n".join(self.blocks.get(lang, []))
+
+    @cached_property
+    def data_url(self):
+        return "data:text/html;base64," + base64.b64encode(self.full_html.encode()).decode()
+
+    @property
+    def has_data_url(self):
+        return "data_url" in self.__dict__
+
+
+_renders = OrderedDict()
+_renders_lock = threading.Lock()
+
+
+def render_preview(response, reload_once=False):
+    key = (hashlib.sha256(response.encode("utf-8")).hexdigest(), reload_once)
+    with _renders_lock:
+        render = _renders.get(key)
+        if render is not None:
+            _renders.move_to_end(key)
+            return render
+    render = PreviewRender(response, reload_once)
+    with _renders_lock:
+        _renders[key] = render
+        while len(_renders) > PREVIEW_CACHE_SIZE:
+            _renders.popitem(last=False)
+    return render
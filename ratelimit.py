@@ -0,0 +1,34 @@
+import time
+import threading
+
+
+class RateLimiter:
+    """Thread-safe token bucket: at most `rate` acquisitions per `period`
+    seconds on average, with bursts of up to `burst`."""
+
+    def __init__(self, rate, period=60.0, burst=None):
+        self.rate = rate
+        self.period = period
+        self.capacity = burst or max(1, int(rate))
+        self.tokens = float(self.capacity)
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now):
+        elapsed = now - self.updated
+        self.tokens = min(self.capacity, self.tokens + elapsed * self.rate / self.period)
+        self.updated = now
+
+    def acquire(self):
+        """Block until a token is available; returns the seconds waited."""
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._refill(now)
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return waited
+                delay = (1 - self.tokens) * self.period / self.rate
+            time.sleep(delay)
+            waited += delay
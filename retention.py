@@ -0,0 +1,79 @@
+import os
+import gzip
+from datetime import datetime, timedelta
+from collections import namedtuple
+
+try:
+    import zstandard
+except ImportError:  # optional: gzip is used instead
+    zstandard = None
+
+# Chats are only ever dropped when a limit is set; 0 (the default) disables it.
+# Bytes are the uncompressed size of the stored responses.
+HISTORY_MAX_ENTRIES = int(os.environ.get("HISTORY_MAX_ENTRIES", 0))
+HISTORY_MAX_BYTES = int(os.environ.get("HISTORY_MAX_BYTES", 0))
+HISTORY_MAX_AGE_DAYS = float(os.environ.get("HISTORY_MAX_AGE_DAYS", 0))
+# The newest chats stay uncompressed in the hot log; older ones move to cold segments.
+HISTORY_HOT_ENTRIES = int(os.environ.get("HISTORY_HOT_ENTRIES", 50))
+HISTORY_CODEC = os.environ.get("HISTORY_CODEC") or ("zstd" if zstandard else "gzip")
+
+CODEC_EXTENSIONS = {"gzip": "gz", "zstd": "zst"}
+
+RetentionPolicy = namedtuple("RetentionPolicy", "max_entries max_bytes max_age_days hot_entries codec")
+
+DEFAULT_POLICY = RetentionPolicy(
+    HISTORY_MAX_ENTRIES, HISTORY_MAX_BYTES, HISTORY_MAX_AGE_DAYS, HISTORY_HOT_ENTRIES, HISTORY_CODEC
+)
+
+
+def compress(data, codec):
+    if codec == "zstd":
+        if zstandard is None:
+            raise RuntimeError("zstd compression needs the zstandard package")
+        return zstandard.ZstdCompressor(level=10).compress(data)
+    if codec == "gzip":
+        return gzip.compress(data, compresslevel=6)
+    raise ValueError(f"Unknown history codec: {codec}")
+
+
+def decompress(data, codec):
+    if codec == "zstd":
+        if zstandard is None:
+            raise RuntimeError("zstd-compressed history needs the zstandard package")
+        return zstandard.ZstdDecompressor().decompress(data)
+    if codec == "gzip":
+        return gzip.decompress(data)
+    raise ValueError(f"Unknown history codec: {codec}")
+
+
+def _expired(timestamp, cutoff):
+    try:
+        return datetime.fromisoformat(timestamp) < cutoff
+    except (TypeError, ValueError):
+        return False  # undated chats (e.g. migrated ones) are never too old
+
+
+def plan_retention(entries, policy, now=None):
+    """Split chat summaries (oldest first) into `(drop, cold)` id lists.
+
+    Chats past `max_age_days` are dropped, then the oldest ones until the
+    rest fit `max_entries` and `max_bytes`. Of the survivors, all but the
+    newest `hot_entries` are listed as cold (already-cold ones included).
+    """
+    drop = set()
+    if policy.max_age_days:
+        cutoff = (now or datetime.now()) - timedelta(days=policy.max_age_days)
+        drop.update(entry["id"] for entry in entries if _expired(entry.get("timestamp"), cutoff))
+    kept = [entry for entry in entries if entry["id"] not in drop]
+    total = sum(entry.get("size") or 0 for entry in kept)
+    start = 0
+    while start < len(kept) and (
+        (policy.max_entries and len(kept) - start > policy.max_entries)
+        or (policy.max_bytes and total > policy.max_bytes)
+    ):
+        total -= kept[start].get("size") or 0
+        drop.add(kept[start]["id"])
+        start += 1
+    kept = kept[start:]
+    cold_count = max(0, len(kept) - policy.hot_entries)
+    return [entry["id"] for entry in entries if entry["id"] in drop], [entry["id"] for entry in kept[:cold_count]]
@@ -0,0 +1,159 @@
+import os
+import re
+import sqlite3
+import threading
+from fences import parse_code_blocks
+from history import add_history_listener, get_history_store
+from sqlite_pool import LocalConnections
+
+SEARCH_RESULTS = int(os.environ.get("SEARCH_RESULTS", 20))
+# bm25 weights of the prompt, html, css and js columns: prompt matches rank first.
+COLUMN_WEIGHTS = (10.0, 2.0, 1.0, 1.0)
+
+_TOKEN = re.compile(r"\w+")
+
+
+def match_expression(query):
+    """User text as an FTS5 query: every word must match, the last one as a prefix."""
+    terms = [f'"{token}"' for token in _TOKEN.findall(query or "")]
+    if not terms:
+        return None
+    terms[-1] += "*"
+    return " ".join(terms)
+
+
+def _columns(record):
+    code = {"html": [], "css": [], "js": []}
+    for block in parse_code_blocks(record.get("response") or ""):
+        kind = "js" if block.kind == "jsx" else block.kind
+        if kind in code:
+            code[kind].append(block.code)
+    return (record.get("prompt") or "", *("\n".join(code[kind]) for kind in ("html", "css", "js")))
+
+
+class SearchIndex:
+    """SQLite FTS5 index over chat prompts and their generated HTML/CSS/JS.
+
+    It sits beside the history store (whichever backend) in its own file
+    and is kept current from history save/delete events. `sync` catches up
+    with chats written or removed by other processes, touching only the
+    ids that differ, so reopening it never re-indexes the whole history;
+    `search` runs it whenever the store's change marker has moved.
+    """
+
+    def __init__(self, store):
+        self.store = store
+        self.db_file = os.path.join(store.history_dir, "search.sqlite3")
+        self._connections = LocalConnections(self.db_file, row_factory=sqlite3.Row)
+        self._conn = self._connections.get
+        self._transaction = self._connections.transaction
+        self._synced = None
+        conn = self._conn()
+        conn.execute(
+            """CREATE TABLE IF NOT EXISTS chats (
+                seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                id TEXT UNIQUE NOT NULL,
+                prompt TEXT,
+                timestamp TEXT
+            )"""
+        )
+        if not conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'chat_text'").fetchone():
+            conn.execute("CREATE VIRTUAL TABLE chat_text USING fts5(prompt, html, css, js, tokenize='porter unicode61')")
+            weights = ", ".join(str(weight) for weight in COLUMN_WEIGHTS)
+            conn.execute("INSERT INTO chat_text (chat_text, rank) VALUES ('rank', ?)", (f"bm25({weights})",))
+
+    def _remove(self, conn, chat_id):
+        row = conn.execute("SELECT seq FROM chats WHERE id = ?", (chat_id,)).fetchone()
+        if row is not None:
+            conn.execute("DELETE FROM chat_text WHERE rowid = ?", (row["seq"],))
+            conn.execute("DELETE FROM chats WHERE seq = ?", (row["seq"],))
+
+    def _add(self, conn, record):
+        self._remove(conn, record["id"])
+        prompt, html, css, js = _columns(record)
+        seq = conn.execute(
+            "INSERT INTO chats (id, prompt, timestamp) VALUES (?, ?, ?)",
+            (record["id"], prompt, record.get("timestamp")),
+        ).lastrowid
+        conn.execute(
+            "INSERT INTO chat_text (rowid, prompt, html, css, js) VALUES (?, ?, ?, ?, ?)",
+            (seq, prompt, html, css, js),
+        )
+
+    def add(self, record):
+        with self._transaction() as conn:
+            self._add(conn, record)
+
+    def remove(self, chat_id):
+        with self._transaction() as conn:
+            self._remove(conn, chat_id)
+
+    def count(self):
+        return self._conn().execute("SELECT COUNT(*) FROM chats").fetchone()[0]
+
+    def sync(self):
+        """Index chats missing from the index and drop ones no longer in the store."""
+        marker = self.store.change_marker()  # read first: a change during the sync forces another one
+        current = [entry["id"] for entry in self.store.entries()]
+        indexed = {row["id"] for row in self._conn().execute("SELECT id FROM chats")}
+        stale = indexed.difference(current)
+        missing = [chat_id for chat_id in current if chat_id not in indexed]
+        if not stale and not missing:
+            self._synced = marker
+            return 0
+        with self._transaction() as conn:
+            for chat_id in stale:
+                self._remove(conn, chat_id)
+            for chat_id in missing:
+                record = self.store.get(chat_id)
+                if record is not None:
+                    self._add(conn, record)
+        self._synced = marker
+        return len(stale) + len(missing)
+
+    def search(self, query, limit=SEARCH_RESULTS):
+        """Best matches first, as dicts with id, prompt, timestamp and a `**marked**` snippet."""
+        expression = match_expression(query)
+        if expression is None:
+            return []
+        if self.store.change_marker() != self._synced:
+            self.sync()
+        rows = self._conn().execute(
+            """SELECT chats.id, chats.prompt, chats.timestamp,
+                      snippet(chat_text, -1, '**', '**', '…', 12) AS snippet
+               FROM chat_text JOIN chats ON chats.seq = chat_text.rowid
+               WHERE chat_text MATCH ? ORDER BY rank LIMIT ?""",
+            (expression, limit),
+        )
+        return [dict(row) for row in rows]
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def get_search_index(store=None):
+    """The process-wide index, synced with the history when first opened."""
+    global _index
+    with _index_lock:
+        if _index is None:
+            index = SearchIndex(store or get_history_store())
+            index.sync()
+            _index = index
+    return _index
+
+
+def _on_history_change(event, chat_id, record):
+    if _index is None:
+        return  # opening the index syncs it anyway
+    if event == "save":
+        _index.add(record)
+    elif event == "delete":
+        _index.remove(chat_id)
+
+
+add_history_listener(_on_history_change)
+
+
+def search_chats(query, limit=SEARCH_RESULTS):
+    return get_search_index().search(query, limit)
@@ -0,0 +1,147 @@
+import re
+from collections import namedtuple
+from fences import parse_code_blocks
+
+# Custom values that map onto one part of the page; "theme" restyles the CSS.
+SECTION_FIELDS = ("header", "hero", "footer")
+EDITABLE_FIELDS = SECTION_FIELDS + ("theme",)
+
+CssRule = namedtuple("CssRule", "selector start end")
+
+_OPENERS = {
+    "header": re.compile(r"<(header)\b[^>]*>", re.I),
+    "footer": re.compile(r"<(footer)\b[^>]*>", re.I),
+    "hero": re.compile(r"<(\w+)\b[^>]*\b(?:id|class)\s*=\s*[\"'][^\"']*\bhero\b[^\"']*[\"'][^>]*>", re.I),
+}
+_CLASS_ATTR = re.compile(r"\bclass\s*=\s*[\"']([^\"']*)[\"']", re.I)
+_ID_ATTR = re.compile(r"\bid\s*=\s*[\"']([^\"']*)[\"']", re.I)
+_CSS_COMMENT = re.compile(r"/\*.*?\*/", re.S)
+# Braces, plus the comments and strings whose braces must not count.
+_CSS_BRACES = re.compile(r"""/\*.*?(?:\*/|\Z)|"(?:\\.|[^"\\])*"|'(?:\\.|[^'\\])*'|[{}]""", re.S)
+
+
+class SectionNotFound(LookupError):
+    pass
+
+
+def changed_fields(old_values, new_values):
+    """Editable fields whose value changed (cleared text fields are ignored).
+
+    Without previous values (e.g. a chat from history) every filled-in
+    section counts as changed, but the theme does not.
+    """
+    return [
+        name for name in (EDITABLE_FIELDS if old_values else SECTION_FIELDS)
+        if (new_values.get(name) or "").strip()
+        and (new_values.get(name) or "").strip() != (old_values.get(name) or "").strip()
+    ]
+
+
+def locate_section(html, section):
+    """(start, end) of the element holding `section` in `html`, or None."""
+    opener = _OPENERS[section].search(html)
+    if opener is None:
+        return None
+    tag = re.compile(rf"<(/?){re.escape(opener.group(1))}\b[^>]*>", re.I)
+    depth = 1
+    for match in tag.finditer(html, opener.end()):
+        depth += -1 if match.group(1) else 1
+        if depth == 0:
+            return opener.start(), match.end()
+    return opener.start(), len(html)
+
+
+def css_rules(css):
+    """Top-level rules of `css` (an @media block counts as one rule).
+
+    A rule starts after the previous one, so it includes any comment in
+    front of it. Braces inside strings and comments are ignored.
+    """
+    rules = []
+    i = brace = depth = 0
+
+    def add(end):
+        prefix = css[i:brace]
+        start = i + len(prefix) - len(prefix.lstrip())
+        rules.append(CssRule(_CSS_COMMENT.sub("", prefix).strip(), start, end))
+
+    for match in _CSS_BRACES.finditer(css):
+        token = match.group(0)
+        if token == "{":
+            if not depth:
+                brace = match.start()
+            depth += 1
+        elif token == "}" and depth:
+            depth -= 1
+            if not depth:
+                add(match.end())
+                i = match.end()
+    if depth:
+        add(len(css))
+    return rules
+
+
+def related_rules(css, fragment):
+    """The plain rules whose selectors target the fragment's root tag, classes or ids."""
+    names = set()
+    for value in _CLASS_ATTR.findall(fragment):
+        names.update("." + name for name in value.split())
+    names.update("#" + value.strip() for value in _ID_ATTR.findall(fragment) if value.strip())
+    root = re.match(r"<(\w+)", fragment)
+    tags = {root.group(1).lower()} & {"header", "footer", "nav"} if root else set()
+    if not names and not tags:
+        return []
+    pattern = re.compile(
+        "|".join([re.escape(name) + r"(?![\w-])" for name in names] +
+                 [rf"(?<![\w.#-]){tag}(?![\w-])" for tag in tags]),
+        re.I
+    )
+    return [rule for rule in css_rules(css) if not rule.selector.startswith("@") and pattern.search(rule.selector)]
+
+
+def replace_rules(css, rules, replacement):
+    """Drop `rules` from `css` and put `replacement` where the first of them was."""
+    if not rules:
+        return css.rstrip() + "\n\n" + replacement.strip() + "\n" if replacement.strip() else css
+    for rule in reversed(rules[1:]):
+        css = css[:rule.start] + css[rule.end:].lstrip()
+    return css[:rules[0].start] + replacement.strip() + css[rules[0].end:]
+
+
+def replace_block(response, block, code):
+    return f"{response[:block.start]}```{block.lang}\n{code}\n```{response[block.end:]}"
+
+
+def section_context(response, section):
+    """The html block, the section's span in it and the css block with the rules that style it."""
+    blocks = parse_code_blocks(response)
+    css_block = next((block for block in blocks if block.kind == "css"), None)
+    if section == "theme":
+        if css_block is None:
+            raise SectionNotFound("The site has no CSS block to restyle.")
+        return None, None, css_block, css_rules(css_block.code)
+    for block in blocks:
+        if block.kind != "html":
+            continue
+        span = locate_section(block.code, section)
+        if span is not None:
+            fragment = block.code[span[0]:span[1]]
+            rules = related_rules(css_block.code, fragment) if css_block else []
+            return block, span, css_block, rules
+    raise SectionNotFound(f"No {section} section found in the generated HTML.")
+
+
+def merge_section(response, section, html_fragment, css_text):
+    """Splice an edited fragment (and its restyled rules) back into `response`."""
+    html_block, span, css_block, rules = section_context(response, section)
+    # Replace from the end of the response backwards so offsets stay valid.
+    edits = []
+    if html_block is not None and html_fragment:
+        code = html_block.code[:span[0]] + html_fragment.strip() + html_block.code[span[1]:]
+        edits.append((html_block, code))
+    if css_block is not None and css_text:
+        code = css_text.strip() if section == "theme" else replace_rules(css_block.code, rules, css_text)
+        edits.append((css_block, code))
+    for block, code in sorted(edits, key=lambda edit: edit[0].start, reverse=True):
+        response = replace_block(response, block, code)
+    return response
@@ -0,0 +1,173 @@
+import os
+import re
+import zlib
+import threading
+from collections import namedtuple
+import numpy as np
+from history import add_history_listener, get_history_store
+
+SIMILARITY_BUCKETS = int(os.environ.get("SIMILARITY_BUCKETS", 2 ** 20))
+SIMILARITY_THRESHOLD = float(os.environ.get("SIMILARITY_THRESHOLD", 0.5))
+BIGRAM_WEIGHT = 0.5
+
+_WORD = re.compile(r"[a-z0-9]+")
+# Words nearly every prompt has; IDF alone can't discount them while the history is small.
+_STOPWORDS = {
+    "a", "an", "the", "and", "or", "with", "for", "of", "to", "in", "on", "my", "our", "me",
+    "i", "is", "it", "that", "this", "create", "make", "build", "website", "site", "web", "page",
+}
+
+Match = namedtuple("Match", "chat_id prompt score")
+
+
+def _stem(word):
+    # Enough to fold plurals ("pages", "galleries") onto their singular.
+    if len(word) > 4 and word.endswith("ies"):
+        return word[:-3] + "y"
+    if len(word) > 3 and word.endswith("s") and not word.endswith("ss"):
+        return word[:-1]
+    return word
+
+
+def features(text):
+    """Hashed term counts of `text` as sorted `(buckets, weights)` arrays.
+
+    Terms are the words (minus stopwords) plus their bigrams, which count
+    for half so that reordering a prompt only costs a little similarity.
+    """
+    words = [_stem(word) for word in _WORD.findall((text or "").lower()) if word not in _STOPWORDS]
+    terms = [(word, 1.0) for word in words]
+    terms += [(f"{a} {b}", BIGRAM_WEIGHT) for a, b in zip(words, words[1:])]
+    if not terms:
+        return np.zeros(0, dtype=np.int32), np.zeros(0, dtype=np.float32)
+    hashes = np.array([zlib.crc32(term.encode("utf-8")) % SIMILARITY_BUCKETS for term, _ in terms], dtype=np.int32)
+    buckets, inverse = np.unique(hashes, return_inverse=True)
+    weights = np.bincount(inverse, weights=[weight for _, weight in terms]).astype(np.float32)
+    return buckets, weights
+
+
+class PromptIndex:
+    """TF-IDF vectors of past prompts for cosine-similarity lookups.
+
+    Each prompt is stored as a short sparse vector of hashed term counts,
+    and document frequencies are kept as a running sum, so adding or
+    removing a prompt is O(terms). The flat arrays used for scoring (and
+    the IDF-weighted norms) are rebuilt lazily on the first query after a
+    change; a query is then one vectorised pass over the stored terms.
+    """
+
+    def __init__(self, buckets=SIMILARITY_BUCKETS):
+        self._docs = {}
+        self._df = np.zeros(buckets, dtype=np.float32)
+        self._flat = None
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._docs)
+
+    def __contains__(self, chat_id):
+        return chat_id in self._docs
+
+    def ids(self):
+        with self._lock:
+            return set(self._docs)
+
+    def add(self, chat_id, prompt):
+        buckets, weights = features(prompt)
+        with self._lock:
+            self._discard(chat_id)
+            self._docs[chat_id] = (buckets, weights, prompt)
+            self._df[buckets] += 1
+            self._flat = None
+
+    def remove(self, chat_id):
+        with self._lock:
+            self._discard(chat_id)
+
+    def _discard(self, chat_id):
+        doc = self._docs.pop(chat_id, None)
+        if doc is not None:
+            self._df[doc[0]] -= 1
+            self._flat = None
+
+    def _arrays(self):
+        if self._flat is None:
+            ids = list(self._docs)
+            docs = list(self._docs.values())
+            buckets = np.concatenate([doc[0] for doc in docs])
+            weights = np.concatenate([doc[1] for doc in docs])
+            rows = np.repeat(np.arange(len(docs)), [len(doc[0]) for doc in docs])
+            idf = np.log((1 + len(docs)) / (1 + self._df)) + 1
+            norms = np.sqrt(np.bincount(rows, weights=(weights * idf[buckets]) ** 2, minlength=len(docs)))
+            self._flat = (ids, [doc[2] for doc in docs], buckets, weights, rows, idf, norms)
+        return self._flat
+
+    def query(self, prompt, limit=3, threshold=SIMILARITY_THRESHOLD):
+        """Past prompts with cosine similarity >= `threshold`, best first."""
+        query_buckets, query_weights = features(prompt)
+        if not len(query_buckets):
+            return []
+        with self._lock:
+            if not self._docs:
+                return []
+            ids, prompts, buckets, weights, rows, idf, norms = self._arrays()
+        query_idf = idf[query_buckets]
+        query_norm = np.linalg.norm(query_weights * query_idf)
+        hits = np.isin(buckets, query_buckets)
+        hit_buckets = buckets[hits]
+        products = weights[hits] * (query_weights * query_idf ** 2)[np.searchsorted(query_buckets, hit_buckets)]
+        scores = np.bincount(rows[hits], weights=products, minlength=len(ids)) / np.maximum(norms * query_norm, 1e-12)
+        best = np.argsort(-scores)[:limit]
+        return [Match(ids[i], prompts[i], float(scores[i])) for i in best if scores[i] >= threshold]
+
+
+_index = None
+_index_lock = threading.Lock()
+_synced = None  # the history's change marker as of the last sync
+
+
+def _on_history_change(event, chat_id, record):
+    with _index_lock:
+        if _index is None:
+            return  # not built yet; the first query reads the store anyway
+        if event == "save":
+            _index.add(chat_id, record.get("prompt") or "")
+        elif event == "delete":
+            _index.remove(chat_id)
+
+
+add_history_listener(_on_history_change)
+
+
+def _sync(index, store):
+    current = dict(store.prompts())
+    for chat_id in index.ids() - current.keys():
+        index.remove(chat_id)
+    for chat_id, prompt in current.items():
+        if chat_id not in index:
+            index.add(chat_id, prompt)
+
+
+def get_prompt_index(store=None):
+    """The process-wide index, built from the history on first use.
+
+    It is re-synced whenever the history's change marker moves, so chats
+    saved or deleted by other processes show up too.
+    """
+    global _index, _synced
+    store = store or get_history_store()
+    with _index_lock:
+        marker = store.change_marker()  # read first: a change during the sync forces another one
+        if _index is None or marker != _synced:
+            index = _index or PromptIndex()
+            _sync(index, store)
+            _index, _synced = index, marker
+    return _index
+
+
+def find_similar_chats(prompt, limit=3, threshold=SIMILARITY_THRESHOLD, exclude=(), store=None):
+    """Past chats whose prompt is a near-duplicate of `prompt`, minus the ids in `exclude`."""
+    if not (prompt or "").strip():
+        return []
+    matches = get_prompt_index(store).query(prompt, limit + len(exclude), threshold)
+    return [match for match in matches if match.chat_id not in exclude][:limit]
@@ -0,0 +1,38 @@
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+
+class LocalConnections:
+    """One WAL-mode SQLite connection per thread for the database at `path`.
+
+    sqlite3 connections must stay on the thread that made them; WAL lets
+    sessions (and processes) read the same file while another one writes.
+    """
+
+    def __init__(self, path, row_factory=None):
+        self.path = path
+        self.row_factory = row_factory
+        self._local = threading.local()
+
+    def get(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            if self.row_factory is not None:
+                conn.row_factory = self.row_factory
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    @contextmanager
+    def transaction(self):
+        """A write transaction on this thread's connection, rolled back on error."""
+        conn = self.get()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield conn
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
@@ -0,0 +1,4 @@
+def percentile(values, fraction):
+    """Nearest-rank percentile of a non-empty sequence, `fraction` in [0, 1]."""
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))]
@@ -0,0 +1,138 @@
+import os
+import re
+from collections import namedtuple
+
+MAX_PAGES = int(os.environ.get("MAX_PAGES", 50))
+
+Page = namedtuple("Page", "slug title filename body")
+
+PAGE_BODIES = {
+    "about": ("About", "<h1>About Us</h1><p>This is the about page.</p>"),
+    "contact": ("Contact", "<h1>Contact Us</h1><p>Email: contact@example.com</p>"),
+}
+# Names a page is commonly given; a lone word before "page" only counts if it is one of these.
+PAGE_NAMES = {
+    "about", "contact", "services", "service", "gallery", "menu", "faq", "faqs", "blog", "pricing",
+    "team", "portfolio", "testimonials", "careers", "shop", "store", "products", "events", "reservations",
+    "booking", "bookings", "news", "projects", "clients", "reviews", "privacy", "terms", "login", "signup",
+    "register", "resources", "features", "locations", "history", "press", "partners", "support", "help",
+}
+# Words that describe pages rather than name one ("landing pages", "three pages", "a responsive page").
+_NOT_PAGES = {
+    "landing", "web", "html", "static", "multiple", "several", "many", "more", "few", "all",
+    "other", "separate", "individual", "inner", "sub", "the", "its", "our", "and", "home", "index",
+    "a", "an", "single", "one", "two", "three", "four", "five", "six", "seven", "eight", "nine", "ten",
+    "first", "second", "third", "extra", "additional", "different", "new", "main", "simple", "basic",
+    "responsive", "modern", "minimal", "clean", "beautiful", "dynamic", "mobile", "full", "whole",
+}
+_NAME = r"[a-z][\w-]*"
+_SEPARATOR = r"(?:\s*,\s*(?:and\s+)?|\s+and\s+|\s*[&/]\s*)"
+_NAME_LIST = rf"{_NAME}(?:{_SEPARATOR}{_NAME})*"
+# "services, gallery and faq pages" / "pages: menu, about and contact"
+_LIST_BEFORE = re.compile(rf"({_NAME_LIST})\s+pages?\b")
+_LIST_AFTER = re.compile(rf"\bpages?\s*:\s*({_NAME_LIST})")
+_LIST_SEPARATOR = re.compile(r"\s*(?:,|\band\b|&|/)\s*")
+_HERO = re.compile(r'(<section\s+[^>]*id=["\']hero["\'][^>]*)(>)', re.IGNORECASE)
+
+
+def render_page(title, nav, body):
+    return f"""<!DOCTYPE html>
+<html lang="en">
+<head>
+  <meta charset="UTF-8" />
+  <meta name="viewport" content="width=device-width, initial-scale=1.0">
+  <title>{title}</title>
+  <link rel="stylesheet" href="style.css">
+</head>
+<body>
+  {nav}
+  {body}
+  <script src="script.js"></script>
+</body>
+</html>
+"""
+
+
+def _slug(name):
+    return re.sub(r"[^a-z0-9]+", "-", name.lower()).strip("-")
+
+
+def _names(match):
+    return [_slug(name) for name in _LIST_SEPARATOR.split(match.group(1))]
+
+
+def page_slugs(prompt):
+    """Extra pages (besides index) the prompt asks for, in the order named.
+
+    "about" and "contact" anywhere in the prompt add those pages as before.
+    Other pages need an explicit list, "with services, gallery and faq pages"
+    or "pages: menu, about and contact"; a single word before "page" only
+    counts when it is in `PAGE_NAMES` ("a gallery page", not "a single page").
+    """
+    text = (prompt or "").lower()
+    slugs = []
+    for match in _LIST_BEFORE.finditer(text):
+        names = _names(match)
+        slugs += names if len(names) > 1 else [name for name in names if name in PAGE_NAMES]
+    for match in _LIST_AFTER.finditer(text):
+        slugs += _names(match)
+    slugs += [name for name in PAGE_BODIES if name in text]
+    unique = []
+    for slug in slugs:
+        if slug and slug not in _NOT_PAGES and slug not in unique:
+            unique.append(slug)
+    return unique[:MAX_PAGES]
+
+
+def build_pages(slugs, index_body):
+    """The index page plus one placeholder page per slug."""
+    pages = [Page("index", "Home", "index.html", index_body)]
+    for slug in slugs:
+        title, body = PAGE_BODIES.get(slug) or (
+            slug.replace("-", " ").title(),
+            f"<h1>{slug.replace('-', ' ').title()}</h1><p>This is the {slug.replace('-', ' ')} page.</p>"
+        )
+        pages.append(Page(slug, title, f"{slug}.html", body))
+    return pages
+
+
+def nav_html(pages):
+    links = "".join(f'<a href="{page.filename}">{page.title}</a> ' for page in pages)
+    return f"<nav>{links}</nav>" if links else ""
+
+
+def with_hero_image(body, image_url):
+    if image_url and '<section id="hero"' in body:
+        return _HERO.sub(
+            rf'\1 style="background-image: url({image_url}); background-size: cover; background-position: center;"\2',
+            body
+        )
+    return body
+
+
+def render_site(pages, css="", js="", image_url=""):
+    """Every file of the site as `{filename: text}`.
+
+    The nav is built once and shared by every page, and the CSS/JS are
+    emitted a single time as style.css and script.js.
+    """
+    nav = nav_html(pages)
+    files = {}
+    for position, page in enumerate(pages):
+        files[page.filename] = render_page(page.title, nav, with_hero_image(page.body, image_url))
+        if position == 0:
+            files["style.css"] = css
+            files["script.js"] = js
+    return files
+
+
+def write_files(files, output_dir):
+    """Write `{filename: text}` into `output_dir`, returning the paths in order."""
+    os.makedirs(output_dir, exist_ok=True)
+    paths = []
+    for name, text in files.items():
+        path = os.path.join(output_dir, name)
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(text)
+        paths.append(path)
+    return paths
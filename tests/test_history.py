@@ -0,0 +1,107 @@
+import os
+import json
+import pytest
+from history import JsonlHistoryStore, SqliteHistoryStore
+from retention import RetentionPolicy, plan_retention
+
+
+def policy(max_entries=0, hot_entries=2, codec="gzip"):
+    return RetentionPolicy(max_entries, 0, 0, hot_entries, codec)
+
+
+def fill(store, count):
+    return [store.append({"prompt": f"site {number}", "response": f"<html>{number}</html>" * 50}) for number in range(count)]
+
+
+@pytest.fixture
+def store(tmp_path):
+    return JsonlHistoryStore(str(tmp_path))
+
+
+def test_default_limits_never_drop():
+    entries = [{"id": str(number), "size": 10 ** 9} for number in range(5000)]
+    drop, cold = plan_retention(entries, RetentionPolicy(0, 0, 0, 50, "gzip"))
+    assert drop == []
+    assert len(cold) == 4950
+
+
+def test_compact_drops_oldest_and_compresses_the_rest(store):
+    ids = fill(store, 10)
+    assert store.compact(policy(max_entries=6)) == ids[:4]
+    assert [entry["id"] for entry in store.entries()] == ids[4:]
+    assert store.get(ids[0]) is None
+    for number, chat_id in enumerate(ids[4:], start=4):
+        assert store.get(chat_id)["response"] == f"<html>{number}</html>" * 50
+    cold = [entry for entry in store.entries() if entry.get("segment")]
+    assert [entry["id"] for entry in cold] == ids[4:8]
+    assert os.path.getsize(store.log_file) == sum(entry["length"] for entry in store.entries() if not entry.get("segment"))
+
+
+def test_compact_is_a_no_op_when_nothing_is_due(store):
+    fill(store, 5)
+    store.compact(policy())
+    segments = os.listdir(store.cold_dir)
+    assert store.compact(policy()) == []
+    assert os.listdir(store.cold_dir) == segments
+
+
+def test_delete_inside_a_segment_is_reclaimed(store):
+    ids = fill(store, 6)
+    store.compact(policy())
+    (segment,) = os.listdir(store.cold_dir)
+    assert store.delete(ids[1])
+    store.compact(policy())
+    (rewritten,) = os.listdir(store.cold_dir)
+    assert rewritten != segment
+    assert rewritten.split("-")[0] == segment.split("-")[0]
+    assert store.get(ids[1]) is None
+    assert [store.get(chat_id)["id"] for chat_id in (ids[0], ids[2], ids[3])] == [ids[0], ids[2], ids[3]]
+
+
+def test_reader_with_stale_index_follows_compaction(tmp_path):
+    writer = JsonlHistoryStore(str(tmp_path))
+    reader = JsonlHistoryStore(str(tmp_path))
+    ids = fill(writer, 6)
+    assert reader.get(ids[0])["prompt"] == "site 0"
+    writer.compact(policy(max_entries=5))
+    assert reader.get(ids[0]) is None
+    assert reader.get(ids[1])["prompt"] == "site 1"
+    assert reader.get(ids[5])["prompt"] == "site 5"
+    assert reader.count() == 5
+
+
+def test_rebuild_index_restores_cold_and_hot_chats(store):
+    ids = fill(store, 6)
+    store.compact(policy())
+    store.delete(ids[4])
+    # A crash between the log append and the index append leaves an unindexed chat.
+    with open(store.log_file, "ab") as f:
+        f.write(json.dumps({"id": "unindexed", "prompt": "lost site", "response": ""}).encode("utf-8") + b"\n")
+    fresh = JsonlHistoryStore(store.history_dir)
+    fresh.rebuild_index()
+    assert [entry["id"] for entry in fresh.entries()] == ids[:4] + [ids[5], "unindexed"]
+    assert fresh.get(ids[0])["prompt"] == "site 0"
+    assert fresh.get(ids[5])["prompt"] == "site 5"
+    assert fresh.get("unindexed")["prompt"] == "lost site"
+
+
+def test_stray_files_in_cold_dir_are_ignored(store):
+    ids = fill(store, 5)
+    store.compact(policy())
+    for name in (".DS_Store", "notes.txt", "1-2.gz.tmp"):
+        with open(os.path.join(store.cold_dir, name), "wb") as f:
+            f.write(b"junk")
+    store.delete(ids[0])
+    store.compact(policy())
+    store.rebuild_index()
+    assert [entry["id"] for entry in store.entries()] == ids[1:]
+    assert ".DS_Store" in os.listdir(store.cold_dir)
+
+
+def test_sqlite_compact(tmp_path):
+    store = SqliteHistoryStore(str(tmp_path))
+    ids = fill(store, 6)
+    assert store.compact(policy(max_entries=5)) == ids[:1]
+    assert store.get(ids[0]) is None
+    assert store.get(ids[1])["response"] == "<html>1</html>" * 50
+    assert store.count() == 5
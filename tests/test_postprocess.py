@@ -0,0 +1,43 @@
+from postprocess import dedupe_css, minify_css, minify_js
+from sections import css_rules
+
+
+def test_dedupe_ignores_comments_and_formatting():
+    assert minify_css(dedupe_css("/* Buttons */ .btn{color:red}\n/* Again */ .btn{color:red}")) == ".btn{color:red}"
+    assert minify_css(dedupe_css(".btn { color: red; }\n.btn{color:red;}")) == ".btn{color:red}"
+
+
+def test_dedupe_keeps_the_last_copy_and_drops_empty_rules():
+    css = ".a{color:red}\n.b{}\n.c{color:blue}\n.a { color: red }"
+    assert minify_css(dedupe_css(css)) == ".c{color:blue}.a{color:red}"
+
+
+def test_rules_skip_braces_in_strings_and_comments():
+    css = '.a{content:"}"}\n/* { */ .b{color:red}\n@media (max-width:600px){.c{color:blue}}'
+    assert [rule.selector for rule in css_rules(css)] == [".a", ".b", "@media (max-width:600px)"]
+    assert minify_css(dedupe_css(css + '\n.a{content:"}"}')) == '.b{color:red}@media (max-width:600px){.c{color:blue}}.a{content:"}"}'
+
+
+def test_minify_css_keeps_strings():
+    css = '/* hero */\n.hero  >  h1 {\n  content: "  a ; b  ";\n  margin: 0 ;\n}\n'
+    assert minify_css(css) == '.hero>h1{content:"  a ; b  ";margin:0}'
+
+
+def test_minify_js_strips_comments_and_indentation():
+    js = "function f() {\n    // comment\n    return 1; /* block */\n}\n\n"
+    assert minify_js(js) == "function f() {\nreturn 1;\n}"
+
+
+def test_minify_js_keeps_literals():
+    js = (
+        'const url = "http://x.com//y";\n'
+        "  const re = /\\/\\/[a-z]/g;\n"
+        "  const s = `a ${ok ? `yes // no` : \"}\"} b`;\n"
+        "  const t = `line 1\n      line 2`;\n"
+    )
+    assert minify_js(js) == (
+        'const url = "http://x.com//y";\n'
+        "const re = /\\/\\/[a-z]/g;\n"
+        "const s = `a ${ok ? `yes // no` : \"}\"} b`;\n"
+        "const t = `line 1\n      line 2`;"
+    )
@@ -0,0 +1,33 @@
+import pytest
+from history import JsonlHistoryStore, SqliteHistoryStore
+from search import SearchIndex, match_expression
+
+
+def site(prompt):
+    return {"prompt": prompt, "response": f"```html\n<h1>{prompt}</h1>\n```\n```css\nh1 {{ color: teal; }}\n```"}
+
+
+@pytest.mark.parametrize("backend", [JsonlHistoryStore, SqliteHistoryStore])
+def test_changes_by_another_process_are_picked_up(tmp_path, backend):
+    index = SearchIndex(backend(str(tmp_path)))
+    other = backend(str(tmp_path))  # writes without telling the index, like a second process
+    old_id = other.append(site("bakery with croissants"))
+    assert [hit["id"] for hit in index.search("bakery")] == [old_id]
+    # A delete plus a save leaves the chat count unchanged.
+    other.delete(old_id)
+    new_id = other.append(site("yoga studio schedule"))
+    assert index.search("bakery") == []
+    assert [hit["id"] for hit in index.search("yoga")] == [new_id]
+
+
+def test_prompt_matches_rank_first(tmp_path):
+    store = JsonlHistoryStore(str(tmp_path))
+    index = SearchIndex(store)
+    in_code = store.append({"prompt": "portfolio", "response": "```html\n<p>teal gallery</p>\n```"})
+    in_prompt = store.append(site("teal gallery for a painter"))
+    assert [hit["id"] for hit in index.search("teal gal")] == [in_prompt, in_code]
+
+
+def test_match_expression():
+    assert match_expression("  ") is None
+    assert match_expression('cafe "menu') == '"cafe" "menu"*'
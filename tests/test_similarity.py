@@ -0,0 +1,33 @@
+import similarity
+from history import JsonlHistoryStore
+from similarity import PromptIndex
+
+
+def test_near_duplicates_rank_first():
+    index = PromptIndex()
+    index.add("cafe", "A cozy cafe website with a menu and opening hours")
+    index.add("dentist", "Dentist practice site with appointment booking")
+    matches = index.query("cozy cafe site with menu and opening hours")
+    assert [match.chat_id for match in matches] == ["cafe"]
+    assert index.query("mountain hiking blog") == []
+
+
+def test_index_follows_other_processes(tmp_path, monkeypatch):
+    monkeypatch.setattr(similarity, "_index", None)
+    store = JsonlHistoryStore(str(tmp_path))
+    other = JsonlHistoryStore(str(tmp_path))  # writes without notifying listeners
+    long_prompt = "Yoga studio website with class schedule, teacher profiles, pricing and a contact form " * 2
+    old_id = other.append({"prompt": "Bakery website with croissants and opening hours", "response": ""})
+    assert [m.chat_id for m in similarity.find_similar_chats("bakery with croissants and opening hours", store=store)] == [old_id]
+    other.delete(old_id)
+    new_id = other.append({"prompt": long_prompt, "response": ""})
+    assert similarity.find_similar_chats("bakery with croissants and opening hours", store=store) == []
+    assert [m.chat_id for m in similarity.find_similar_chats(long_prompt, store=store)] == [new_id]
+
+
+def test_prompts_come_from_the_index(tmp_path):
+    store = JsonlHistoryStore(str(tmp_path))
+    prompt = "x" * 500
+    chat_id = store.append({"prompt": prompt, "response": "big"})
+    store._read = None  # prompts() must not read any record
+    assert store.prompts() == [(chat_id, prompt)]
@@ -0,0 +1,38 @@
+import pytest
+from templates import MAX_PAGES, build_pages, page_slugs, render_site
+
+
+@pytest.mark.parametrize("prompt", [
+    "Build a single page portfolio site for a photographer",
+    "one page website",
+    "Make a responsive page for my cafe",
+    "Landing pages for 5 products",
+    "A modern site with multiple pages",
+])
+def test_page_words_are_not_page_names(prompt):
+    assert page_slugs(prompt) == []
+
+
+@pytest.mark.parametrize("prompt, slugs", [
+    ("Cafe site with three pages: menu, about and contact", ["menu", "about", "contact"]),
+    ("Agency site with services, gallery and faq pages", ["services", "gallery", "faq"]),
+    ("Pages: team & pricing", ["team", "pricing"]),
+    ("A bakery site with a gallery page", ["gallery"]),
+    ("Restaurant site with about and contact", ["about", "contact"]),
+    ("Two pages: about, about", ["about"]),
+])
+def test_explicit_pages(prompt, slugs):
+    assert page_slugs(prompt) == slugs
+
+
+def test_page_count_is_capped():
+    prompt = "pages: " + ", ".join(f"p{number}" for number in range(MAX_PAGES + 10))
+    assert len(page_slugs(prompt)) == MAX_PAGES
+
+
+def test_render_site_links_every_page():
+    files = render_site(build_pages(["about", "gallery"], "<main>Hi</main>"), css="body{}", js="")
+    assert list(files) == ["index.html", "style.css", "script.js", "about.html", "gallery.html"]
+    for name in ("index.html", "about.html", "gallery.html"):
+        assert '<a href="gallery.html">Gallery</a>' in files[name]
+    assert "<main>Hi</main>" in files["index.html"]
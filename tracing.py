@@ -0,0 +1,205 @@
+import os
+import json
+import time
+import uuid
+import threading
+import contextvars
+from functools import partial
+from contextlib import contextmanager
+from collections import OrderedDict
+
+# Both exports are off unless a path is configured.
+TRACE_FILE = os.environ.get("TRACE_FILE")  # JSONL, one finished trace per line
+METRICS_FILE = os.environ.get("METRICS_FILE")  # Prometheus text exposition format
+MAX_TRACES = int(os.environ.get("MAX_TRACES", 100))
+
+_current_trace = contextvars.ContextVar("trace", default=None)
+_current_span = contextvars.ContextVar("span", default=None)
+
+
+class Trace:
+    """The spans recorded for one generation (or batch job)."""
+
+    def __init__(self, name, **attrs):
+        self.id = uuid.uuid4().hex
+        self.name = name
+        self.attrs = attrs
+        self.started = time.time()
+        self.duration = None
+        self.status = "ok"
+        self.spans = []
+        self._origin = time.perf_counter()
+        self._lock = threading.Lock()
+
+    def open_span(self, name, parent=None, **attrs):
+        span = {
+            "id": uuid.uuid4().hex[:16],
+            "parent": parent,
+            "name": name,
+            "start": time.perf_counter() - self._origin,
+            "duration": None,
+            "attrs": attrs,
+        }
+        with self._lock:
+            self.spans.append(span)
+        return span
+
+    def close_span(self, span, **attrs):
+        span["attrs"].update(attrs)
+        span["duration"] = time.perf_counter() - self._origin - span["start"]
+
+    def stage_totals(self):
+        """Seconds and span count per span name, slowest first."""
+        totals = {}
+        for span in self.spans:
+            seconds, count = totals.get(span["name"], (0.0, 0))
+            totals[span["name"]] = (seconds + (span["duration"] or 0.0), count + 1)
+        return dict(sorted(totals.items(), key=lambda item: -item[1][0]))
+
+    def tokens(self):
+        usage = {"input": 0, "output": 0}
+        for span in self.spans:
+            usage["input"] += span["attrs"].get("input_tokens", 0)
+            usage["output"] += span["attrs"].get("output_tokens", 0)
+        return usage
+
+    def to_dict(self):
+        return {
+            "id": self.id,
+            "name": self.name,
+            "attrs": self.attrs,
+            "started": self.started,
+            "duration": self.duration,
+            "status": self.status,
+            "spans": self.spans,
+        }
+
+
+class Tracer:
+    """Records spans into the trace active in the current context.
+
+    `trace` starts a trace and `span` times a stage inside it; outside a
+    trace `span` does nothing, so library code can be instrumented freely.
+    Finished traces are kept in memory (for the debug panel), aggregated
+    into per-stage metrics and optionally exported.
+    """
+
+    def __init__(self, trace_file=TRACE_FILE, metrics_file=METRICS_FILE, max_traces=MAX_TRACES):
+        self.trace_file = trace_file
+        self.metrics_file = metrics_file
+        self.max_traces = max_traces
+        self._traces = OrderedDict()
+        self._stages = {}
+        self._tokens = {"input": 0, "output": 0}
+        self._outcomes = {}
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def trace(self, name, **attrs):
+        trace = Trace(name, **attrs)
+        trace_token = _current_trace.set(trace)
+        span_token = _current_span.set(None)
+        start = time.perf_counter()
+        try:
+            yield trace
+        except BaseException as e:
+            trace.status = "error"
+            trace.attrs["error"] = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            trace.duration = time.perf_counter() - start
+            _current_span.reset(span_token)
+            _current_trace.reset(trace_token)
+            self._finish(trace)
+
+    @contextmanager
+    def span(self, name, **attrs):
+        """Time the block as a child of the current span; yields its attrs dict to annotate."""
+        trace = _current_trace.get()
+        if trace is None:
+            yield attrs
+            return
+        span = trace.open_span(name, _current_span.get(), **attrs)
+        token = _current_span.set(span["id"])
+        try:
+            yield span["attrs"]
+        except BaseException as e:
+            span["attrs"]["error"] = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            _current_span.reset(token)
+            trace.close_span(span)
+
+    def get(self, trace_id):
+        with self._lock:
+            return self._traces.get(trace_id)
+
+    def _finish(self, trace):
+        with self._lock:
+            self._traces[trace.id] = trace
+            while len(self._traces) > self.max_traces:
+                self._traces.popitem(last=False)
+            for name, (seconds, count) in trace.stage_totals().items():
+                total = self._stages.setdefault(name, [0.0, 0])
+                total[0] += seconds
+                total[1] += count
+            for direction, count in trace.tokens().items():
+                self._tokens[direction] += count
+            outcome = (trace.name, trace.status)
+            self._outcomes[outcome] = self._outcomes.get(outcome, 0) + 1
+            if self.trace_file:
+                os.makedirs(os.path.dirname(self.trace_file) or ".", exist_ok=True)
+                with open(self.trace_file, "a", encoding="utf-8") as f:
+                    f.write(json.dumps(trace.to_dict(), default=str) + "\n")
+            if self.metrics_file:
+                self._write_metrics()
+
+    def prometheus_text(self):
+        with self._lock:
+            return self._prometheus_text()
+
+    def _prometheus_text(self):
+        lines = [
+            "# HELP webweaver_stage_seconds Time spent in each generation stage.",
+            "# TYPE webweaver_stage_seconds summary",
+        ]
+        for name, (seconds, count) in sorted(self._stages.items()):
+            lines.append(f'webweaver_stage_seconds_sum{{stage="{name}"}} {seconds:.6f}')
+            lines.append(f'webweaver_stage_seconds_count{{stage="{name}"}} {count}')
+        lines += [
+            "# HELP webweaver_llm_tokens_total LLM tokens reported by the model.",
+            "# TYPE webweaver_llm_tokens_total counter",
+        ]
+        for direction, count in self._tokens.items():
+            lines.append(f'webweaver_llm_tokens_total{{direction="{direction}"}} {count}')
+        lines += [
+            "# HELP webweaver_traces_total Finished generations by kind and outcome.",
+            "# TYPE webweaver_traces_total counter",
+        ]
+        for (name, status), count in sorted(self._outcomes.items()):
+            lines.append(f'webweaver_traces_total{{name="{name}",status="{status}"}} {count}')
+        return "\n".join(lines) + "\n"
+
+    def _write_metrics(self):
+        os.makedirs(os.path.dirname(self.metrics_file) or ".", exist_ok=True)
+        temp_path = f"{self.metrics_file}.tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            f.write(self._prometheus_text())
+        os.replace(temp_path, self.metrics_file)
+
+
+def current_trace():
+    return _current_trace.get()
+
+
+def current_span_id():
+    return _current_span.get()
+
+
+def propagate(func):
+    """Bind `func` to the current context, so spans it records on a worker
+    thread (executor, `threading.Thread`) land in the caller's trace."""
+    return partial(contextvars.copy_context().run, func)
+
+
+tracer = Tracer()
@@ -1,8 +1,17 @@
+import io
 import os
 import re
+import hashlib
 import zipfile
-import requests
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from dotenv import load_dotenv
+from cache import CACHE_DIR, DiskCache, make_key
+from http_pool import DEFAULT_TIMEOUT, get_session
+from fences import BLOCK_KINDS, clean_code, parse_code_blocks
+from templates import build_pages, page_slugs, render_page, render_site, with_hero_image, write_files
+from tracing import propagate, tracer
 
 load_dotenv()
 
@@ -13,161 +22,179 @@ def detect_language(prompt):
         return "react"
     return "html"
 
+FALLBACK_IMAGE_URL = "https://picsum.photos/800/400"
+
+image_cache = DiskCache(
+    os.path.join(CACHE_DIR, "images.sqlite3"),
+    max_entries=int(os.environ.get("IMAGE_CACHE_MAX_ENTRIES", 500)),
+    ttl=int(os.environ.get("IMAGE_CACHE_TTL", 3 * 24 * 3600))
+)
+
+_image_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="pexels")
+
+IMAGE_STOPWORDS = {
+    "a", "an", "the", "and", "or", "for", "with", "of", "to", "in", "on", "my", "our",
+    "your", "me", "i", "we", "is", "it", "that", "this", "by", "from", "at", "as", "be",
+    "create", "build", "make", "generate", "design", "need", "want", "please", "using",
+    "website", "site", "web", "page", "pages", "landing", "modern", "responsive", "simple",
+    "clean", "html", "css", "javascript", "js", "react", "about", "contact", "home",
+    "section", "sections", "navbar", "footer", "header", "hero"
+}
+
+def image_keywords(prompt, limit=4):
+    words = []
+    for word in re.findall(r"[a-z]+", (prompt or "").lower()):
+        if len(word) > 2 and word not in IMAGE_STOPWORDS and word not in words:
+            words.append(word)
+        if len(words) == limit:
+            break
+    return " ".join(words) or "modern website"
+
 def fetch_image_url(query, api_key):
+    with tracer.span("pexels") as attrs:
+        image_url = _fetch_image_url(query, api_key)
+        attrs["fallback"] = image_url == FALLBACK_IMAGE_URL
+        return image_url
+
+def _fetch_image_url(query, api_key):
     if not api_key:
         print("Missing Pexels API Key. Using fallback image.")
-        return "https://picsum.photos/800/400"
+        return FALLBACK_IMAGE_URL
+    query = image_keywords(query)
+    cache_key = make_key("pexels", query)
+    cached = image_cache.get(cache_key)
+    if cached is not None:
+        return cached
     try:
-        url = f"https://api.pexels.com/v1/search?query={query}&per_page=1"
-        headers = {"Authorization": api_key}
-        response = requests.get(url, headers=headers)
+        api_url = os.environ.get("PEXELS_API_URL", "https://api.pexels.com").rstrip("/")
+        response = get_session().get(
+            f"{api_url}/v1/search",
+            params={"query": query, "per_page": 1},
+            headers={"Authorization": api_key},
+            timeout=DEFAULT_TIMEOUT
+        )
         if response.status_code == 200:
             data = response.json()
             if data.get("photos"):
-                return data["photos"][0]["src"]["large"]
+                image_url = data["photos"][0]["src"]["large"]
+                image_cache.set(cache_key, image_url)
+                return image_url
     except Exception as e:
         print("🔥 Pexels API Error:", e)
-    return "https://picsum.photos/800/400"
+    return FALLBACK_IMAGE_URL
+
+def prefetch_image_url(prompt):
+    """Start the image lookup in the background, e.g. while the LLM is still
+    generating; pass `.result()` to `save_code_to_files(image_url=...)`."""
+    return _image_executor.submit(propagate(fetch_image_url), prompt or "modern website", os.environ.get("PEXELS_KEY"))
 
 def extract_component_blocks(response):
-    blocks = {"html": [], "css": [], "js": [], "jsx": [], "others": []}
-    matches = re.findall(r"```(\w+)?\s*([\s\S]*?)```", response)
-
-    if matches:
-        for lang, code in matches:
-            lang = (lang or "html").lower().strip()
-            if lang == "javascript":
-                lang = "js"
-            code = re.sub(r"^`{1,3}\s*\w*", "", code)
-            code = re.sub(r"`{1,3}$", "", code).strip()
-            blocks.get(lang, blocks["others"]).append(code)
+    blocks = {kind: [] for kind in BLOCK_KINDS}
+    parsed = parse_code_blocks(response)
+
+    if parsed:
+        for block in parsed:
+            blocks[block.kind].append(block.code)
     else:
-        cleaned = re.sub(r"^`{1,3}\s*\w*", "", response)
-        cleaned = re.sub(r"`{1,3}$", "", cleaned).strip()
-        blocks["html"].append(cleaned)
+        blocks["html"].append(clean_code(response))
 
     return blocks
 
 def build_page(title, body, css="", js="", nav_links="", image_url=""):
     nav = f"<nav>{nav_links}</nav>" if nav_links else ""
+    return render_page(title, nav, with_hero_image(body, image_url))
 
-    if image_url and '<section id="hero"' in body:
-        body = re.sub(
-            r'(<section\s+[^>]*id=["\']hero["\'][^>]*)(>)',
-            rf'\1 style="background-image: url({image_url}); background-size: cover; background-position: center;"\2',
-            body,
-            flags=re.IGNORECASE
-        )
+def save_code_to_files(response, prompt, image_url=None, output_dir="outputs", pages=None):
+    """Write the site for `response` into `output_dir`.
 
-    return f"""<!DOCTYPE html>
-<html lang="en">
-<head>
-  <meta charset="UTF-8" />
-  <meta name="viewport" content="width=device-width, initial-scale=1.0">
-  <title>{title}</title>
-  <link rel="stylesheet" href="style.css">
-</head>
-<body>
-  {nav}
-  {body}
-  <script src="script.js"></script>
-</body>
-</html>
-"""
-
-def save_code_to_files(response, prompt):
+    `pages` lists the extra pages (slugs such as "about"); by default they
+    are read from the prompt with `templates.page_slugs`.
+    """
     language = detect_language(prompt)
-    blocks = extract_component_blocks(response)
-    os.makedirs("outputs", exist_ok=True)
+    with tracer.span("parse"):
+        blocks = extract_component_blocks(response)
 
     html_code = "\n\n".join(blocks["html"])
     css_code = "\n\n".join(blocks["css"])
     js_code = "\n\n".join(blocks["js"])
     jsx_code = "\n\n".join(blocks["jsx"])
-    output_paths = []
-
-    nav_links = ""
-    if "home" in prompt.lower() or True:
-        nav_links += '<a href="index.html">Home</a> '
-    if "about" in prompt.lower():
-        nav_links += '<a href="about.html">About</a> '
-    if "contact" in prompt.lower():
-        nav_links += '<a href="contact.html">Contact</a> '
-
-    access_key = os.environ.get("PEXELS_KEY")
-    image_query = prompt or "modern website"
-    image_url = fetch_image_url(image_query, access_key)
-
-    if language == "react":
-        with open("outputs/App.jsx", "w", encoding="utf-8") as f:
-            f.write(jsx_code or js_code)
-        output_paths.append("outputs/App.jsx")
-    else:
 
-        index_html = build_page("Home", html_code, css_code, js_code, nav_links, image_url)
-        with open("outputs/index.html", "w", encoding="utf-8") as f:
-            f.write(index_html)
-        with open("outputs/style.css", "w", encoding="utf-8") as f:
-            f.write(css_code)
-        with open("outputs/script.js", "w", encoding="utf-8") as f:
-            f.write(js_code)
-
-        output_paths += [
-            "outputs/index.html",
-            "outputs/style.css",
-            "outputs/script.js"
-        ]
-
-        if "about" in prompt.lower():
-            about_html = build_page(
-                "About",
-                "<h1>About Us</h1><p>This is the about page.</p>",
-                css_code,
-                js_code,
-                nav_links,
-                image_url
-            )
-            with open("outputs/about.html", "w", encoding="utf-8") as f:
-                f.write(about_html)
-            output_paths.append("outputs/about.html")
-
-        if "contact" in prompt.lower():
-            contact_html = build_page(
-                "Contact",
-                "<h1>Contact Us</h1><p>Email: contact@example.com</p>",
-                css_code,
-                js_code,
-                nav_links,
-                image_url
-            )
-            with open("outputs/contact.html", "w", encoding="utf-8") as f:
-                f.write(contact_html)
-            output_paths.append("outputs/contact.html")
-
-    return output_paths, language
-
-def create_zip(file_paths, zip_name="website_package.zip"):
-    zip_path = os.path.join("outputs", zip_name)
-    with zipfile.ZipFile(zip_path, "w") as zipf:
+    if image_url is None and language != "react":
+        image_url = fetch_image_url(prompt or "modern website", os.environ.get("PEXELS_KEY"))
+
+    with tracer.span("render"):
+        if language == "react":
+            files = {"App.jsx": jsx_code or js_code}
+        else:
+            site_pages = build_pages(page_slugs(prompt) if pages is None else pages, html_code)
+            files = render_site(site_pages, css_code, js_code, image_url)
+
+    with tracer.span("write", files=len(files)):
+        return write_files(files, output_dir), language
+
+def create_zip(file_paths, zip_name="website_package.zip", output_dir="outputs"):
+    zip_path = os.path.join(output_dir, zip_name)
+    with zipfile.ZipFile(zip_path, "w", compression=zipfile.ZIP_DEFLATED) as zipf:
         for file in file_paths:
             zipf.write(file, arcname=os.path.basename(file))
     return zip_path
 
-def split_code_blocks(response):
-    html_code, css_code, js_code = "", "", ""
-    matches = re.findall(r"```(\w+)?\s*([\s\S]*?)```", response)
+PACKAGE_CACHE_SIZE = int(os.environ.get("PACKAGE_CACHE_SIZE", 64))
+_package_cache = OrderedDict()
+_package_lock = threading.Lock()
+
+def read_output_files(file_paths):
+    files = {}
+    for path in file_paths:
+        with open(path, "rb") as f:
+            files[os.path.basename(path)] = f.read()
+    return files
+
+def _as_bytes(content):
+    return content.encode("utf-8") if isinstance(content, str) else content
+
+def package_digest(files):
+    digest = hashlib.sha256()
+    for name in sorted(files):
+        content = _as_bytes(files[name])
+        digest.update(f"{name}\0{len(content)}\0".encode("utf-8"))
+        digest.update(content)
+    return digest.hexdigest()
+
+def build_zip_bytes(files):
+    """DEFLATE-compressed ZIP of `{arcname: str | bytes}`, built in memory."""
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w", compression=zipfile.ZIP_DEFLATED) as zipf:
+        for name, content in files.items():
+            zipf.writestr(name, _as_bytes(content))
+    return buffer.getvalue()
+
+def package_files(files):
+    """Build (or reuse) the ZIP for `files`; returns `(digest, zip_bytes)`.
+
+    Archives are memoized by content hash, so a rerun that asks for the same
+    package again via `get_package(digest)` does no I/O and no compression.
+    """
+    with tracer.span("zip") as attrs:
+        digest = package_digest(files)
+        data = get_package(digest)
+        attrs["cached"] = data is not None
+        if data is None:
+            data = build_zip_bytes(files)
+            with _package_lock:
+                _package_cache[digest] = data
+                while len(_package_cache) > PACKAGE_CACHE_SIZE:
+                    _package_cache.popitem(last=False)
+        attrs["bytes"] = len(data)
+        return digest, data
+
+def get_package(digest):
+    with _package_lock:
+        data = _package_cache.get(digest)
+        if data is not None:
+            _package_cache.move_to_end(digest)
+        return data
 
-    if not matches:
-        html_code = response.strip()
-    else:
-        for lang, code in matches:
-            lang = (lang or "html").lower()
-            code = code.strip()
-            if lang == "html":
-                html_code += code + "\n\n"
-            elif lang == "css":
-                css_code += code + "\n\n"
-            elif lang in ("js", "javascript"):
-                js_code += code + "\n\n"
-
-    return html_code.strip(), css_code.strip(), js_code.strip()
+def split_code_blocks(response):
+    blocks = extract_component_blocks(response)
+    return tuple("\n\n".join(blocks[kind]).strip() for kind in ("html", "css", "js"))
@@ -0,0 +1,96 @@
+import os
+import re
+import time
+import uuid
+import shutil
+import threading
+
+WORKSPACE_ROOT = os.environ.get("WORKSPACE_ROOT", os.path.join("outputs", "workspaces"))
+MAX_WORKSPACE_BYTES = int(os.environ.get("MAX_WORKSPACE_BYTES", 500 * 1024 * 1024))
+MAX_WORKSPACES = int(os.environ.get("MAX_WORKSPACES", 200))
+WORKSPACE_TTL = int(os.environ.get("WORKSPACE_TTL", 24 * 3600))
+
+_VALID_ID = re.compile(r"[A-Za-z0-9_-]{1,64}")
+
+
+def new_workspace_id():
+    return uuid.uuid4().hex
+
+
+class WorkspaceManager:
+    """Gives every session its own output directory under `root`.
+
+    Total disk usage is bounded: `cleanup` drops workspaces idle for longer
+    than `ttl`, then evicts the least recently used ones until both the
+    workspace count and the byte budget are respected.
+    """
+
+    def __init__(self, root=WORKSPACE_ROOT, max_bytes=MAX_WORKSPACE_BYTES,
+                 max_workspaces=MAX_WORKSPACES, ttl=WORKSPACE_TTL):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.max_workspaces = max_workspaces
+        self.ttl = ttl
+        self._lock = threading.Lock()
+
+    def _dir(self, workspace_id):
+        if not _VALID_ID.fullmatch(workspace_id or ""):
+            raise ValueError(f"Invalid workspace id: {workspace_id!r}")
+        return os.path.join(self.root, workspace_id)
+
+    def path(self, workspace_id):
+        """The workspace directory, created on demand and marked as used."""
+        path = self._dir(workspace_id)
+        os.makedirs(path, exist_ok=True)
+        os.utime(path)
+        return path
+
+    def reset(self, workspace_id):
+        path = self._dir(workspace_id)
+        shutil.rmtree(path, ignore_errors=True)
+        os.makedirs(path, exist_ok=True)
+        return path
+
+    def remove(self, workspace_id):
+        shutil.rmtree(self._dir(workspace_id), ignore_errors=True)
+
+    def usage(self):
+        """(workspace_id, bytes, last_used) for every workspace, oldest first."""
+        if not os.path.isdir(self.root):
+            return []
+        workspaces = []
+        for entry in os.scandir(self.root):
+            if not entry.is_dir():
+                continue
+            size = 0
+            for dirpath, _, filenames in os.walk(entry.path):
+                for name in filenames:
+                    try:
+                        size += os.path.getsize(os.path.join(dirpath, name))
+                    except OSError:
+                        pass
+            workspaces.append((entry.name, size, entry.stat().st_mtime))
+        return sorted(workspaces, key=lambda workspace: workspace[2])
+
+    def cleanup(self, keep=()):
+        """Evict stale and least recently used workspaces; returns evicted ids."""
+        with self._lock:
+            workspaces = self.usage()
+            now = time.time()
+            total = sum(size for _, size, _ in workspaces)
+            count = len(workspaces)
+            evicted = []
+            for workspace_id, size, last_used in workspaces:
+                if workspace_id in keep:
+                    continue
+                expired = self.ttl and now - last_used > self.ttl
+                if not (expired or count > self.max_workspaces or total > self.max_bytes):
+                    continue
+                shutil.rmtree(os.path.join(self.root, workspace_id), ignore_errors=True)
+                evicted.append(workspace_id)
+                count -= 1
+                total -= size
+            return evicted
+
+
+workspace_manager = WorkspaceManager()